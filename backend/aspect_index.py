@@ -0,0 +1,188 @@
+"""In-memory index of stored charts for "who aspects this point" searches.
+
+For every body the index keeps the longitudes of all charts in one sorted
+array. An aspect of angle A to a target longitude T within an orb is the union
+of at most two windows, T + A ± orb and T - A ± orb, each split in two where
+it wraps past 360°. Each window is found by binary search, so a condition
+costs O(log n) plus the number of charts it matches, and several conditions
+are combined by intersecting their candidate sets, smallest first.
+
+Charts added after the last rebuild go to an unsorted tail that is checked
+with one vectorized pass; the tail is merged into the sorted arrays once it
+outgrows a fraction of the index, which keeps inserts amortized O(log n).
+"""
+import threading
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# The tail is merged once it holds this many charts or an eighth of the index
+MIN_MERGE_SIZE = 4096
+
+
+def aspect_windows(target: float, angles: Iterable[float], orb: float) -> List[Tuple[float, float]]:
+    """Longitude ranges [low, high] within 0..360 that are within orb of an
+    aspect of one of the angles to target"""
+    windows = []
+    for angle in angles:
+        centers = {(target + angle) % 360, (target - angle) % 360}
+        for center in centers:
+            low, high = center - orb, center + orb
+            if low < 0:
+                windows += [(low + 360, 360.0), (0.0, high)]
+            elif high >= 360:
+                windows += [(low, 360.0), (0.0, high - 360)]
+            else:
+                windows.append((low, high))
+    return windows
+
+
+def nearest_aspect(longitudes: np.ndarray, target: float, angles: Sequence[float]) -> Tuple[np.ndarray, np.ndarray]:
+    """Index into angles of the closest aspect to target and its orb, per longitude"""
+    separation = np.abs((longitudes - target + 180) % 360 - 180)
+    orbs = np.abs(separation[:, None] - np.asarray(angles, dtype=float)[None, :])
+    closest = np.argmin(orbs, axis=1)
+    return closest, orbs[np.arange(len(longitudes)), closest]
+
+
+class AspectIndex:
+    """Body longitudes of many charts, searchable by aspect to a point"""
+
+    def __init__(self, body_names: Sequence[str], min_merge_size: int = MIN_MERGE_SIZE):
+        self.body_names = list(body_names)
+        self._columns = {name: column for column, name in enumerate(self.body_names)}
+        self.min_merge_size = min_merge_size
+        self._lock = threading.Lock()
+        width = len(self.body_names)
+        # Sorted part: ids ascending with their longitudes, and per body the
+        # rows in longitude order (NaN, for bodies a chart lacks, sorts last)
+        self._ids = np.empty(0, dtype=np.int64)
+        self._longitudes = np.empty((0, width))
+        self._sorted_longitudes = np.empty((width, 0))
+        self._sorted_rows = np.empty((width, 0), dtype=np.int64)
+        self._tail_ids: List[np.ndarray] = []
+        self._tail_longitudes: List[np.ndarray] = []
+        self._tail_size = 0
+        self._deleted = set()
+        self.queries = 0
+        self.merges = 0
+
+    def _rebuild(self, ids: np.ndarray, longitudes: np.ndarray) -> None:
+        if self._deleted:
+            keep = ~np.isin(ids, np.fromiter(self._deleted, dtype=np.int64))
+            ids, longitudes = ids[keep], longitudes[keep]
+            self._deleted = set()
+        order = np.argsort(ids, kind="stable")
+        self._ids, self._longitudes = ids[order], longitudes[order]
+        self._sorted_rows = np.argsort(self._longitudes.T, axis=1, kind="stable")
+        self._sorted_longitudes = np.take_along_axis(self._longitudes.T, self._sorted_rows, axis=1)
+        self._tail_ids, self._tail_longitudes, self._tail_size = [], [], 0
+        self.merges += 1
+
+    def build(self, ids: np.ndarray, longitudes: np.ndarray) -> None:
+        """Replace the contents with (n,) ids and (n, bodies) longitudes"""
+        with self._lock:
+            self._deleted = set()
+            self._rebuild(
+                np.asarray(ids, dtype=np.int64),
+                np.asarray(longitudes, dtype=float).reshape(len(ids), len(self.body_names))
+            )
+
+    def add(self, ids: Sequence[int], longitudes: np.ndarray) -> None:
+        """Add charts; longitudes has one row per id, columns in body_names order"""
+        ids = np.asarray(ids, dtype=np.int64)
+        longitudes = np.asarray(longitudes, dtype=float).reshape(len(ids), len(self.body_names))
+        with self._lock:
+            self._tail_ids.append(ids)
+            self._tail_longitudes.append(longitudes)
+            self._tail_size += len(ids)
+            if self._tail_size >= max(self.min_merge_size, len(self._ids) // 8):
+                self._rebuild(
+                    np.concatenate([self._ids, *self._tail_ids]),
+                    np.concatenate([self._longitudes, *self._tail_longitudes])
+                )
+
+    def remove(self, chart_id: int) -> None:
+        """Drop a chart, if indexed; ids must not be reused afterwards"""
+        with self._lock:
+            position = np.searchsorted(self._ids, chart_id)
+            indexed = position < len(self._ids) and self._ids[position] == chart_id
+            if indexed or any(chart_id in tail for tail in self._tail_ids):
+                self._deleted.add(chart_id)
+
+    def __len__(self) -> int:
+        return len(self._ids) + self._tail_size - len(self._deleted)
+
+    def _snapshot(self) -> tuple:
+        with self._lock:
+            if len(self._tail_ids) > 1:
+                # Collapse the tail so queries scan one array
+                self._tail_ids = [np.concatenate(self._tail_ids)]
+                self._tail_longitudes = [np.concatenate(self._tail_longitudes)]
+            tail_ids = self._tail_ids[0] if self._tail_ids else np.empty(0, dtype=np.int64)
+            tail_longitudes = self._tail_longitudes[0] if self._tail_longitudes else np.empty((0, len(self.body_names)))
+            deleted = np.fromiter(self._deleted, dtype=np.int64) if self._deleted else None
+            self.queries += 1
+            return (self._ids, self._longitudes, self._sorted_longitudes, self._sorted_rows,
+                    tail_ids, tail_longitudes, deleted)
+
+    def search(self, conditions: Sequence[Tuple[str, float, Sequence[float], float]],
+               limit: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Charts matching every (body, target longitude, aspect angles, orb) condition.
+
+        Returns the chart ids, ordered by the sum of their orbs (tightest
+        first), with per condition the index of the matched angle and its orb
+        as (charts, conditions) arrays.
+        """
+        if not conditions:
+            raise ValueError("At least one condition is required")
+        ids, longitudes, sorted_longitudes, sorted_rows, tail_ids, tail_longitudes, deleted = self._snapshot()
+        columns = [self._columns[body] for body, _, _, _ in conditions]
+
+        # Candidate rows per condition from the sorted arrays, smallest set first
+        candidate_sets = []
+        for column, (_, target, angles, orb) in zip(columns, conditions):
+            slices = []
+            for low, high in aspect_windows(target, angles, orb):
+                start = np.searchsorted(sorted_longitudes[column], low, side="left")
+                end = np.searchsorted(sorted_longitudes[column], high, side="right")
+                slices.append(sorted_rows[column, start:end])
+            candidate_sets.append(np.unique(np.concatenate(slices)) if slices else np.empty(0, dtype=np.int64))
+        rows = None
+        for candidates in sorted(candidate_sets, key=len):
+            rows = candidates if rows is None else np.intersect1d(rows, candidates, assume_unique=True)
+            if not len(rows):
+                break
+
+        matched_ids, matched_longitudes = ids[rows], longitudes[rows]
+
+        # The tail is small: check it directly
+        if len(tail_ids):
+            mask = np.ones(len(tail_ids), dtype=bool)
+            for column, (_, target, angles, orb) in zip(columns, conditions):
+                _, orbs = nearest_aspect(tail_longitudes[:, column], target, angles)
+                mask &= orbs <= orb
+            matched_ids = np.concatenate([matched_ids, tail_ids[mask]])
+            matched_longitudes = np.concatenate([matched_longitudes, tail_longitudes[mask]])
+
+        if deleted is not None and len(matched_ids):
+            keep = ~np.isin(matched_ids, deleted)
+            matched_ids, matched_longitudes = matched_ids[keep], matched_longitudes[keep]
+
+        aspects = np.empty((len(matched_ids), len(conditions)), dtype=np.int64)
+        orbs = np.empty((len(matched_ids), len(conditions)))
+        for position, (column, (_, target, angles, _)) in enumerate(zip(columns, conditions)):
+            aspects[:, position], orbs[:, position] = nearest_aspect(matched_longitudes[:, column], target, angles)
+
+        order = np.lexsort((matched_ids, orbs.sum(axis=1)))
+        if limit is not None:
+            order = order[:limit]
+        return matched_ids[order], aspects[order], orbs[order]
+
+    def stats(self) -> dict:
+        return {
+            "charts": len(self),
+            "tail": self._tail_size,
+            "queries": self.queries,
+            "merges": self.merges
+        }
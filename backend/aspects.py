@@ -0,0 +1,143 @@
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+MAJOR_ASPECTS = {
+    "Conjunction": 0,
+    "Sextile": 60,
+    "Square": 90,
+    "Trine": 120,
+    "Opposition": 180
+}
+
+MINOR_ASPECTS = {
+    "Semi-sextile": 30,
+    "Semi-square": 45,
+    "Quintile": 72,
+    "Sesquiquadrate": 135,
+    "Biquintile": 144,
+    "Quincunx": 150
+}
+
+
+class OrbTable:
+    """Orb configuration for aspect matching.
+
+    Every aspect has an orb in degrees (``aspect_orbs`` overrides the defaults of
+    ``default_orb`` for major and ``minor_orb`` for minor aspects). Optional
+    ``planet_orbs`` narrow this per body: a pair may not exceed the larger of its
+    two bodies' orbs, so e.g. ``{"Pluto": 3}`` tightens Pluto–Pluto contacts while
+    a Sun–Pluto pair still uses the Sun's (unlimited) orb.
+    """
+
+    def __init__(self, default_orb: float = 8.0, aspect_orbs: Optional[Dict[str, float]] = None,
+                 planet_orbs: Optional[Dict[str, float]] = None, include_minor: bool = False,
+                 minor_orb: float = 2.0):
+        self.aspects = dict(MAJOR_ASPECTS)
+        if include_minor:
+            self.aspects.update(MINOR_ASPECTS)
+
+        self.aspect_orbs = {
+            name: (default_orb if name in MAJOR_ASPECTS else minor_orb)
+            for name in self.aspects
+        }
+        self.aspect_orbs.update(aspect_orbs or {})
+        self.planet_orbs = dict(planet_orbs or {})
+
+        self.names = list(self.aspects)
+        self.angles = np.array([self.aspects[name] for name in self.names], dtype=float)
+        self.orbs = np.array([self.aspect_orbs[name] for name in self.names], dtype=float)
+        self._limits: Dict[Tuple, np.ndarray] = {}
+
+    def limits(self, names1: Sequence[str], names2: Sequence[str]) -> np.ndarray:
+        """Orb limit for every (body1, body2, aspect) triple, shape (n, m, k)"""
+        key = (tuple(names1), tuple(names2))
+        limits = self._limits.get(key)
+        if limits is None:
+            if self.planet_orbs:
+                orbs1 = np.array([self.planet_orbs.get(name, np.inf) for name in names1])
+                orbs2 = np.array([self.planet_orbs.get(name, np.inf) for name in names2])
+                pair_orbs = np.maximum(orbs1[:, None], orbs2[None, :])
+                limits = np.minimum(pair_orbs[:, :, None], self.orbs[None, None, :])
+            else:
+                limits = np.broadcast_to(self.orbs, (len(names1), len(names2), len(self.orbs)))
+            self._limits[key] = limits
+        return limits
+
+
+def angular_separation(longitudes1, longitudes2) -> np.ndarray:
+    """Pairwise shortest angular distance in degrees (0–180), shape (n, m)"""
+    a = np.asarray(longitudes1, dtype=float)
+    b = np.asarray(longitudes2, dtype=float)
+    diff = np.abs(a[:, None] - b[None, :]) % 360
+    return np.minimum(diff, 360 - diff)
+
+
+def match_aspects(separation: np.ndarray, limits: np.ndarray, angles: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Match every separation against every aspect angle at once.
+
+    Returns ``(aspect_index, orb)`` arrays with the separation's shape;
+    ``aspect_index`` is -1 where no aspect is within orb. When aspects overlap
+    (possible with minor aspects) the one with the smallest orb wins.
+    """
+    deviation = np.abs(separation[..., None] - angles)
+    deviation = np.where(deviation <= limits, deviation, np.inf)
+    best = np.argmin(deviation, axis=-1)
+    orb = np.take_along_axis(deviation, best[..., None], axis=-1)[..., 0]
+    return np.where(np.isfinite(orb), best, -1), orb
+
+
+def find_aspects(names1: Sequence[str], longitudes1, names2: Optional[Sequence[str]] = None,
+                 longitudes2=None, orbs: Optional[OrbTable] = None,
+                 same_body_only: bool = False) -> List[dict]:
+    """Find aspects within one chart or between two charts.
+
+    With only one set of bodies, each unordered pair is checked once. With a
+    second set, every cross-chart pair is checked, or only pairs of the same
+    body when ``same_body_only`` is set. Results are ordered by body pair.
+    """
+    orbs = orbs or OrbTable()
+    within_chart = names2 is None
+    if within_chart:
+        names2, longitudes2 = names1, longitudes1
+
+    separation = angular_separation(longitudes1, longitudes2)
+    limits = orbs.limits(names1, names2)
+
+    if within_chart:
+        pair_mask = np.triu(np.ones(separation.shape, dtype=bool), k=1)
+    elif same_body_only:
+        pair_mask = np.asarray(names1)[:, None] == np.asarray(names2)[None, :]
+    else:
+        pair_mask = np.ones(separation.shape, dtype=bool)
+
+    aspect_index, orb = match_aspects(separation, limits, orbs.angles)
+    rows, cols = np.nonzero((aspect_index >= 0) & pair_mask)
+
+    return [
+        {
+            "body1": names1[i],
+            "body2": names2[j],
+            "aspect": orbs.names[aspect_index[i, j]],
+            "orb": float(orb[i, j])
+        }
+        for i, j in zip(rows, cols)
+    ]
+
+
+def same_body_aspects(names: Sequence[str], longitudes, candidate_longitudes,
+                      orbs: Optional[OrbTable] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """Match one chart against many charts, body by body, in a single pass.
+
+    ``candidate_longitudes`` has shape (n, len(names)) with NaN for missing
+    bodies. Returns ``(aspect_index, orb)`` arrays of that shape, with
+    ``aspect_index`` -1 where there is no aspect (see ``match_aspects``).
+    """
+    orbs = orbs or OrbTable()
+    base = np.asarray(longitudes, dtype=float)
+    candidates = np.asarray(candidate_longitudes, dtype=float).reshape(-1, len(names))
+
+    diff = np.abs(candidates - base[None, :]) % 360
+    separation = np.minimum(diff, 360 - diff)
+    limits = np.diagonal(orbs.limits(names, names)).T  # (bodies, aspects)
+    return match_aspects(separation, limits[None, :, :], orbs.angles)
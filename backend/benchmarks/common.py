@@ -0,0 +1,26 @@
+"""Helpers shared by the benchmark scripts; importing this does not import the app"""
+import atexit
+import os
+import shutil
+import tempfile
+from typing import List
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an ascending list"""
+    if not sorted_values:
+        return float("nan")
+    rank = max(0, min(len(sorted_values) - 1, int(round(fraction * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[rank]
+
+
+def use_temporary_data() -> str:
+    """Point the app's chart store, sketch job store and sketch cache at a
+    throwaway directory, unless set explicitly. Call before importing main,
+    which otherwise creates them under ./data."""
+    directory = tempfile.mkdtemp(prefix="eigensage-benchmark-")
+    atexit.register(shutil.rmtree, directory, ignore_errors=True)
+    os.environ.setdefault("CHART_STORE_PATH", os.path.join(directory, "charts.db"))
+    os.environ.setdefault("SKETCH_JOB_STORE_PATH", os.path.join(directory, "sketch_jobs.db"))
+    os.environ.setdefault("SKETCH_CACHE_DIR", os.path.join(directory, "sketches"))
+    return directory
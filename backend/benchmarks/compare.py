@@ -0,0 +1,71 @@
+"""Compare a benchmark result file against a stored baseline.
+
+Exits with status 1 when any benchmark regressed by more than the tolerance,
+so CI can fail the build:
+
+    python -m benchmarks.compare baseline-load.json load.json --tolerance 0.25
+"""
+import argparse
+import json
+import sys
+
+# Metric -> True when larger values are better
+METRICS = {
+    "median_us": False,
+    "p50_ms": False,
+    "p95_ms": False,
+    "p99_ms": False,
+    "throughput_rps": True
+}
+
+
+def compare(baseline: dict, current: dict, tolerance: float, metrics: list) -> list:
+    """Rows of (benchmark, metric, baseline, current, relative change, regressed)"""
+    rows = []
+    for name, base_values in baseline["results"].items():
+        values = current["results"].get(name)
+        if values is None:
+            continue
+        for metric in metrics:
+            if metric not in base_values or metric not in values or not base_values[metric]:
+                continue
+            change = (values[metric] - base_values[metric]) / base_values[metric]
+            worse = -change if METRICS[metric] else change
+            rows.append((name, metric, base_values[metric], values[metric], change, worse > tolerance))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("baseline")
+    parser.add_argument("current")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="allowed relative slowdown before failing (0.25 = 25%%)")
+    parser.add_argument("--metrics", nargs="*", default=["median_us", "p95_ms", "throughput_rps"],
+                        choices=sorted(METRICS))
+    args = parser.parse_args()
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+    if baseline.get("kind") != current.get("kind"):
+        sys.exit(f"Cannot compare a {baseline.get('kind')} baseline with {current.get('kind')} results")
+
+    rows = compare(baseline, current, args.tolerance, args.metrics)
+    regressions = [row for row in rows if row[5]]
+    for name, metric, base_value, value, change, regressed in rows:
+        marker = "REGRESSED" if regressed else ""
+        print(f"{name:40s} {metric:15s} {base_value:12.3f} -> {value:12.3f}  {change:+7.1%}  {marker}")
+
+    missing = sorted(set(baseline["results"]) - set(current["results"]))
+    if missing:
+        print(f"Missing from current results: {', '.join(missing)}")
+
+    if regressions:
+        print(f"{len(regressions)} regression(s) beyond {args.tolerance:.0%}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
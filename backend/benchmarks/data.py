@@ -0,0 +1,28 @@
+"""Seeded synthetic birth data for the benchmarks"""
+import random
+from typing import List
+
+from timezones import nautical_timezone
+
+
+def synthetic_birth_data(count: int, seed: int = 0) -> List[dict]:
+    """BirthData payloads spread over 1900–2099 and latitudes from 66°S to 66°N.
+
+    Timezones are the nautical zone of each longitude, so results do not depend
+    on the optional timezone or gazetteer data files.
+    """
+    rng = random.Random(seed)
+    records = []
+    for i in range(count):
+        lat = round(rng.uniform(-66, 66), 4)
+        lng = round(rng.uniform(-180, 180), 4)
+        records.append({
+            "name": f"Person {i}",
+            "date": f"{rng.randint(1900, 2099):04d}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+            "time": f"{rng.randint(0, 23):02d}:{rng.randint(0, 59):02d}",
+            "city": "Synthetic",
+            "gender": rng.choice(["female", "male"]),
+            "coordinates": {"lat": lat, "lng": lng},
+            "timezone": nautical_timezone(lng)
+        })
+    return records
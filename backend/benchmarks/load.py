@@ -0,0 +1,209 @@
+"""In-process load test of every API endpoint through the ASGI app.
+
+Requests go through httpx's ASGI transport, so the whole FastAPI stack
+(validation, routing, serialization, middleware) is exercised without a
+network or a server process. Birth data is synthetic and seeded, sketch
+generation uses the offline stub client, and the chart store is a throwaway
+database that the import scenario fills for the search and export scenarios.
+Run from the backend directory:
+
+    python -m benchmarks.load --requests 200 --concurrency 8 --output load.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import sys
+import time
+from typing import Callable, Dict, List
+
+from benchmarks.common import percentile, use_temporary_data
+
+# Configure the app before importing it: offline sketches, no cross-request
+# caching, and stores in a temporary directory
+os.environ.setdefault("SKETCH_CLIENT", "stub")
+os.environ.setdefault("SKETCH_CACHE_POLICY", "off")
+os.environ.setdefault("CHART_CACHE_SIZE", "0")
+use_temporary_data()
+
+import httpx  # noqa: E402
+
+import main  # noqa: E402
+from benchmarks.data import synthetic_birth_data  # noqa: E402
+
+IMPORT_BATCH = 10  # charts per import request
+
+
+def scenarios(people: List[dict], rng: random.Random) -> Dict[str, Callable[[int], tuple]]:
+    """Endpoint name -> function building (method, path, body) for request i; the
+    body is sent as JSON, or as is when it is already text. Scenarios run in
+    order, so the chart store scenarios follow the import."""
+    def person(i):
+        return people[i % len(people)]
+
+    def other(i):
+        return people[(i * 7 + 3) % len(people)]
+
+    def birth_year(i):
+        return int(person(i)["date"][:4])
+
+    def transit_start(i):
+        return f"{2000 + i % 30}-01-01"
+
+    built = {
+        "POST /api/birth-chart": lambda i: ("POST", "/api/birth-chart", person(i)),
+        "POST /api/birth-charts/batch": lambda i: (
+            "POST", "/api/birth-charts/batch", [person(i * 20 + k) for k in range(20)]
+        ),
+        "POST /api/compatibility-analysis": lambda i: (
+            "POST", "/api/compatibility-analysis", {"user_birth_data": person(i), "partner_birth_data": other(i)}
+        ),
+        "POST /api/compatibility-ranking": lambda i: (
+            "POST", "/api/compatibility-ranking",
+            {"user": person(i), "candidates": [other(i * 50 + k) for k in range(50)], "top_k": 10}
+        ),
+        "POST /api/soulmate-analysis": lambda i: ("POST", "/api/soulmate-analysis", person(i)),
+        "POST /api/advanced-analysis": lambda i: ("POST", "/api/advanced-analysis", person(i)),
+        "POST /api/transits": lambda i: (
+            "POST", "/api/transits",
+            {"birth_data": person(i), "start_date": transit_start(i), "end_date": f"{2001 + i % 30}-01-01"}
+        ),
+        "POST /api/solar-returns": lambda i: (
+            "POST", "/api/solar-returns",
+            {"birth_data": person(i), "start_year": birth_year(i) + 20 + i % 40, "end_year": birth_year(i) + 22 + i % 40}
+        ),
+        "POST /api/birth-time-ranges": lambda i: (
+            "POST", "/api/birth-time-ranges",
+            {key: person(i)[key] for key in ("date", "coordinates", "timezone")}
+        ),
+        "POST /api/charts/import": lambda i: (
+            "POST", "/api/charts/import",
+            "".join(json.dumps(person(i * IMPORT_BATCH + k)) + "\n" for k in range(IMPORT_BATCH))
+        ),
+        "GET /api/charts/{chart_id}": lambda i: ("GET", f"/api/charts/{i % IMPORT_BATCH + 1}", None),
+        "POST /api/charts/search": lambda i: (
+            "POST", "/api/charts/search",
+            {"birth_data": person(i), "conditions": [{"body": "Venus", "point": "Sun", "aspects": ["Trine"]}]}
+        ),
+        "GET /api/charts/export": lambda i: ("GET", "/api/charts/export", None),
+        "POST /api/generate-soulmate-sketch": lambda i: (
+            "POST", "/api/generate-soulmate-sketch", {"soulmate_description": f"sketch {i} {rng.random()}"}
+        ),
+        "POST /api/sketch-jobs": lambda i: (
+            "POST", "/api/sketch-jobs", {"soulmate_description": f"job {i} {rng.random()}"}
+        ),
+        "GET /api/timezone": lambda i: (
+            "GET", f"/api/timezone?lat={person(i)['coordinates']['lat']}&lng={person(i)['coordinates']['lng']}", None
+        ),
+        "GET /api/health": lambda i: ("GET", "/api/health", None),
+        "GET /api/ready": lambda i: ("GET", "/api/ready", None),
+        "GET /api/stats": lambda i: ("GET", "/api/stats", None),
+        "GET /metrics": lambda i: ("GET", "/metrics", None)
+    }
+    if main.gazetteer is not None:
+        built["GET /api/cities/autocomplete"] = lambda i: (
+            "GET", f"/api/cities/autocomplete?q={'abcdefghijklmnoprstvw'[i % 21]}", None
+        )
+    return built
+
+
+async def run_endpoint(client: httpx.AsyncClient, build: Callable[[int], tuple], requests: int,
+                       concurrency: int) -> dict:
+    latencies: List[float] = []
+    errors = 0
+    next_index = 0
+
+    async def worker():
+        nonlocal errors, next_index
+        while next_index < requests:
+            i = next_index
+            next_index += 1
+            method, path, body = build(i)
+            content = body if isinstance(body, str) else None
+            start = time.perf_counter()
+            response = await client.request(method, path, json=None if content else body, content=content)
+            await response.aread()
+            latencies.append(time.perf_counter() - start)
+            if response.status_code >= 400:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "requests": requests,
+        "errors": errors,
+        "throughput_rps": round(requests / elapsed, 2),
+        "mean_ms": round(sum(latencies) / len(latencies) * 1000, 3),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 3)
+    }
+
+
+async def run(requests: int, concurrency: int, seed: int, only: List[str]) -> dict:
+    people = synthetic_birth_data(max(1000, requests * 50), seed)
+    rng = random.Random(seed)
+    transport = httpx.ASGITransport(app=main.app)
+    # The ASGI transport does not run the lifespan; warm up as a server would
+    await main.start_warmup()
+    if main.warmup_task is not None:
+        await main.warmup_task
+    results = {}
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=None) as client:
+        for name, build in scenarios(people, rng).items():
+            if only and not any(pattern in name for pattern in only):
+                continue
+            # A few unmeasured requests first, so lazy startup (process pool, zone files) is not timed
+            await run_endpoint(client, build, min(concurrency, requests), concurrency)
+            results[name] = await run_endpoint(client, build, requests, concurrency)
+            print(f"{name:40s} {results[name]['throughput_rps']:9.1f} req/s  "
+                  f"p50 {results[name]['p50_ms']:8.2f} ms  p99 {results[name]['p99_ms']:8.2f} ms", file=sys.stderr)
+    return results
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200, help="measured requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=8, help="requests in flight at once")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--only", nargs="*", default=[], help="substrings selecting endpoints, e.g. birth-chart")
+    parser.add_argument("--output", default="-", help="JSON results file (default: stdout)")
+    args = parser.parse_args()
+
+    try:
+        results = asyncio.run(run(args.requests, args.concurrency, args.seed, args.only))
+    finally:
+        main.shutdown_chart_process_pool()
+
+    report = {
+        "kind": "load",
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "seed": args.seed,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "chartCacheSize": main.CHART_CACHE_SIZE,
+            "chartWorkers": main.CHART_WORKERS,
+            "positionTable": main.position_table is not None
+        },
+        "results": results
+    }
+
+    text = json.dumps(report, indent=2)
+    if args.output == "-":
+        print(text)
+    else:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,131 @@
+"""Microbenchmarks for the chart building blocks.
+
+Run from the backend directory:
+
+    python -m benchmarks.micro --output micro.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import timeit
+
+from benchmarks.common import use_temporary_data
+
+# The chart cache would turn every repeat into a dictionary lookup
+os.environ.setdefault("CHART_CACHE_SIZE", "0")
+use_temporary_data()
+
+import main  # noqa: E402
+from benchmarks.data import synthetic_birth_data  # noqa: E402
+from houses import compute_houses  # noqa: E402
+
+
+def measure(fn, repeat: int, min_time: float) -> dict:
+    """Per-call time of fn in microseconds: median and best of `repeat` timing runs"""
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    number = max(1, int(number * min_time / 0.2))
+    runs = [total / number * 1e6 for total in timer.repeat(repeat=repeat, number=number)]
+    return {
+        "median_us": round(statistics.median(runs), 3),
+        "min_us": round(min(runs), 3),
+        "calls_per_run": number
+    }
+
+
+def run(repeat: int, min_time: float, seed: int) -> dict:
+    birth_data = main.BirthData(**synthetic_birth_data(1, seed)[0])
+    resolved = main.resolve_birth_data(birth_data)
+    julian_day, lat, lng = resolved["julianDay"], resolved["lat"], resolved["lng"]
+    chart = main.compute_birth_chart(julian_day, lat, lng)
+    house_cusps = compute_houses(julian_day, lat, lng, main.DEFAULT_HOUSE)
+    names = [planet.planet for planet in chart.planets]
+    longitudes = [planet.longitude for planet in chart.planets]
+    # Tropical and sidereal, each in three house systems
+    variants = tuple(
+        (zodiac, ayanamsa, house_system)
+        for zodiac, ayanamsa in (("tropical", None), ("sidereal", "lahiri"))
+        for house_system in ("P", "K", "W")
+    )[1:]
+
+    loop = asyncio.new_event_loop()
+    cached_cache = main.ChartCache(max_size=16, ttl=3600)
+
+    def chart_internal():
+        loop.run_until_complete(main.calculate_birth_chart_internal(birth_data))
+
+    def chart_internal_cached():
+        main.chart_cache, previous = cached_cache, main.chart_cache
+        try:
+            loop.run_until_complete(main.calculate_birth_chart_internal(birth_data))
+        finally:
+            main.chart_cache = previous
+
+    benchmarks = {
+        "degrees_to_sign": lambda: main.degrees_to_sign(254.321),
+        "calculate_aspects": lambda: main.calculate_aspects(names, longitudes),
+        "calculate_house_system": lambda: main.calculate_house_system(house_cusps),
+        "compute_houses": lambda: compute_houses(julian_day, lat, lng, main.DEFAULT_HOUSE),
+        "resolve_birth_data": lambda: main.resolve_birth_data(birth_data),
+        "compute_birth_chart": lambda: main.compute_birth_chart(julian_day, lat, lng),
+        "compute_birth_chart_6_variants": lambda: main.compute_birth_chart(
+            julian_day, lat, lng, "P", variants=variants
+        ),
+        "solar_return_10_years": lambda: main.compute_solar_returns(
+            julian_day, int(birth_data.date[:4]), list(range(int(birth_data.date[:4]) + 1, int(birth_data.date[:4]) + 11)),
+            lat, lng, lat, lng, resolved["chartOptions"], False
+        ),
+        "scan_birth_day": lambda: main.scan_birth_day(
+            julian_day, julian_day + 1, lat, lng, main.DEFAULT_HOUSE, main.TROPICAL, None, list(main.BODY_CODES)
+        ),
+        "calculate_birth_chart_internal": chart_internal,
+        "calculate_birth_chart_internal_cached": chart_internal_cached
+    }
+
+    results = {}
+    try:
+        for name, fn in benchmarks.items():
+            results[name] = measure(fn, repeat, min_time)
+            print(f"{name:40s} {results[name]['median_us']:12.2f} µs", file=sys.stderr)
+    finally:
+        loop.close()
+        main.ephemeris_executor.shutdown()
+    return results
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=7, help="timing runs per benchmark")
+    parser.add_argument("--min-time", type=float, default=0.2, help="approximate seconds per timing run")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="-", help="JSON results file (default: stdout)")
+    args = parser.parse_args()
+
+    report = {
+        "kind": "micro",
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "seed": args.seed,
+            "positionTable": main.position_table is not None
+        },
+        "results": run(args.repeat, args.min_time, args.seed)
+    }
+
+    text = json.dumps(report, indent=2)
+    if args.output == "-":
+        print(text)
+    else:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main_cli()
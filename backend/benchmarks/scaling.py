@@ -0,0 +1,163 @@
+"""Throughput of serve.py per worker count, over real HTTP.
+
+For each worker count a server is started on a free port with a throwaway
+chart store, and once /api/ready answers, client processes drive it with
+birth-chart requests for a fixed time per scenario:
+
+- ``cold``: every request is a chart no worker has seen, so each one is
+  computed; this is the CPU-bound case that scales with cores;
+- ``repeat``: requests cycle through a few hundred charts, so after the first
+  round they are served from the per-worker and shared caches.
+
+Client processes compete with the server for the same cores, so measure on a
+machine with spare cores or run the clients elsewhere. Run from the backend
+directory:
+
+    python -m benchmarks.scaling --workers 1 2 4 8 --clients 16 --output scaling.json
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from typing import List
+
+import httpx
+
+from benchmarks.common import percentile
+from benchmarks.data import synthetic_birth_data
+
+SCENARIOS = ("cold", "repeat")
+REPEAT_CHARTS = 500
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(workers: int, port: int, directory: str) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        "CHART_STORE_PATH": os.path.join(directory, "charts.db"),
+        "SKETCH_CLIENT": "stub",
+        "SKETCH_CACHE_POLICY": "off"
+    }
+    server = subprocess.Popen(
+        [sys.executable, "serve.py", "--workers", str(workers), "--host", "127.0.0.1",
+         "--port", str(port), "--log-level", "warning"],
+        env=env
+    )
+    deadline = time.time() + 120
+    while time.time() < deadline:
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/api/ready", timeout=1).status_code == 200:
+                return server
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    server.terminate()
+    raise RuntimeError(f"Server with {workers} workers did not become ready")
+
+
+def stop_server(server: subprocess.Popen) -> None:
+    server.terminate()
+    try:
+        server.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        server.kill()
+
+
+def run_client(args: tuple) -> tuple:
+    """Requests sent by one client process for duration seconds: (count, errors, latencies)"""
+    port, people, duration = args
+    latencies: List[float] = []
+    errors = 0
+    with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=60) as client:
+        end = time.perf_counter() + duration
+        i = 0
+        while time.perf_counter() < end:
+            start = time.perf_counter()
+            response = client.post("/api/birth-chart", json=people[i % len(people)])
+            latencies.append(time.perf_counter() - start)
+            errors += response.status_code >= 400
+            i += 1
+    return len(latencies), errors, latencies
+
+
+def measure(port: int, scenario: str, clients: int, duration: float, seed: int) -> dict:
+    if scenario == "cold":
+        # Enough distinct charts that no client ever repeats one
+        people = [synthetic_birth_data(20000, seed + 1000 * (client + 1)) for client in range(clients)]
+    else:
+        shared = synthetic_birth_data(REPEAT_CHARTS, seed)
+        people = [shared[client:] + shared[:client] for client in range(clients)]
+    with multiprocessing.Pool(clients) as pool:
+        results = pool.map(run_client, [(port, people[client], duration) for client in range(clients)])
+    latencies = sorted(latency for _, _, client_latencies in results for latency in client_latencies)
+    requests = sum(count for count, _, _ in results)
+    return {
+        "requests": requests,
+        "errors": sum(errors for _, errors, _ in results),
+        "throughput_rps": round(requests / duration, 2),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 3)
+    }
+
+
+def markdown(results: dict) -> str:
+    lines = ["| Workers | " + " | ".join(f"{scenario} req/s | {scenario} p99 ms" for scenario in SCENARIOS) + " |",
+             "|---:|" + "---:|---:|" * len(SCENARIOS)]
+    for workers, scenarios in results.items():
+        cells = " | ".join(
+            f"{scenarios[scenario]['throughput_rps']:.0f} | {scenarios[scenario]['p99_ms']:.1f}" for scenario in SCENARIOS
+        )
+        lines.append(f"| {workers} | {cells} |")
+    return "\n".join(lines)
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--clients", type=int, default=8, help="client processes")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per scenario")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write JSON results to this file")
+    args = parser.parse_args()
+
+    results = {}
+    for workers in args.workers:
+        with tempfile.TemporaryDirectory() as directory:
+            port = free_port()
+            server = start_server(workers, port, directory)
+            try:
+                results[workers] = {}
+                for scenario in SCENARIOS:
+                    results[workers][scenario] = measure(port, scenario, args.clients, args.duration, args.seed)
+                    print(f"{workers:3d} workers  {scenario:7s} {results[workers][scenario]['throughput_rps']:9.1f} req/s  "
+                          f"p99 {results[workers][scenario]['p99_ms']:8.2f} ms", file=sys.stderr)
+            finally:
+                stop_server(server)
+
+    report = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "clients": args.clients,
+        "duration_s": args.duration,
+        "results": results
+    }
+    print(markdown(results))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main_cli()
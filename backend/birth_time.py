@@ -0,0 +1,137 @@
+"""What a chart looks like over a day, for births with an unknown time.
+
+With the date and place known, the ascendant's sign, the Moon's sign and each
+body's house are step functions of the birth time. Rather than casting a chart
+for every minute, the day is sampled every few minutes and every change
+between two samples is located by bisection to the second.
+
+Each evaluation is cheap: body longitudes are interpolated (cubic Hermite, from
+the longitude and speed at a few nodes across the day; the Moon stays within
+a fraction of an arcsecond) and the houses come from one HouseFrame advanced
+by the elapsed sidereal time. A whole day therefore costs a few dozen
+ephemeris calls, and the bisection steps none.
+"""
+import math
+from typing import Callable, Dict, Hashable, List, Sequence, Tuple
+
+import numpy as np
+
+from houses import HouseCusps, HouseFrame
+
+SAMPLE_STEP = 10 / 1440  # days between samples; changes closer together than this may merge
+NODE_STEP = 0.5  # days between the ephemeris positions interpolated
+TIME_TOLERANCE = 1 / 86400  # days
+
+
+class BodyPath:
+    """Longitude of one body over a short span, interpolated between nodes"""
+
+    def __init__(self, julian_days: Sequence[float], longitudes: Sequence[float], speeds: Sequence[float]):
+        self.julian_days = np.asarray(julian_days, dtype=float)
+        # Unwrap, so the interpolation never runs the long way round through 0°
+        steps = (np.diff(np.asarray(longitudes, dtype=float)) + 180) % 360 - 180
+        self.longitudes = np.concatenate([[longitudes[0]], longitudes[0] + np.cumsum(steps)])
+        self.speeds = np.asarray(speeds, dtype=float)
+
+    def longitude(self, julian_day: float) -> float:
+        i = min(max(int(np.searchsorted(self.julian_days, julian_day)) - 1, 0), len(self.julian_days) - 2)
+        t0, t1 = self.julian_days[i], self.julian_days[i + 1]
+        h = t1 - t0
+        s = (julian_day - t0) / h
+        h00, h10 = 2 * s ** 3 - 3 * s ** 2 + 1, s ** 3 - 2 * s ** 2 + s
+        h01, h11 = -2 * s ** 3 + 3 * s ** 2, s ** 3 - s ** 2
+        value = (h00 * self.longitudes[i] + h10 * h * self.speeds[i]
+                 + h01 * self.longitudes[i + 1] + h11 * h * self.speeds[i + 1])
+        return value % 360
+
+
+def find_changes(start: float, end: float, label: Callable[[float], Hashable], step: float = SAMPLE_STEP,
+                 tolerance: float = TIME_TOLERANCE) -> List[Tuple[float, Hashable]]:
+    """(time, new label) for every change of label(t) between start and end"""
+    samples = np.linspace(start, end, max(1, math.ceil((end - start) / step)) + 1)
+    labels = [label(t) for t in samples]
+    changes = []
+
+    def bisect(low, high, low_label, high_label):
+        if high - low <= tolerance:
+            changes.append(((low + high) / 2, high_label))
+            return
+        middle = (low + high) / 2
+        middle_label = label(middle)
+        # Several changes can share a sample interval: follow every half whose ends differ
+        if middle_label != low_label:
+            bisect(low, middle, low_label, middle_label)
+        if middle_label != high_label:
+            bisect(middle, high, middle_label, high_label)
+
+    for low, high, low_label, high_label in zip(samples[:-1], samples[1:], labels[:-1], labels[1:]):
+        if low_label != high_label:
+            bisect(low, high, low_label, high_label)
+    return changes
+
+
+def constant_intervals(start: float, end: float, label: Callable[[float], Hashable],
+                       step: float = SAMPLE_STEP, tolerance: float = TIME_TOLERANCE) -> List[Tuple[float, float, Hashable]]:
+    """(start, end, label) for each stretch of [start, end] over which label(t) is constant"""
+    intervals = []
+    interval_start, current = start, label(start)
+    for time, new_label in find_changes(start, end, label, step, tolerance):
+        intervals.append((interval_start, time, current))
+        interval_start, current = time, new_label
+    intervals.append((interval_start, end, current))
+    return intervals
+
+
+class BirthTimeScan:
+    """Ascendant sign, Moon sign and body houses over a span of possible birth times.
+
+    ``position(jd, code, name)`` returns (longitude, speed). ``offset`` is
+    subtracted from every longitude, e.g. an ayanamsa for a sidereal zodiac.
+    """
+
+    def __init__(self, start_jd: float, end_jd: float, frame: HouseFrame, house_system: str,
+                 bodies: Dict[str, int], position: Callable, offset: float = 0.0,
+                 step: float = SAMPLE_STEP, node_step: float = NODE_STEP):
+        self.start_jd = start_jd
+        self.end_jd = end_jd
+        self.frame = frame
+        self.house_system = house_system
+        self.offset = offset
+        self.step = step
+        nodes = np.linspace(start_jd, end_jd, max(1, math.ceil((end_jd - start_jd) / node_step)) + 1)
+        self.paths = {}
+        for name, code in bodies.items():
+            longitudes, speeds = zip(*[position(julian_day, code, name) for julian_day in nodes])
+            self.paths[name] = BodyPath(nodes, longitudes, speeds)
+        self.ephemeris_calls = len(nodes) * len(bodies)
+        self.evaluations = 0
+        self._cusps: Dict[float, HouseCusps] = {}
+
+    def longitude(self, name: str, julian_day: float) -> float:
+        return (self.paths[name].longitude(julian_day) - self.offset) % 360
+
+    def houses(self, julian_day: float) -> HouseCusps:
+        cusps = self._cusps.get(julian_day)
+        if cusps is None:
+            self.evaluations += 1
+            cusps = self.frame.advanced(julian_day - self.frame.julian_day).houses(self.house_system).shifted(self.offset)
+            self._cusps[julian_day] = cusps
+        return cusps
+
+    def ascendant_signs(self) -> List[Tuple[float, float, int]]:
+        """Intervals of constant ascendant sign (0 = Aries)"""
+        return constant_intervals(
+            self.start_jd, self.end_jd, lambda t: int(self.houses(t).ascendant // 30) % 12, self.step
+        )
+
+    def signs(self, name: str) -> List[Tuple[float, float, int]]:
+        """Intervals of constant sign of a body"""
+        return constant_intervals(
+            self.start_jd, self.end_jd, lambda t: int(self.longitude(name, t) // 30) % 12, self.step
+        )
+
+    def body_houses(self, name: str) -> List[Tuple[float, float, int]]:
+        """Intervals of constant house of a body"""
+        return constant_intervals(
+            self.start_jd, self.end_jd, lambda t: self.houses(t).house_of(self.longitude(name, t)), self.step
+        )
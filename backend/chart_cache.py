@@ -0,0 +1,84 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional, Tuple
+
+
+def make_chart_key(julian_day: float, lat: float, lng: float, house_system: str, zodiac: str,
+                   fixed_stars: bool = False, variants: Tuple = ()) -> Tuple:
+    """Build a canonical cache key from the resolved chart inputs.
+
+    The key is the UTC Julian day (rounded to ~10 ms) and the coordinates
+    (rounded to ~0.1 m), so different spellings of the same date, time and
+    timezone map onto the same entry. variants is a tuple of hashable
+    descriptions of any extra views computed with the chart.
+    """
+    return (
+        round(julian_day, 7), round(float(lat), 6), round(float(lng), 6), house_system, zodiac, fixed_stars, variants
+    )
+
+
+class ChartCache:
+    """Thread-safe LRU cache with a per-entry TTL and hit/miss/eviction counters"""
+
+    def __init__(self, max_size: int = 1024, ttl: float = 3600.0, clock: Callable[[], float] = time.monotonic):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._clock = clock
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value for key, or None if missing or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            expires_at, value = entry
+            if self.ttl > 0 and expires_at <= self._clock():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """Store value under key, evicting the least recently used entries if full"""
+        if self.max_size <= 0:
+            return
+
+        with self._lock:
+            self._entries[key] = (self._clock() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "maxSize": self.max_size,
+            "ttlSeconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hitRate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
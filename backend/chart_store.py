@@ -0,0 +1,270 @@
+"""Persistent chart store in SQLite.
+
+Each stored chart keeps its canonical inputs (the birth data with coordinates
+and timezone resolved, so it resolves the same way again), the chart cache key
+those inputs produce, and two encodings of the result: the chart JSON,
+zlib-compressed (about a fifth of its size), and the body longitudes as a
+packed float64 array that can be loaded for every chart at once without
+decoding any JSON. Ids are never reused, so in-memory indexes can refer to
+them.
+
+Stored charts serve as a second cache level: a chart cache miss looks the key
+up here before computing. Imports are written in one transaction per batch,
+and exports page through the table by id, so neither holds the whole store in
+memory.
+
+Deletions leave a tombstone in a second table, so a process that keeps its own
+index of the store (another server worker) can catch up on them by sequence
+number, the same way it catches up on new charts by id.
+"""
+import csv
+import io
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Callable, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+# Columns of CSV imports and exports; lat/lng become BirthData.coordinates
+CSV_FIELDS = (
+    "name", "date", "time", "city", "gender", "lat", "lng", "timezone",
+    "house_system", "zodiac", "ayanamsa", "fixed_stars"
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS charts (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    chart_key TEXT NOT NULL,
+    birth_data TEXT NOT NULL,
+    julian_day REAL NOT NULL,
+    chart BLOB NOT NULL,
+    longitudes BLOB NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS charts_chart_key ON charts (chart_key);
+CREATE TABLE IF NOT EXISTS deleted_charts (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    chart_id INTEGER NOT NULL
+);
+"""
+
+
+def encode_key(key: tuple) -> str:
+    """Text form of a chart cache key (nested tuples become JSON arrays)"""
+    return json.dumps(key, separators=(",", ":"))
+
+
+def parse_csv_record(record: dict) -> dict:
+    """BirthData fields from a CSV row; empty cells are left out"""
+    fields = {name: value for name, value in record.items() if name in CSV_FIELDS and value not in (None, "")}
+    lat, lng = fields.pop("lat", None), fields.pop("lng", None)
+    if lat is not None and lng is not None:
+        fields["coordinates"] = {"lat": float(lat), "lng": float(lng)}
+    if "fixed_stars" in fields:
+        fields["fixed_stars"] = fields["fixed_stars"].strip().lower() in ("1", "true", "yes")
+    return fields
+
+
+def csv_record(birth_data: dict) -> dict:
+    """CSV row for stored birth data; the inverse of parse_csv_record"""
+    coordinates = birth_data.get("coordinates") or {}
+    row = {name: birth_data.get(name) for name in CSV_FIELDS}
+    row["lat"], row["lng"] = coordinates.get("lat"), coordinates.get("lng")
+    return {name: "" if value is None else value for name, value in row.items()}
+
+
+def read_records(lines: Iterable[str], fmt: str, header: Optional[List[str]] = None) -> Iterator[Tuple[Optional[dict], Optional[str]]]:
+    """(birth data fields, None) or (None, error) for each line of a JSONL or
+    CSV document; CSV lines need the header row, and quoted fields cannot span
+    lines"""
+    for line in lines:
+        try:
+            if fmt == "csv":
+                values = next(csv.reader([line]))
+                yield parse_csv_record(dict(zip(header, values))), None
+            else:
+                record = json.loads(line)
+                if not isinstance(record, dict):
+                    raise ValueError("expected a JSON object")
+                yield record, None
+        except (ValueError, StopIteration) as e:
+            yield None, f"Invalid record: {e}"
+
+
+class ChartStore:
+    """Charts and their canonical inputs in one SQLite table.
+
+    One connection is shared by all threads and serialized with a lock; the
+    database runs in WAL mode, so exports never block the request path for
+    long. A forked child opens its own connection, since SQLite connections
+    cannot be used across a fork.
+    """
+
+    def __init__(self, path: str, clock: Callable[[], float] = time.time):
+        self.path = path
+        self._clock = clock
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._connect()
+        self._db.executescript(SCHEMA)
+        os.register_at_fork(after_in_child=self._connect)
+        self.hits = 0
+        self.misses = 0
+
+    def _connect(self) -> None:
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        # Workers write concurrently; wait for the write lock instead of failing
+        self._db.execute("PRAGMA busy_timeout=5000")
+
+    def add_many(self, records: Sequence[tuple]) -> List[int]:
+        """Store (chart_key, birth_data, julian_day, chart_json, longitudes) records in
+        one transaction; returns their ids in order"""
+        now = self._clock()
+        rows = [
+            (encode_key(key), json.dumps(birth_data, separators=(",", ":")), julian_day, zlib.compress(chart_json), longitudes, now)
+            for key, birth_data, julian_day, chart_json, longitudes in records
+        ]
+        ids = []
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                for row in rows:
+                    cursor = self._db.execute(
+                        "INSERT INTO charts (chart_key, birth_data, julian_day, chart, longitudes, created_at) "
+                        "VALUES (?, ?, ?, ?, ?, ?)", row
+                    )
+                    ids.append(cursor.lastrowid)
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+        return ids
+
+    def add(self, key: tuple, birth_data: dict, julian_day: float, chart_json: bytes, longitudes: bytes) -> int:
+        return self.add_many([(key, birth_data, julian_day, chart_json, longitudes)])[0]
+
+    def get(self, chart_id: int) -> Optional[Tuple[dict, bytes]]:
+        """Birth data and chart JSON of a stored chart"""
+        with self._lock:
+            row = self._db.execute("SELECT birth_data, chart FROM charts WHERE id = ?", (chart_id,)).fetchone()
+        if row is None:
+            return None
+        return json.loads(row[0]), zlib.decompress(row[1])
+
+    def birth_data(self, chart_id: int) -> Optional[dict]:
+        with self._lock:
+            row = self._db.execute("SELECT birth_data FROM charts WHERE id = ?", (chart_id,)).fetchone()
+        return json.loads(row[0]) if row is not None else None
+
+    def find(self, key: tuple) -> Optional[bytes]:
+        """Chart JSON of the most recent chart stored under a cache key"""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT chart FROM charts WHERE chart_key = ? ORDER BY id DESC LIMIT 1", (encode_key(key),)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return zlib.decompress(row[0])
+
+    def delete(self, chart_id: int) -> bool:
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                deleted = self._db.execute("DELETE FROM charts WHERE id = ?", (chart_id,)).rowcount > 0
+                if deleted:
+                    self._db.execute("INSERT INTO deleted_charts (chart_id) VALUES (?)", (chart_id,))
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+        return deleted
+
+    def deletions(self, after_seq: int = 0) -> Tuple[List[int], int]:
+        """Ids of the charts deleted after tombstone after_seq, and the last tombstone's seq"""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT seq, chart_id FROM deleted_charts WHERE seq > ? ORDER BY seq", (after_seq,)
+            ).fetchall()
+        return [chart_id for _, chart_id in rows], rows[-1][0] if rows else after_seq
+
+    def last_deletion(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COALESCE(MAX(seq), 0) FROM deleted_charts").fetchone()[0]
+
+    def iter_charts(self, page_size: int = 500, with_charts: bool = True) -> Iterator[Tuple[int, dict, float, Optional[bytes]]]:
+        """(id, birth_data, julian_day, chart_json) of every chart, by id; the
+        lock is only held while one page is read"""
+        columns = "id, birth_data, julian_day, chart" if with_charts else "id, birth_data, julian_day, NULL"
+        last_id = 0
+        while True:
+            with self._lock:
+                rows = self._db.execute(
+                    f"SELECT {columns} FROM charts WHERE id > ? ORDER BY id LIMIT ?", (last_id, page_size)
+                ).fetchall()
+            if not rows:
+                return
+            for chart_id, birth_data, julian_day, chart in rows:
+                yield chart_id, json.loads(birth_data), julian_day, zlib.decompress(chart) if chart else None
+            last_id = rows[-1][0]
+
+    def longitudes(self, width: int, after_id: int = 0, page_size: int = 10000) -> Tuple[List[int], List[bytes]]:
+        """Ids and packed longitudes of every chart with width bodies and an id
+        above after_id, by id"""
+        ids, packed = [], []
+        last_id = after_id
+        while True:
+            with self._lock:
+                rows = self._db.execute(
+                    "SELECT id, longitudes FROM charts WHERE id > ? ORDER BY id LIMIT ?", (last_id, page_size)
+                ).fetchall()
+            if not rows:
+                return ids, packed
+            for chart_id, longitudes in rows:
+                if len(longitudes) == width * 8:
+                    ids.append(chart_id)
+                    packed.append(longitudes)
+            last_id = rows[-1][0]
+
+    def export_jsonl(self, page_size: int = 500) -> Iterator[bytes]:
+        """One {"id", "birthData", "julianDay", "chart"} object per line"""
+        for chart_id, birth_data, julian_day, chart_json in self.iter_charts(page_size):
+            yield (
+                f'{{"id":{chart_id},"birthData":{json.dumps(birth_data, separators=(",", ":"))},"julianDay":{julian_day!r},"chart":'
+            ).encode() + chart_json + b"}\n"
+
+    def export_csv(self, page_size: int = 500) -> Iterator[str]:
+        """The stored birth data as CSV, in the import format plus id and julian_day columns"""
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=("id",) + CSV_FIELDS + ("julian_day",))
+        writer.writeheader()
+        for chart_id, birth_data, julian_day, _ in self.iter_charts(page_size, with_charts=False):
+            writer.writerow({"id": chart_id, **csv_record(birth_data), "julian_day": julian_day})
+            if buffer.tell() > 65536:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM charts").fetchone()[0]
+
+    def stats(self) -> dict:
+        return {
+            "charts": len(self),
+            "hits": self.hits,
+            "misses": self.misses,
+            "sizeBytes": os.path.getsize(self.path) if os.path.exists(self.path) else 0
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
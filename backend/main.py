@@ -1,19 +1,56 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from typing import List, Optional
+from pydantic import BaseModel, PrivateAttr, ValidationError, model_validator
+from typing import Dict, List, Optional
 import swisseph as swe
-from datetime import datetime, timezone
-from dateutil import tz
-from dateutil import parser
+from datetime import datetime, timedelta, timezone
 import replicate
 import os
+import math
+import asyncio
+import threading
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
+from chart_cache import ChartCache, make_chart_key
+from shared_cache import SharedCache
+from single_flight import SingleFlight
+from chart_store import ChartStore, read_records
+from aspect_index import AspectIndex
+from executors import BoundedExecutor, ExecutorBusy
+from aspects import MAJOR_ASPECTS, MINOR_ASPECTS, OrbTable, find_aspects, same_body_aspects
+from ephemeris_tables import load_position_table
+from timezones import TimezoneIndex, nautical_timezone
+from gazetteer import Gazetteer
+from fixed_stars import FixedStarCatalog
+from houses import HOUSE_SYSTEMS, HouseCusps, HouseFrame, equal_houses
+from transits import EVENT_TYPES, TransitSearch, julian_day_to_utc, transit_windows
+from returns import ReturnNotFound, progressed_julian_day, return_estimate, solar_return
+from birth_time import BirthTimeScan
+from sketch_jobs import ReplicateImageClient, SketchJobQueue, SketchJobStore, StubImageClient
+from sketch_cache import SketchCache
+from warmup import Warmup, ephemeris_files, pretouch_file, warm_up_bodies, yearly_julian_days
+from zodiac import AYANAMSAS, SIDEREAL, TROPICAL, ZODIACS, ayanamsa_offset, zodiac_key
+from timeconv import get_timezone, julian_day_to_utc_datetime, local_to_julian_day, parse_datetime, utc_julian_day
+from metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, REGISTRY as METRICS, MetricsMiddleware, count_fallback, stage
+from serialization import CachedEncodingModel, encoded_response, negotiate_format
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse, StreamingResponse
+import csv
+import json
+import numpy as np
 
 # Load environment variables from root directory
 load_dotenv(dotenv_path="../.env")
 
-app = FastAPI(title="EigenSage AI - Swiss Ephemeris API")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start the warm-up with the server, and stop the worker pools with it"""
+    await start_warmup()
+    yield
+    shutdown_chart_process_pool()
+
+app = FastAPI(title="EigenSage AI - Swiss Ephemeris API", lifespan=lifespan)
 
 # Enable CORS for frontend
 app.add_middleware(
@@ -24,22 +61,181 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Per-route latency histograms for /metrics
+app.add_middleware(MetricsMiddleware)
+
 # Initialize Swiss Ephemeris with local ephemeris data
-swe.set_ephe_path("./ephe")
+EPHE_PATH = "./ephe"
+
+def configure_ephemeris():
+    """Point Swiss Ephemeris at the bundled data files.
+
+    swisseph keeps its settings per thread, so every thread or process that
+    calls it must run this first; otherwise it silently falls back to the
+    built-in Moshier ephemeris and cannot compute the asteroids.
+    """
+    swe.set_ephe_path(EPHE_PATH)
+
+configure_ephemeris()
 
 # Configuration
-DEFAULT_HOUSE = "P"  # Placidus
-DEFAULT_ZODIAC = "tropical"
-SIDEREAL_AYANAMSA = swe.SIDM_FAGAN_BRADLEY
+DEFAULT_HOUSE = os.getenv("DEFAULT_HOUSE", "P")  # Placidus; any code in houses.HOUSE_SYSTEMS
+DEFAULT_ZODIAC = os.getenv("DEFAULT_ZODIAC", "tropical")  # or "sidereal"
+SIDEREAL_AYANAMSA = os.getenv("SIDEREAL_AYANAMSA", "fagan_bradley")  # default ayanamsa, any name in zodiac.AYANAMSAS
+MAX_CHART_VARIANTS = int(os.getenv("MAX_CHART_VARIANTS", "12"))
+POSITION_TABLE_PATH = os.getenv("POSITION_TABLE_PATH", "./ephe/positions.tbl")
+USE_POSITION_TABLE = os.getenv("USE_POSITION_TABLE", "true").lower() == "true"
+TIMEZONE_BOUNDARIES_PATH = os.getenv("TIMEZONE_BOUNDARIES_PATH", "./data/timezones.geojson")
+TIMEZONE_CACHE_SIZE = int(os.getenv("TIMEZONE_CACHE_SIZE", "65536"))
+GAZETTEER_PATH = os.getenv("GAZETTEER_PATH", "./data/cities15000.txt")
+COUNTRY_INFO_PATH = os.getenv("COUNTRY_INFO_PATH", "./data/countryInfo.txt")  # country names in BirthData.city
+CHART_CACHE_SIZE = int(os.getenv("CHART_CACHE_SIZE", "1024"))
+CHART_CACHE_TTL = float(os.getenv("CHART_CACHE_TTL", "3600"))  # seconds
+# Caches shared by every worker process of serve.py; 0 slots = off (one process needs none)
+SHARED_CHART_CACHE_SLOTS = int(os.getenv("SHARED_CHART_CACHE_SLOTS", "0"))
+SHARED_TIMEZONE_CACHE_SLOTS = int(os.getenv("SHARED_TIMEZONE_CACHE_SLOTS", "0"))
+SHARED_CACHE_SLOT_SIZE = int(os.getenv("SHARED_CACHE_SLOT_SIZE", "16384"))  # bytes; larger charts are not shared
+CHART_WORKERS = int(os.getenv("CHART_WORKERS", str(os.cpu_count() or 1)))
+BATCH_MAX_SIZE = int(os.getenv("BATCH_MAX_SIZE", "5000"))
+EPHEMERIS_THREADS = int(os.getenv("EPHEMERIS_THREADS", "1"))  # swisseph is not thread-safe
+EPHEMERIS_MAX_QUEUE = int(os.getenv("EPHEMERIS_MAX_QUEUE", "0"))  # 0 = unbounded
+SKETCH_THREADS = int(os.getenv("SKETCH_THREADS", "4"))
+SKETCH_MAX_QUEUE = int(os.getenv("SKETCH_MAX_QUEUE", "32"))
+SKETCH_CLIENT = os.getenv("SKETCH_CLIENT", "replicate")  # "replicate" or "stub" (offline, for load tests)
+SKETCH_STUB_DELAY = float(os.getenv("SKETCH_STUB_DELAY", "0"))  # seconds per stub generation
+SKETCH_JOB_HISTORY = int(os.getenv("SKETCH_JOB_HISTORY", "1000"))
+SKETCH_JOB_STORE_PATH = os.getenv("SKETCH_JOB_STORE_PATH", "./data/sketch_jobs.db")  # "" keeps jobs per process
+SKETCH_CACHE_DIR = os.getenv("SKETCH_CACHE_DIR", "./data/sketches")
+SKETCH_CACHE_MAX_BYTES = int(os.getenv("SKETCH_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+SKETCH_CACHE_POLICY = os.getenv("SKETCH_CACHE_POLICY", "reuse")  # "reuse", "refresh" or "off"
+SKETCH_CACHE_MAX_AGE = float(os.getenv("SKETCH_CACHE_MAX_AGE", "0"))  # seconds, 0 = no limit
+FIXED_STARS_PATH = os.getenv("FIXED_STARS_PATH", "./ephe/sefstars.txt")
+FIXED_STAR_MAX_MAGNITUDE = float(os.getenv("FIXED_STAR_MAX_MAGNITUDE", "2.5"))
+FIXED_STAR_ORB = float(os.getenv("FIXED_STAR_ORB", "1.0"))  # degrees of longitude
+CHART_STORE_PATH = os.getenv("CHART_STORE_PATH", "./data/charts.db")  # "" disables the chart store
+CHART_IMPORT_BATCH_SIZE = int(os.getenv("CHART_IMPORT_BATCH_SIZE", "1000"))  # records per transaction
+CHART_SEARCH_MAX_ORB = float(os.getenv("CHART_SEARCH_MAX_ORB", "15"))  # degrees
+CHART_SEARCH_MAX_LIMIT = int(os.getenv("CHART_SEARCH_MAX_LIMIT", "10000"))
+INCLUDE_MINOR_ASPECTS = os.getenv("INCLUDE_MINOR_ASPECTS", "false").lower() == "true"
+
+# Aspect orbs per use: natal charts and synastry use 8°, advanced analysis 5°
+CHART_ORBS = OrbTable(default_orb=8, include_minor=INCLUDE_MINOR_ASPECTS)
+SYNASTRY_ORBS = OrbTable(default_orb=8, include_minor=INCLUDE_MINOR_ASPECTS)
+ADVANCED_ORBS = OrbTable(default_orb=5, include_minor=INCLUDE_MINOR_ASPECTS)
+
+# Compatibility score contribution per synastry aspect: (strong orb <= 3°, otherwise)
+COMPATIBILITY_WEIGHTS = {
+    "Trine": (10, 5),
+    "Sextile": (10, 5),
+    "Square": (-5, -2),
+    "Opposition": (-5, -2),
+    "Conjunction": (5, 5)
+}
+RANKING_STREAM_THRESHOLD = int(os.getenv("RANKING_STREAM_THRESHOLD", "1000"))
+
+if DEFAULT_HOUSE not in HOUSE_SYSTEMS:
+    raise ValueError(f"DEFAULT_HOUSE must be one of {', '.join(HOUSE_SYSTEMS)}, got {DEFAULT_HOUSE!r}")
+if DEFAULT_ZODIAC not in ZODIACS:
+    raise ValueError(f"DEFAULT_ZODIAC must be one of {', '.join(ZODIACS)}, got {DEFAULT_ZODIAC!r}")
+if SIDEREAL_AYANAMSA not in AYANAMSAS:
+    raise ValueError(f"SIDEREAL_AYANAMSA must be one of {', '.join(AYANAMSAS)}, got {SIDEREAL_AYANAMSA!r}")
+
+# Start-up warm-up of the ephemeris files and chart path, gating /api/ready
+WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "true").lower() == "true"
+WARMUP_START_YEAR = int(os.getenv("WARMUP_START_YEAR", "1900"))
+WARMUP_END_YEAR = int(os.getenv("WARMUP_END_YEAR", "2100"))
+WARMUP_EXTRA_DIRS = [name for name in os.getenv("WARMUP_EXTRA_DIRS", "").split(",") if name]  # e.g. "ep4,sat"
+
+# Transit timelines are searched (and streamed) one window at a time
+TRANSIT_WINDOW_DAYS = float(os.getenv("TRANSIT_WINDOW_DAYS", "30"))
+TRANSIT_MAX_YEARS = float(os.getenv("TRANSIT_MAX_YEARS", "20"))
+SOLAR_RETURN_MAX_YEARS = int(os.getenv("SOLAR_RETURN_MAX_YEARS", "100"))  # returns per request
+
+# Computed charts keyed on (UTC Julian day, lat, lng, house system, zodiac, fixed stars)
+chart_cache = ChartCache(max_size=CHART_CACHE_SIZE, ttl=CHART_CACHE_TTL)
+
+# The same charts (pickled, with their encodings) and resolved timezones in
+# shared memory, created before serve.py forks so every worker sees each
+# other's results; None unless enabled
+shared_chart_cache = (
+    SharedCache(SHARED_CHART_CACHE_SLOTS, SHARED_CACHE_SLOT_SIZE, ttl=CHART_CACHE_TTL)
+    if SHARED_CHART_CACHE_SLOTS > 0 else None
+)
+shared_timezone_cache = SharedCache(SHARED_TIMEZONE_CACHE_SLOTS, 128) if SHARED_TIMEZONE_CACHE_SLOTS > 0 else None
+
+# Computations in progress, keyed like the caches: concurrent requests for the
+# same chart (e.g. the chart, soulmate and compatibility endpoints fired
+# together) wait on one computation instead of repeating it
+chart_flights = SingleFlight("charts")
+advanced_position_flights = SingleFlight("advanced_positions")
+
+# Precomputed Chebyshev tables (built by ephemeris_tables.py), memory-mapped so
+# worker processes share the pages; None when not built or disabled
+position_table = load_position_table(POSITION_TABLE_PATH) if USE_POSITION_TABLE else None
+
+# Timezone boundary polygons, loaded once into a grid index; None when not installed
+timezone_index = (
+    TimezoneIndex.from_geojson(TIMEZONE_BOUNDARIES_PATH, cache_size=TIMEZONE_CACHE_SIZE)
+    if os.path.exists(TIMEZONE_BOUNDARIES_PATH) else None
+)
+
+# Fixed-star catalog, parsed once and searched by longitude; None when the file is missing
+fixed_star_catalog = (
+    FixedStarCatalog.from_sefstars(FIXED_STARS_PATH, FIXED_STAR_MAX_MAGNITUDE)
+    if os.path.exists(FIXED_STARS_PATH) else None
+)
+
+# Saved charts with their canonical inputs, also consulted on chart cache misses; None when disabled
+chart_store = ChartStore(CHART_STORE_PATH) if CHART_STORE_PATH else None
+
+# GeoNames city index for autocomplete and for geocoding BirthData.city
+gazetteer = Gazetteer.from_geonames(
+    GAZETTEER_PATH, COUNTRY_INFO_PATH if os.path.exists(COUNTRY_INFO_PATH) else None
+) if os.path.exists(GAZETTEER_PATH) else None
+
+# Worker processes for batch computation; swisseph keeps global state, so no threads
+chart_process_pool: Optional[ProcessPoolExecutor] = None
+
+# Blocking work runs off the event loop: CPU-bound ephemeris calls and slow
+# Replicate calls get separate pools so image generation cannot starve charts
+ephemeris_executor = BoundedExecutor(
+    "ephemeris", EPHEMERIS_THREADS, EPHEMERIS_MAX_QUEUE, initializer=configure_ephemeris
+)
+sketch_executor = BoundedExecutor("sketch", SKETCH_THREADS, SKETCH_MAX_QUEUE)
+
+BIRTH_FIELDS = ("name", "date", "time", "city", "gender")
+
+class ChartVariant(BaseModel):
+    # Unset fields default to the chart's own zodiac, ayanamsa and house system
+    zodiac: Optional[str] = None  # "tropical" or "sidereal"
+    ayanamsa: Optional[str] = None  # sidereal only
+    house_system: Optional[str] = None
 
 class BirthData(BaseModel):
-    name: str
-    date: str
-    time: str
-    city: str
-    gender: str
+    # Required unless chart_id is given (see load_stored_birth_data)
+    name: Optional[str] = None
+    date: Optional[str] = None
+    time: Optional[str] = None
+    city: Optional[str] = None
+    gender: Optional[str] = None
     coordinates: Optional[dict] = None
     timezone: Optional[str] = None
+    house_system: Optional[str] = None  # swisseph house system code, defaults to DEFAULT_HOUSE
+    fixed_stars: bool = False  # include fixed-star conjunctions in the chart
+    zodiac: Optional[str] = None  # "tropical" or "sidereal", defaults to DEFAULT_ZODIAC
+    ayanamsa: Optional[str] = None  # sidereal only, defaults to SIDEREAL_AYANAMSA
+    variants: Optional[List[ChartVariant]] = None  # further zodiac/house system views of the chart
+    chart_id: Optional[int] = None  # stored chart whose birth data fills in the fields not given
+    _stored_loaded: bool = PrivateAttr(default=False)  # chart_id's birth data already filled in
+    
+    @model_validator(mode="after")
+    def require_birth_fields(self):
+        """Without a chart_id the birth fields must all be given"""
+        if self.chart_id is None:
+            missing = [name for name in BIRTH_FIELDS if getattr(self, name) is None]
+            if missing:
+                raise ValueError(f"Field required: {', '.join(missing)}")
+        return self
 
 class PlanetaryPosition(BaseModel):
     planet: str
@@ -51,20 +247,104 @@ class PlanetaryPosition(BaseModel):
     house: int
     isRetrograde: bool
 
-class BirthChart(BaseModel):
+class BirthChart(CachedEncodingModel):
+    # Everything but the metadata is encoded once per chart and reused
+    VOLATILE_FIELDS = ("metadata",)
+
     ascendant: dict
     midheaven: dict
     planets: List[PlanetaryPosition]
     houses: List[dict]
     aspects: List[dict]
     metadata: dict
+    fixedStars: Optional[List[dict]] = None  # only when requested
+    variants: Optional[List["BirthChart"]] = None  # only when requested
+
+class BatchChartResult(BaseModel):
+    index: int
+    chart: Optional[BirthChart] = None
+    error: Optional[str] = None
+
+class CompatibilityRankingRequest(BaseModel):
+    user: BirthData
+    candidates: List[BirthData] = []
+    top_k: int = 10
+    stream: bool = False
+
+class TransitRequest(BaseModel):
+    birth_data: BirthData
+    start_date: str
+    end_date: str
+    bodies: Optional[List[str]] = None  # defaults to Sun through Pluto without the Moon
+    aspects: Optional[List[str]] = None  # defaults to the major aspects
+    events: Optional[List[str]] = None  # "aspect", "ingress", "station"; defaults to all
+    format: str = "ndjson"  # or "sse"
+
+class SolarReturnRequest(BaseModel):
+    birth_data: BirthData
+    start_year: int
+    end_year: Optional[int] = None  # inclusive, defaults to start_year
+    coordinates: Optional[dict] = None  # where the returns are cast, defaults to the birthplace
+    progressions: bool = True  # include the secondary progressed chart at each return
+
+class BirthTimeRangesRequest(BaseModel):
+    # BirthData without the time: the whole local day is scanned
+    date: str
+    city: str = ""
+    coordinates: Optional[dict] = None
+    timezone: Optional[str] = None
+    house_system: Optional[str] = None
+    zodiac: Optional[str] = None
+    ayanamsa: Optional[str] = None
+    bodies: Optional[List[str]] = None  # bodies whose houses are reported, defaults to all
+
+class AspectCondition(BaseModel):
+    body: str  # body in the stored charts
+    point: str  # planet, "Ascendant" or "Midheaven" of the searching chart
+    aspects: Optional[List[str]] = None  # defaults to the major aspects
+    orb: float = 3.0
+
+class AspectSearchRequest(BaseModel):
+    birth_data: BirthData  # the searching chart; {"chart_id": ...} for a stored one
+    conditions: List[AspectCondition]  # all must hold
+    limit: int = 100
 
 class ImageGenerationRequest(BaseModel):
     soulmate_description: str
+    regenerate: bool = False  # bypass the sketch cache
 
 # Configure Replicate
 replicate_client = replicate.Client(api_token=os.getenv("VITE_REPLICATE_API_KEY"))
 
+# Sketch models in order of preference: Google Nano Banana, then Stable Diffusion as a fallback
+SKETCH_IMAGE_PARAMS = {
+    "width": 512,
+    "height": 512,
+    "num_inference_steps": 20,
+    "guidance_scale": 7.5,
+    "num_outputs": 1
+}
+SKETCH_MODELS = [
+    ("google/nano-banana", SKETCH_IMAGE_PARAMS),
+    ("stability-ai/stable-diffusion:27b93a2413e7f36cd83da926f3656280b2931564ff050bf9575f1fdf9bcd7478", SKETCH_IMAGE_PARAMS)
+]
+
+image_client = (
+    StubImageClient(delay=SKETCH_STUB_DELAY) if SKETCH_CLIENT == "stub"
+    else ReplicateImageClient(replicate_client)
+)
+
+# Generated images kept on disk, keyed by prompt and model parameters
+sketch_cache = SketchCache(SKETCH_CACHE_DIR, SKETCH_CACHE_MAX_BYTES, SKETCH_CACHE_POLICY, SKETCH_CACHE_MAX_AGE)
+
+# Sketch generations run as background jobs; identical prompts in flight share one job.
+# Job state is also kept in SQLite, so any serve.py worker can answer a poll
+sketch_jobs = SketchJobQueue(
+    image_client, sketch_executor, SKETCH_MODELS,
+    max_pending=SKETCH_THREADS + SKETCH_MAX_QUEUE, history=SKETCH_JOB_HISTORY, cache=sketch_cache,
+    store=SketchJobStore(SKETCH_JOB_STORE_PATH) if SKETCH_JOB_STORE_PATH else None
+)
+
 ZODIAC_SIGNS = [
     'Aries', 'Taurus', 'Gemini', 'Cancer', 'Leo', 'Virgo',
     'Libra', 'Scorpio', 'Sagittarius', 'Capricorn', 'Aquarius', 'Pisces'
@@ -88,6 +368,53 @@ PLANET_SYMBOLS = {
     'Vesta': '⚶'
 }
 
+BODY_CODES = {
+    'Sun': swe.SUN,
+    'Moon': swe.MOON,
+    'Mercury': swe.MERCURY,
+    'Venus': swe.VENUS,
+    'Mars': swe.MARS,
+    'Jupiter': swe.JUPITER,
+    'Saturn': swe.SATURN,
+    'Uranus': swe.URANUS,
+    'Neptune': swe.NEPTUNE,
+    'Pluto': swe.PLUTO,
+    'Chiron': swe.CHIRON,
+    'Ceres': swe.CERES,
+    'Pallas': swe.PALLAS,
+    'Juno': swe.JUNO,
+    'Vesta': swe.VESTA
+}
+
+DEFAULT_TRANSIT_BODIES = ['Sun', 'Mercury', 'Venus', 'Mars', 'Jupiter', 'Saturn', 'Uranus', 'Neptune', 'Pluto']
+
+# Tropical body longitudes of every stored chart, sorted per body for aspect
+# searches. Other workers may save and delete charts too, so the index follows
+# the store: each search first reads the charts and tombstones added since the
+# last one it saw.
+aspect_index = AspectIndex(list(PLANET_SYMBOLS))
+aspect_index_position = {"lastId": 0, "lastDeletion": 0}
+aspect_index_lock = threading.Lock()
+
+def sync_aspect_index() -> None:
+    """Add charts stored and drop charts deleted since the last sync"""
+    if chart_store is None:
+        return
+    with aspect_index_lock:
+        width = len(PLANET_SYMBOLS)
+        if not aspect_index_position["lastId"] and not aspect_index_position["lastDeletion"]:
+            # Charts deleted before the first load are already gone
+            aspect_index_position["lastDeletion"] = chart_store.last_deletion()
+        ids, longitudes = chart_store.longitudes(width, after_id=aspect_index_position["lastId"])
+        if ids:
+            aspect_index.add(ids, np.frombuffer(b"".join(longitudes)).reshape(len(ids), width))
+            aspect_index_position["lastId"] = ids[-1]
+        deleted, aspect_index_position["lastDeletion"] = chart_store.deletions(aspect_index_position["lastDeletion"])
+        for chart_id in deleted:
+            aspect_index.remove(chart_id)
+
+sync_aspect_index()
+
 def degrees_to_sign(degrees: float) -> dict:
     """Convert degrees to zodiac sign and degree within sign"""
     normalized_degrees = ((degrees % 360) + 360) % 360
@@ -98,78 +425,50 @@ def degrees_to_sign(degrees: float) -> dict:
         "degreeInSign": round(degree_in_sign, 2)
     }
 
-def calculate_house_system(ascendant: float, mc: float, latitude: float, longitude: float, julian_day: float) -> List[dict]:
-    """Calculate house cusps using Swiss Ephemeris Placidus system"""
+def calculate_house_system(house_cusps: HouseCusps) -> List[dict]:
+    """House cusps (or Gauquelin sectors) with their signs"""
     houses = []
-    
-    try:
-        # Get actual house cusps from Swiss Ephemeris
-        cusps, ascmc = swe.houses(julian_day, latitude, longitude, DEFAULT_HOUSE.encode())
-        
-        for house_num in range(1, 13):
-            house_longitude = cusps[house_num - 1]  # Swiss Ephemeris uses 0-based indexing
-            sign_info = degrees_to_sign(house_longitude)
-            
-            houses.append({
-                "house": house_num,
-                "longitude": round(house_longitude, 3),
-                "sign": sign_info["sign"],
-                "degreeInSign": sign_info["degreeInSign"]
-            })
-    except Exception as e:
-        # Fallback to simplified calculation
-        for house_num in range(1, 13):
-            if house_num == 1:
-                house_longitude = ascendant
-            elif house_num == 10:
-                house_longitude = mc
-            else:
-                angle = (house_num - 1) * 30
-                house_longitude = (ascendant + angle) % 360
-            
-            sign_info = degrees_to_sign(house_longitude)
-            houses.append({
-                "house": house_num,
-                "longitude": round(house_longitude, 3),
-                "sign": sign_info["sign"],
-                "degreeInSign": sign_info["degreeInSign"]
-            })
-    
+    for house_num, house_longitude in enumerate(house_cusps.cusps, start=1):
+        sign_info = degrees_to_sign(house_longitude)
+        houses.append({
+            "house": house_num,
+            "longitude": round(house_longitude, 3),
+            "sign": sign_info["sign"],
+            "degreeInSign": sign_info["degreeInSign"]
+        })
     return houses
 
-def calculate_aspects(planets: List[PlanetaryPosition]) -> List[dict]:
+def calculate_aspects(names: List[str], longitudes: List[float]) -> List[dict]:
     """Calculate aspects between planets"""
-    aspects = []
-    aspect_angles = {
-        "Conjunction": 0,
-        "Sextile": 60,
-        "Square": 90,
-        "Trine": 120,
-        "Opposition": 180
-    }
-    
-    for i, planet1 in enumerate(planets):
-        for j, planet2 in enumerate(planets[i+1:], i+1):
-            angle_diff = abs(planet1.longitude - planet2.longitude)
-            if angle_diff > 180:
-                angle_diff = 360 - angle_diff
-            
-            for aspect_name, aspect_angle in aspect_angles.items():
-                orb = abs(angle_diff - aspect_angle)
-                if orb <= 8:  # 8 degree orb
-                    aspects.append({
-                        "planet1": planet1.planet,
-                        "planet2": planet2.planet,
-                        "aspect": aspect_name,
-                        "orb": round(orb, 2)
-                    })
-    
-    return aspects
+    return [
+        {
+            "planet1": aspect["body1"],
+            "planet2": aspect["body2"],
+            "aspect": aspect["aspect"],
+            "orb": round(aspect["orb"], 2)
+        }
+        for aspect in find_aspects(names, longitudes, orbs=CHART_ORBS)
+    ]
 
 def get_timezone_from_coordinates(lat: float, lng: float) -> str:
-    """Get timezone from coordinates using a simplified approach"""
-    # This is a simplified timezone detection
-    # In a production system, you'd use a proper timezone database
+    """Get timezone from coordinates, using the offline boundary index when installed"""
+    if timezone_index is not None:
+        key = (round(lat, timezone_index.decimals), round(lng, timezone_index.decimals))
+        if shared_timezone_cache is not None:
+            shared = shared_timezone_cache.get(key)
+            if shared is not None:
+                return shared.decode()
+        # Points outside every boundary polygon are at sea
+        tz_name = timezone_index.lookup(lat, lng)
+        if tz_name is None:
+            count_fallback("timezone_nautical")
+            tz_name = nautical_timezone(lng)
+        if shared_timezone_cache is not None:
+            shared_timezone_cache.put(key, tz_name.encode())
+        return tz_name
+    
+    # Without boundary data, fall back to a simplified longitude-band guess
+    count_fallback("timezone_longitude_band")
     
     # US timezones
     if lng < -100:  # Mountain/Pacific
@@ -199,105 +498,104 @@ def get_timezone_from_coordinates(lat: float, lng: float) -> str:
     else:
         return 'UTC'
 
-async def calculate_birth_chart_internal(birth_data: BirthData) -> BirthChart:
-    """Calculate birth chart using Swiss Ephemeris"""
-    try:
-        # Parse date and time
-        date_time_str = f"{birth_data.date} {birth_data.time}"
-        dt = parser.parse(date_time_str)
-        
-        # Extract components
-        year = dt.year
-        month = dt.month
-        day = dt.day
-        hour = dt.hour + dt.minute / 60.0 + dt.second / 3600.0
-        
-        # Get coordinates
-        if not birth_data.coordinates:
-            raise HTTPException(status_code=400, detail="Coordinates are required")
-        
-        lat = birth_data.coordinates["lat"]
-        lng = birth_data.coordinates["lng"]
-        
-        # Calculate Julian Day using proper timezone conversion
-        try:
-            # Use provided timezone or get from coordinates
-            if birth_data.timezone:
-                tz_name = birth_data.timezone
-            else:
-                tz_name = get_timezone_from_coordinates(lat, lng)
-            
-            local_tz = tz.gettz(tz_name)
-            
-            # Create local datetime with timezone
-            local_dt = datetime(year, month, day, dt.hour, dt.minute, tzinfo=local_tz)
-            
-            # Convert to UTC
-            utc_dt = local_dt.astimezone(tz.UTC)
-            ut_hours = utc_dt.hour + utc_dt.minute/60 + utc_dt.second/3600
-            
-            # Calculate Julian Day
-            julian_day = swe.julday(utc_dt.year, utc_dt.month, utc_dt.day, ut_hours)
-            
-        except Exception as e:
-            # Fallback to treating local time as UTC
-            local_dt = datetime(year, month, day, dt.hour, dt.minute)
-            utc_dt = local_dt.replace(tzinfo=timezone.utc)
-            ut_hours = utc_dt.hour + utc_dt.minute/60 + utc_dt.second/3600
-            julian_day = swe.julday(utc_dt.year, utc_dt.month, utc_dt.day, ut_hours)
-        
-        # Set up Swiss Ephemeris flags like reference script
-        IFLAG = swe.FLG_SWIEPH | swe.FLG_SPEED
-        
-        # Calculate Ascendant and MC using Swiss Ephemeris
-        try:
-            cusps, ascmc = swe.houses(julian_day, lat, lng, DEFAULT_HOUSE.encode())
-            ascendant = ascmc[0]
-            mc = ascmc[1]
-        except Exception as e:
-            # Fallback to basic calculation
-            ascendant = 0.0
-            mc = 0.0
-            cusps = [0.0] * 12
-        
-        # Calculate planetary positions using Swiss Ephemeris
-        planets = []
-        bodies = [swe.SUN, swe.MOON, swe.MERCURY, swe.VENUS, swe.MARS,
-                  swe.JUPITER, swe.SATURN, swe.URANUS, swe.NEPTUNE, swe.PLUTO]
-        
-        planet_names = ['Sun', 'Moon', 'Mercury', 'Venus', 'Mars',
-                       'Jupiter', 'Saturn', 'Uranus', 'Neptune', 'Pluto']
-        
-        # Add additional asteroids and points for more detailed analysis
-        additional_bodies = [swe.CHIRON, swe.CERES, swe.PALLAS, swe.JUNO, swe.VESTA]
-        additional_names = ['Chiron', 'Ceres', 'Pallas', 'Juno', 'Vesta']
-        
-        # Combine all bodies for calculation
-        all_bodies = bodies + additional_bodies
-        all_names = planet_names + additional_names
-        
-        for i, (planet_code, planet_name) in enumerate(zip(all_bodies, all_names)):
+def calculate_body_position(julian_day: float, planet_code: int, planet_name: str) -> tuple:
+    """Longitude and speed of a body, from the position table when it covers the date"""
+    if position_table is not None:
+        position = position_table.position(julian_day, planet_name)
+        if position is not None:
+            return position
+        count_fallback("position_table_miss")
+    
+    # Set up Swiss Ephemeris flags like reference script
+    IFLAG = swe.FLG_SWIEPH | swe.FLG_SPEED
+    xx, _ = swe.calc_ut(julian_day, planet_code, IFLAG)
+    return xx[0], xx[3]  # ecliptic longitude, speed
+
+def calculate_body_positions(julian_days: np.ndarray, planet_code: int, planet_name: str) -> tuple:
+    """Longitudes and speeds of a body for an array of dates, vectorized over the table when it covers them all"""
+    if position_table is not None and planet_name in position_table.header["bodies"] \
+            and position_table.covers(julian_days.min()) and position_table.covers(julian_days.max()):
+        return position_table.positions(julian_days, planet_name)
+    
+    positions = [calculate_body_position(julian_day, planet_code, planet_name) for julian_day in julian_days]
+    return np.array([p[0] for p in positions]), np.array([p[1] for p in positions])
+
+def chart_angle(longitude: float) -> dict:
+    """Ascendant or midheaven with its sign"""
+    sign_info = degrees_to_sign(longitude)
+    return {
+        "longitude": round(longitude, 3),
+        "sign": sign_info["sign"],
+        "degreeInSign": sign_info["degreeInSign"]
+    }
+
+def compute_chart_views(julian_day: float, lat: float, lng: float, views: List[tuple],
+                        fixed_stars: bool = False) -> List[BirthChart]:
+    """Charts of one moment and place for several (zodiac, ayanamsa, house system) views.
+
+    The ephemeris work is done once: bodies are computed in the tropical zodiac
+    and every house system from the same sidereal time. A sidereal view
+    subtracts its ayanamsa from those longitudes and cusps; aspects do not
+    depend on the zodiac, so they are computed once too.
+    """
+    # Calculate the house cusps, Ascendant and MC once per house system
+    with stage("chart", "houses"):
+        house_frame = None
+        systems = {}
+        for _, _, house_system in views:
+            if house_system in systems:
+                continue
             try:
-                xx, _ = swe.calc_ut(julian_day, planet_code, IFLAG)
-                longitude = xx[0]  # ecliptic longitude
-                speed = xx[3]      # speed
-                
-                # Check if retrograde
-                is_retrograde = speed < 0
+                if house_frame is None:
+                    house_frame = HouseFrame(julian_day, lat, lng)
+                systems[house_system] = house_frame.houses(house_system)
+                if systems[house_system].system != house_system:
+                    count_fallback("houses_polar_porphyry")
+            except Exception as e:
+                # Fallback to equal houses from 0° Aries
+                count_fallback("houses_equal")
+                systems[house_system] = equal_houses(0.0, 0.0)
+    
+    # Calculate planetary positions (planets, then Chiron and the main asteroids)
+    with stage("chart", "positions"):
+        positions = []
+        for planet_name, planet_code in BODY_CODES.items():
+            try:
+                positions.append((planet_name, *calculate_body_position(julian_day, planet_code, planet_name)))
+            except Exception as e:
+                count_fallback("body_skipped")
+                continue
+    
+    # Aspects are the same in every zodiac
+    with stage("chart", "aspects"):
+        aspects = calculate_aspects([name for name, _, _ in positions], [round(lon, 3) for _, lon, _ in positions])
+    
+    # Stars conjunct each planet, shifted with the planets in sidereal views
+    fixed_star_conjunctions = None
+    if fixed_stars and fixed_star_catalog is not None:
+        with stage("chart", "fixed_stars"):
+            fixed_star_conjunctions = fixed_star_catalog.conjunctions(
+                julian_day, [(name, round(lon, 3)) for name, lon, _ in positions], FIXED_STAR_ORB
+            )
+    
+    with stage("chart", "views"):
+        offsets = {TROPICAL: (0.0, 0.0)}
+        charts = []
+        for zodiac, ayanamsa, house_system in views:
+            key = zodiac_key(zodiac, ayanamsa)
+            if key not in offsets:
+                offsets[key] = ayanamsa_offset(julian_day, ayanamsa)
+            offset, rate = offsets[key]
+            house_cusps = systems[house_system].shifted(offset)
+            
+            planets = []
+            for planet_name, longitude, speed in positions:
+                longitude = (longitude - offset) % 360 if offset else longitude
+                speed -= rate
                 
                 # Convert to sign
                 sign_info = degrees_to_sign(longitude)
                 
-                # Determine house using actual house cusps
-                house_num = 1
-                for i, cusp in enumerate(cusps):
-                    if longitude >= cusp:
-                        house_num = i + 1
-                    else:
-                        break
-                if longitude < cusps[0]:  # Before first house cusp
-                    house_num = 12
-                
                 planets.append(PlanetaryPosition(
                     planet=planet_name,
                     symbol=PLANET_SYMBOLS[planet_name],
@@ -305,115 +603,701 @@ async def calculate_birth_chart_internal(birth_data: BirthData) -> BirthChart:
                     sign=sign_info["sign"],
                     degreeInSign=sign_info["degreeInSign"],
                     speed=round(speed, 3),
-                    house=house_num,
-                    isRetrograde=is_retrograde
+                    house=house_cusps.house_of(longitude),
+                    isRetrograde=speed < 0
                 ))
-            except Exception as e:
-                continue
-        
-        # Calculate houses using Swiss Ephemeris
-        houses = calculate_house_system(ascendant, mc, lat, lng, julian_day)
-        
-        # Calculate aspects
-        aspects = calculate_aspects(planets)
-        
-        # Prepare metadata
-        metadata = {
-            "julianDay": round(julian_day, 5),
-            "localTime": dt.strftime("%Y-%m-%d %H:%M:%S"),
-            "utcTime": utc_dt.strftime("%Y-%m-%d %H:%M:%S"),
-            "timezone": tz_name,
-            "coordinates": {
-                "lat": lat,
-                "lng": lng
-            }
+            
+            stars = fixed_star_conjunctions
+            if stars and offset:
+                stars = [
+                    {**star, "longitude": round((star["longitude"] - offset) % 360, 3)} for star in stars
+                ]
+            
+            metadata = {"julianDay": round(julian_day, 5), "houseSystem": house_cusps.system, "zodiac": zodiac}
+            if zodiac == SIDEREAL:
+                metadata["ayanamsa"] = ayanamsa
+                metadata["ayanamsaDegrees"] = round(offset, 6)
+            
+            charts.append(BirthChart(
+                ascendant=chart_angle(house_cusps.ascendant),
+                midheaven=chart_angle(house_cusps.mc),
+                planets=planets,
+                houses=calculate_house_system(house_cusps),
+                aspects=aspects,
+                metadata=metadata,
+                fixedStars=stars
+            ))
+    return charts
+
+def compute_birth_chart(julian_day: float, lat: float, lng: float, house_system: str = DEFAULT_HOUSE,
+                        fixed_stars: bool = False, zodiac: str = DEFAULT_ZODIAC,
+                        ayanamsa: Optional[str] = None, variants: tuple = ()) -> BirthChart:
+    """Run the Swiss Ephemeris calculations for a resolved UTC Julian day and location.
+
+    variants are further (zodiac, ayanamsa, house system) views of the same
+    chart, returned in its ``variants`` list.
+    """
+    chart, *variant_charts = compute_chart_views(
+        julian_day, lat, lng, [(zodiac, ayanamsa, house_system), *variants], fixed_stars
+    )
+    if variants:
+        chart.variants = variant_charts
+    return chart
+
+def resolve_location(birth_data: BirthData) -> tuple:
+    """Coordinates and timezone name for a birth place.
+
+    Uses the supplied coordinates when present, otherwise geocodes the city
+    with the offline gazetteer.
+    """
+    if birth_data.coordinates:
+        lat = birth_data.coordinates["lat"]
+        lng = birth_data.coordinates["lng"]
+        return lat, lng, birth_data.timezone or get_timezone_from_coordinates(lat, lng)
+    
+    place = gazetteer.resolve(birth_data.city) if gazetteer is not None and birth_data.city else None
+    if place is None:
+        raise HTTPException(status_code=400, detail="Coordinates are required (city could not be geocoded)")
+    
+    lat = place["coordinates"]["lat"]
+    lng = place["coordinates"]["lng"]
+    return lat, lng, birth_data.timezone or place["timezone"]
+
+def local_birth_time_to_julian_day(dt: datetime, tz_name: str, operation: str = "birth_chart") -> tuple:
+    """UT Julian day and UTC time of a local birth time, taking it as UTC if the zone is unknown"""
+    local_dt = dt.replace(tzinfo=None)
+    try:
+        with stage(operation, "timezone"):
+            return local_to_julian_day(local_dt, tz_name)
+    except Exception:
+        # Fallback to treating local time as UTC
+        count_fallback("timezone_utc")
+        utc_dt = local_dt.replace(tzinfo=timezone.utc)
+        return utc_julian_day(utc_dt), utc_dt
+
+def resolve_chart_view(zodiac: Optional[str], ayanamsa: Optional[str], house_system: Optional[str],
+                       defaults: tuple = (DEFAULT_ZODIAC, None, DEFAULT_HOUSE)) -> tuple:
+    """Validated (zodiac, ayanamsa, house system) of a chart or variant; ayanamsa is None when tropical"""
+    default_zodiac, default_ayanamsa, default_house = defaults
+    zodiac = zodiac or default_zodiac
+    if zodiac not in ZODIACS:
+        raise HTTPException(status_code=400, detail=f"Unknown zodiac: {zodiac}")
+    if zodiac == SIDEREAL:
+        ayanamsa = ayanamsa or default_ayanamsa or SIDEREAL_AYANAMSA
+        if ayanamsa not in AYANAMSAS:
+            raise HTTPException(status_code=400, detail=f"Unknown ayanamsa: {ayanamsa}")
+    else:
+        ayanamsa = None
+    house_system = house_system or default_house
+    if house_system not in HOUSE_SYSTEMS:
+        raise HTTPException(status_code=400, detail=f"Unknown house system: {house_system}")
+    return zodiac, ayanamsa, house_system
+
+def resolve_birth_data(birth_data: BirthData) -> dict:
+    """Parse the local birth time and resolve it to a UTC Julian day"""
+    # Parse date and time
+    with stage("birth_chart", "parse"):
+        dt = parse_datetime(f"{birth_data.date} {birth_data.time}")
+    
+    view = resolve_chart_view(birth_data.zodiac, birth_data.ayanamsa, birth_data.house_system)
+    zodiac, ayanamsa, house_system = view
+    variants = tuple(
+        resolve_chart_view(variant.zodiac, variant.ayanamsa, variant.house_system, view)
+        for variant in birth_data.variants or ()
+    )
+    if len(variants) > MAX_CHART_VARIANTS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_CHART_VARIANTS} chart variants are allowed")
+    
+    # Get coordinates, geocoding the city when they are missing
+    with stage("birth_chart", "location"):
+        lat, lng, tz_name = resolve_location(birth_data)
+    
+    julian_day, utc_dt = local_birth_time_to_julian_day(dt, tz_name)
+    
+    return {
+        "julianDay": julian_day,
+        "lat": lat,
+        "lng": lng,
+        "localTime": dt,
+        "utcTime": utc_dt,
+        "timezone": tz_name,
+        "houseSystem": house_system,
+        "zodiac": zodiac,
+        "ayanamsa": ayanamsa,
+        # Arguments to compute_birth_chart after the Julian day and coordinates
+        "chartOptions": (house_system, birth_data.fixed_stars, zodiac, ayanamsa, variants),
+        "cacheKey": make_chart_key(
+            julian_day, lat, lng, house_system, zodiac_key(zodiac, ayanamsa), birth_data.fixed_stars,
+            tuple((zodiac_key(z, a), h) for z, a, h in variants)
+        )
+    }
+
+def attach_chart_metadata(chart: BirthChart, resolved: dict) -> BirthChart:
+    """Return a copy of a (possibly cached) chart carrying the request metadata"""
+    metadata = {
+        "julianDay": round(resolved["julianDay"], 5),
+        "localTime": resolved["localTime"].strftime("%Y-%m-%d %H:%M:%S"),
+        "utcTime": resolved["utcTime"].strftime("%Y-%m-%d %H:%M:%S"),
+        "timezone": resolved["timezone"],
+        "houseSystem": chart.metadata.get("houseSystem", resolved["houseSystem"]),
+        "zodiac": resolved["zodiac"],
+        **({"ayanamsa": resolved["ayanamsa"], "ayanamsaDegrees": chart.metadata.get("ayanamsaDegrees")}
+           if resolved["ayanamsa"] else {}),
+        "coordinates": {
+            "lat": resolved["lat"],
+            "lng": resolved["lng"]
         }
+    }
+    
+    # Cached charts are shared, so attach request metadata to a shallow copy
+    return chart.model_copy(update={"metadata": metadata})
+
+def stored_chart(key: tuple) -> Optional[BirthChart]:
+    """A chart saved in the chart store under a cache key"""
+    if chart_store is None:
+        return None
+    chart_json = chart_store.find(key)
+    return BirthChart.model_validate_json(chart_json) if chart_json is not None else None
+
+def stored_charts(keys: List[tuple]) -> dict:
+    """Cache key -> chart for the keys saved in the chart store"""
+    charts = {key: stored_chart(key) for key in keys}
+    return {key: chart for key, chart in charts.items() if chart is not None}
+
+def stored_birth_data(chart_ids: List[int]) -> dict:
+    """Chart id -> birth data saved in the chart store, None for unknown ids"""
+    if chart_store is None:
+        return {chart_id: None for chart_id in chart_ids}
+    return {chart_id: chart_store.birth_data(chart_id) for chart_id in chart_ids}
+
+def validation_error_message(e: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors())
+
+def merge_stored_birth_data(birth_data: BirthData, stored: Optional[dict]) -> BirthData:
+    """The stored chart's birth data overridden by the fields given in the request"""
+    if stored is None:
+        raise HTTPException(status_code=404, detail=f"Unknown chart_id: {birth_data.chart_id}")
+    try:
+        merged = BirthData(**{**stored, **birth_data.model_dump(exclude_unset=True)})
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=validation_error_message(e))
+    merged._stored_loaded = True
+    return merged
+
+async def load_stored_birth_datas(birth_datas: List[BirthData]) -> List[tuple]:
+    """(birth data, None) with the fields not given filled in from the stored
+    chart its chart_id refers to, or (None, error), for each item; the store is
+    read once, off the event loop"""
+    chart_ids = sorted({
+        birth_data.chart_id for birth_data in birth_datas
+        if birth_data.chart_id is not None and not birth_data._stored_loaded
+    })
+    stored = {}
+    if chart_ids:
+        loop = asyncio.get_running_loop()
+        stored = await loop.run_in_executor(None, stored_birth_data, chart_ids)
+    
+    results = []
+    for birth_data in birth_datas:
+        if birth_data.chart_id is None or birth_data._stored_loaded:
+            results.append((birth_data, None))
+            continue
+        try:
+            results.append((merge_stored_birth_data(birth_data, stored[birth_data.chart_id]), None))
+        except HTTPException as e:
+            results.append((None, str(e.detail)))
+    return results
+
+async def load_stored_birth_data(birth_data: BirthData) -> BirthData:
+    """birth_data with the fields not given filled in from the stored chart its chart_id refers to"""
+    if birth_data.chart_id is None or birth_data._stored_loaded:
+        return birth_data
+    loop = asyncio.get_running_loop()
+    stored = await loop.run_in_executor(None, stored_birth_data, [birth_data.chart_id])
+    return merge_stored_birth_data(birth_data, stored[birth_data.chart_id])
+
+def shared_chart(key: tuple) -> Optional[BirthChart]:
+    """A chart any worker put in the shared chart cache under a cache key"""
+    if shared_chart_cache is None:
+        return None
+    payload = shared_chart_cache.get(key)
+    return pickle.loads(payload) if payload is not None else None
+
+def share_chart(key: tuple, chart: BirthChart) -> None:
+    """Put a chart in the shared chart cache, with its JSON encoding so other
+    workers do not encode it again"""
+    if shared_chart_cache is not None:
+        chart.encode()
+        shared_chart_cache.put(key, pickle.dumps(chart, pickle.HIGHEST_PROTOCOL))
+
+def tropical_longitudes(chart: BirthChart) -> List[float]:
+    """chart_longitudes in the tropical zodiac, whatever the chart's zodiac"""
+    offset = chart.metadata.get("ayanamsaDegrees") or 0.0
+    return [(longitude + offset) % 360 for longitude in chart_longitudes(chart)]
+
+def tropical_points(chart: BirthChart) -> Dict[str, float]:
+    """Longitudes of the planets, Ascendant and Midheaven in the tropical zodiac,
+    whatever the chart's zodiac"""
+    offset = chart.metadata.get("ayanamsaDegrees") or 0.0
+    points = {planet.planet: planet.longitude for planet in chart.planets}
+    points["Ascendant"] = chart.ascendant["longitude"]
+    points["Midheaven"] = chart.midheaven["longitude"]
+    return {name: (longitude + offset) % 360 for name, longitude in points.items()}
+
+def chart_store_record(birth_data: BirthData, chart: BirthChart) -> tuple:
+    """Chart store record for a computed chart: its birth data with the location
+    and chart options resolved (so later changes to the defaults do not change
+    it), and the cache key that birth data resolves to"""
+    zodiac, ayanamsa, house_system = resolve_chart_view(birth_data.zodiac, birth_data.ayanamsa, birth_data.house_system)
+    canonical = birth_data.model_copy(update={
+        "coordinates": chart.metadata["coordinates"],
+        "timezone": chart.metadata["timezone"],
+        "zodiac": zodiac,
+        "ayanamsa": ayanamsa,
+        "house_system": house_system,
+        "chart_id": None
+    })
+    resolved = resolve_birth_data(canonical)
+    return (
+        resolved["cacheKey"],
+        canonical.model_dump(exclude={"chart_id"}, exclude_none=True),
+        resolved["julianDay"],
+        chart.encode(),
+        np.array(tropical_longitudes(chart), dtype=np.float64).tobytes()
+    )
+
+async def load_birth_chart(resolved: dict) -> BirthChart:
+    """The chart for resolved birth data from the shared cache or the chart
+    store, else computed; either way it is added to the chart caches"""
+    with stage("birth_chart", "shared_cache"):
+        chart = shared_chart(resolved["cacheKey"])
+    if chart is None:
+        with stage("birth_chart", "store"):
+            loop = asyncio.get_running_loop()
+            chart = await loop.run_in_executor(None, stored_chart, resolved["cacheKey"])
+        if chart is None:
+            # Includes the wait for a free ephemeris thread
+            with stage("birth_chart", "compute"):
+                chart = await ephemeris_executor.run(
+                    compute_birth_chart, resolved["julianDay"], resolved["lat"], resolved["lng"],
+                    *resolved["chartOptions"]
+                )
+        share_chart(resolved["cacheKey"], chart)
+    chart_cache.put(resolved["cacheKey"], chart)
+    return chart
+
+async def calculate_birth_chart_internal(birth_data: BirthData) -> BirthChart:
+    """Calculate birth chart using Swiss Ephemeris"""
+    birth_data = await load_stored_birth_data(birth_data)
+    return await resolved_birth_chart(resolve_chart_birth_data(birth_data))
+
+def resolve_chart_birth_data(birth_data: BirthData) -> dict:
+    """resolve_birth_data, with unexpected errors reported as chart calculation errors"""
+    try:
+        return resolve_birth_data(birth_data)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error calculating birth chart: {str(e)}")
+
+async def resolved_birth_chart(resolved: dict) -> BirthChart:
+    """The birth chart for resolved birth data"""
+    try:
+        # Reuse a previously computed or stored chart for the same instant and place,
+        # or join the computation of a concurrent request for it
+        with stage("birth_chart", "cache"):
+            chart = chart_cache.get(resolved["cacheKey"])
+        if chart is None:
+            chart = await chart_flights.run(resolved["cacheKey"], lambda: load_birth_chart(resolved))
         
-        # Prepare ascendant and midheaven
-        ascendant_info = degrees_to_sign(ascendant)
-        mc_info = degrees_to_sign(mc)
-        
-        return BirthChart(
-            ascendant={
-                "longitude": round(ascendant, 3),
-                "sign": ascendant_info["sign"],
-                "degreeInSign": ascendant_info["degreeInSign"]
-            },
-            midheaven={
-                "longitude": round(mc, 3),
-                "sign": mc_info["sign"],
-                "degreeInSign": mc_info["degreeInSign"]
-            },
-            planets=planets,
-            houses=houses,
-            aspects=aspects,
-            metadata=metadata
-        )
+        with stage("birth_chart", "metadata"):
+            return attach_chart_metadata(chart, resolved)
         
+    except HTTPException:
+        raise
+    # A full ephemeris queue (EPHEMERIS_MAX_QUEUE) is backpressure, not a failure
+    except ExecutorBusy as e:
+        raise HTTPException(status_code=503, detail=f"Chart calculation is busy, please retry: {str(e)}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error calculating birth chart: {str(e)}")
 
+def _compute_chart_chunk(jobs: List[tuple]) -> List[tuple]:
+    """Compute a chunk of (julian_day, lat, lng, *chart_options) jobs inside a worker process"""
+    results = []
+    for job in jobs:
+        try:
+            results.append((compute_birth_chart(*job), None))
+        except Exception as e:
+            results.append((None, str(e)))
+    return results
+
+def get_chart_process_pool() -> ProcessPoolExecutor:
+    """Lazily start the worker pool used for bulk chart computation"""
+    global chart_process_pool
+    if chart_process_pool is None:
+        chart_process_pool = ProcessPoolExecutor(
+            max_workers=CHART_WORKERS,
+            initializer=configure_ephemeris
+        )
+    return chart_process_pool
+
+async def calculate_birth_charts_batch(birth_datas: List[BirthData], cache_results: bool = True) -> List[tuple]:
+    """Calculate many charts, fanning cache misses out over the process pool.
+
+    Returns a (chart, error) tuple per input, in input order. With
+    cache_results false, newly computed charts are not added to the chart
+    cache (bulk imports would otherwise evict every hot chart).
+    """
+    results: List[tuple] = [(None, None)] * len(birth_datas)
+    resolved_items = {}
+    computed = {}  # cache key -> (chart, error)
+    pending = {}  # cache key -> (julian_day, lat, lng, *chart_options)
+    
+    for index, (birth_data, error) in enumerate(await load_stored_birth_datas(birth_datas)):
+        if birth_data is None:
+            results[index] = (None, error)
+            continue
+        try:
+            resolved = resolve_birth_data(birth_data)
+        except HTTPException as e:
+            results[index] = (None, str(e.detail))
+            continue
+        except Exception as e:
+            results[index] = (None, f"Error calculating birth chart: {str(e)}")
+            continue
+        
+        resolved_items[index] = resolved
+        key = resolved["cacheKey"]
+        if key in computed or key in pending:
+            continue
+        chart = chart_cache.get(key)
+        if chart is None:
+            chart = shared_chart(key)
+            if chart is not None and cache_results:
+                chart_cache.put(key, chart)
+        if chart is not None:
+            computed[key] = (chart, None)
+        else:
+            pending[key] = (resolved["julianDay"], resolved["lat"], resolved["lng"], *resolved["chartOptions"])
+    
+    # Misses of both caches are looked up in the chart store in one go, off the event loop
+    if pending and chart_store is not None:
+        loop = asyncio.get_running_loop()
+        for key, chart in (await loop.run_in_executor(None, stored_charts, list(pending))).items():
+            del pending[key]
+            computed[key] = (chart, None)
+            if cache_results:
+                share_chart(key, chart)
+                chart_cache.put(key, chart)
+    
+    async def compute_pending(keys: List[tuple]) -> list:
+        # Several chunks per worker keep the pool balanced when some charts are slower
+        chunk_size = max(1, math.ceil(len(keys) / (CHART_WORKERS * 4)))
+        chunks = [keys[i:i + chunk_size] for i in range(0, len(keys), chunk_size)]
+        
+        loop = asyncio.get_running_loop()
+        pool = get_chart_process_pool()
+        chunk_results = await asyncio.gather(*[
+            loop.run_in_executor(pool, _compute_chart_chunk, [pending[key] for key in chunk])
+            for chunk in chunks
+        ])
+        
+        charts = []
+        for chunk, chunk_result in zip(chunks, chunk_results):
+            for key, (chart, error) in zip(chunk, chunk_result):
+                if chart is None:
+                    charts.append(RuntimeError(error))
+                    continue
+                if cache_results:
+                    share_chart(key, chart)
+                    chart_cache.put(key, chart)
+                charts.append(chart)
+        return charts
+    
+    # Charts other requests are already computing are joined rather than recomputed
+    if pending:
+        keys = list(pending)
+        for key, outcome in zip(keys, await chart_flights.run_many(keys, compute_pending)):
+            computed[key] = (None, str(outcome)) if isinstance(outcome, BaseException) else (outcome, None)
+    
+    for index, resolved in resolved_items.items():
+        chart, error = computed[resolved["cacheKey"]]
+        if chart is not None:
+            results[index] = (attach_chart_metadata(chart, resolved), None)
+        else:
+            results[index] = (None, f"Error calculating birth chart: {error}")
+    
+    return results
+
 @app.post("/api/birth-chart", response_model=BirthChart)
-async def calculate_birth_chart(birth_data: BirthData):
+async def calculate_birth_chart(birth_data: BirthData, request: Request):
     """Public endpoint for birth chart calculation"""
-    return await calculate_birth_chart_internal(birth_data)
+    chart = await calculate_birth_chart_internal(birth_data)
+    return encoded_response(chart, negotiate_format(request.headers.get("accept")))
+
+
+@app.post("/api/birth-charts/batch", response_model=List[BatchChartResult])
+async def calculate_birth_charts(birth_datas: List[BirthData], request: Request):
+    """Calculate many birth charts in one request; failures are reported per item"""
+    if len(birth_datas) > BATCH_MAX_SIZE:
+        raise HTTPException(status_code=413, detail=f"Batch size exceeds the limit of {BATCH_MAX_SIZE} charts")
+    
+    results = await calculate_birth_charts_batch(birth_datas)
+    # Plain dicts in BatchChartResult's shape, so the charts' cached encodings are used
+    return encoded_response(
+        [{"index": index, "chart": chart, "error": error} for index, (chart, error) in enumerate(results)],
+        negotiate_format(request.headers.get("accept"))
+    )
+
+def require_chart_store() -> ChartStore:
+    if chart_store is None:
+        raise HTTPException(status_code=503, detail="The chart store is disabled")
+    return chart_store
+
+async def request_lines(request: Request):
+    """Lines of a request body, decoded as it streams in"""
+    buffer = b""
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            yield line.decode("utf-8", errors="replace").rstrip("\r")
+    if buffer:
+        yield buffer.decode("utf-8", errors="replace").rstrip("\r")
+
+async def import_chart_batch(lines: List[tuple], fmt: str, header: Optional[List[str]]) -> tuple:
+    """Compute and store the charts for (line number, text) lines; returns the
+    stored {"line", "id"} items and the {"line", "error"} items"""
+    parsed = []
+    errors = []
+    for (line_number, _), (fields, error) in zip(lines, read_records([text for _, text in lines], fmt, header)):
+        if error is None:
+            try:
+                parsed.append((line_number, BirthData(**fields)))
+                continue
+            except ValidationError as e:
+                error = validation_error_message(e)
+        errors.append({"line": line_number, "error": error})
+    
+    # Records referring to a stored chart are stored with its birth data filled in
+    records = []
+    loaded = await load_stored_birth_datas([birth_data for _, birth_data in parsed])
+    for (line_number, _), (birth_data, error) in zip(parsed, loaded):
+        if birth_data is None:
+            errors.append({"line": line_number, "error": error})
+        else:
+            records.append((line_number, birth_data))
+    errors.sort(key=lambda item: item["line"])
+    
+    results = await calculate_birth_charts_batch([birth_data for _, birth_data in records], cache_results=False)
+    stored = []
+    for (line_number, birth_data), (chart, error) in zip(records, results):
+        if chart is None:
+            errors.append({"line": line_number, "error": error})
+            continue
+        stored.append((line_number, chart_store_record(birth_data, chart)))
+    
+    # One transaction per batch, off the event loop
+    loop = asyncio.get_running_loop()
+    ids = await loop.run_in_executor(None, chart_store.add_many, [record for _, record in stored])
+    return [{"line": line_number, "id": chart_id} for (line_number, _), chart_id in zip(stored, ids)], errors
+
+@app.post("/api/charts", status_code=201)
+async def save_chart(birth_data: BirthData, request: Request):
+    """Calculate a birth chart and save it in the chart store"""
+    store = require_chart_store()
+    birth_data = await load_stored_birth_data(birth_data)
+    chart = await calculate_birth_chart_internal(birth_data)
+    loop = asyncio.get_running_loop()
+    record = chart_store_record(birth_data, chart)
+    chart_id = await loop.run_in_executor(None, store.add, *record)
+    return encoded_response(
+        {"id": chart_id, "chart": chart}, negotiate_format(request.headers.get("accept")), status_code=201
+    )
 
+@app.post("/api/charts/import")
+async def import_charts(request: Request, format: str = "jsonl"):
+    """Compute and store the charts for an upload of birth records (JSONL or CSV).
+
+    The body is read as it streams in and handled CHART_IMPORT_BATCH_SIZE
+    records at a time: each batch is computed on the worker pool and written
+    in one transaction.
+    """
+    require_chart_store()
+    if format not in ("jsonl", "csv"):
+        raise HTTPException(status_code=400, detail="format must be 'jsonl' or 'csv'")
+    
+    charts, errors = [], []
+    header = None
+    batch = []
+    line_number = 0
+    async for line in request_lines(request):
+        line_number += 1
+        if not line.strip():
+            continue
+        if format == "csv" and header is None:
+            header = [name.strip() for name in next(csv.reader([line.lstrip("\ufeff")]))]
+            continue
+        batch.append((line_number, line))
+        if len(batch) >= CHART_IMPORT_BATCH_SIZE:
+            stored, failed = await import_chart_batch(batch, format, header)
+            charts.extend(stored)
+            errors.extend(failed)
+            batch = []
+    if batch:
+        stored, failed = await import_chart_batch(batch, format, header)
+        charts.extend(stored)
+        errors.extend(failed)
+    
+    return {
+        "imported": len(charts),
+        "failed": len(errors),
+        "charts": charts,
+        "errors": sorted(errors, key=lambda error: error["line"])
+    }
+
+@app.get("/api/charts/export")
+async def export_charts(format: str = "jsonl"):
+    """Stream every stored chart as JSONL, or the stored birth data as CSV"""
+    store = require_chart_store()
+    if format == "jsonl":
+        return StreamingResponse(store.export_jsonl(), media_type="application/x-ndjson")
+    if format == "csv":
+        return StreamingResponse(store.export_csv(), media_type="text/csv")
+    raise HTTPException(status_code=400, detail="format must be 'jsonl' or 'csv'")
+
+@app.get("/api/charts/{chart_id}")
+async def get_stored_chart(chart_id: int, request: Request):
+    """A stored chart with its birth data"""
+    loop = asyncio.get_running_loop()
+    stored = await loop.run_in_executor(None, require_chart_store().get, chart_id)
+    if stored is None:
+        raise HTTPException(status_code=404, detail=f"Unknown chart_id: {chart_id}")
+    birth_data, chart_json = stored
+    return encoded_response(
+        {"id": chart_id, "birthData": birth_data, "chart": BirthChart.model_validate_json(chart_json)},
+        negotiate_format(request.headers.get("accept"))
+    )
+
+@app.delete("/api/charts/{chart_id}")
+async def delete_stored_chart(chart_id: int):
+    loop = asyncio.get_running_loop()
+    if not await loop.run_in_executor(None, require_chart_store().delete, chart_id):
+        raise HTTPException(status_code=404, detail=f"Unknown chart_id: {chart_id}")
+    return {"deleted": chart_id}
+
+def search_aspect_index(conditions: List[tuple]) -> tuple:
+    sync_aspect_index()
+    return aspect_index.search(conditions)
+
+@app.post("/api/charts/search")
+async def search_charts(request: AspectSearchRequest):
+    """Stored charts whose bodies aspect points of one chart, e.g. Venus trine my Sun within 3°"""
+    require_chart_store()
+    if not request.conditions:
+        raise HTTPException(status_code=400, detail="At least one condition is required")
+    if not 1 <= request.limit <= CHART_SEARCH_MAX_LIMIT:
+        raise HTTPException(status_code=400, detail=f"limit must be between 1 and {CHART_SEARCH_MAX_LIMIT}")
+    aspect_angles = {**MAJOR_ASPECTS, **MINOR_ASPECTS}
+    for condition in request.conditions:
+        if condition.body not in PLANET_SYMBOLS:
+            raise HTTPException(status_code=400, detail=f"Unknown body: {condition.body}")
+        if condition.point not in PLANET_SYMBOLS and condition.point not in ("Ascendant", "Midheaven"):
+            raise HTTPException(status_code=400, detail=f"Unknown point: {condition.point}")
+        unknown = [name for name in condition.aspects or () if name not in aspect_angles]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown aspect: {', '.join(unknown)}")
+        if not 0 <= condition.orb <= CHART_SEARCH_MAX_ORB:
+            raise HTTPException(status_code=400, detail=f"orb must be between 0 and {CHART_SEARCH_MAX_ORB:g}")
+    
+    chart = await calculate_birth_chart_internal(request.birth_data)
+    
+    # The index holds tropical longitudes, so search with the chart's tropical points
+    offset = chart.metadata.get("ayanamsaDegrees") or 0.0
+    points = {planet.planet: planet.longitude for planet in chart.planets}
+    points["Ascendant"] = chart.ascendant["longitude"]
+    points["Midheaven"] = chart.midheaven["longitude"]
+    aspect_names = [condition.aspects or list(MAJOR_ASPECTS) for condition in request.conditions]
+    conditions = []
+    for condition, names in zip(request.conditions, aspect_names):
+        if condition.point not in points:
+            raise HTTPException(status_code=400, detail=f"The chart has no {condition.point}")
+        target = (points[condition.point] + offset) % 360
+        conditions.append((condition.body, target, [aspect_angles[name] for name in names], condition.orb))
+    
+    with stage("chart_search", "index"):
+        loop = asyncio.get_running_loop()
+        ids, aspects, orbs = await loop.run_in_executor(None, search_aspect_index, conditions)
+    
+    # A stored searching chart does not match itself
+    if request.birth_data.chart_id is not None:
+        keep = ids != request.birth_data.chart_id
+        ids, aspects, orbs = ids[keep], aspects[keep], orbs[keep]
+    
+    results = [
+        {
+            "id": int(ids[row]),
+            "orb": round(float(orbs[row].sum()), 2),
+            "matches": [
+                {
+                    "body": condition.body,
+                    "point": condition.point,
+                    "aspect": names[aspects[row, position]],
+                    "orb": round(float(orbs[row, position]), 2)
+                }
+                for position, (condition, names) in enumerate(zip(request.conditions, aspect_names))
+            ]
+        }
+        for row in range(min(request.limit, len(ids)))
+    ]
+    return {
+        "results": results,
+        "metadata": {
+            "calculationType": "aspect-search",
+            "indexedCharts": len(aspect_index),
+            "matches": len(ids)
+        }
+    }
 
 @app.post("/api/compatibility-analysis")
-async def compatibility_analysis(user_birth_data: BirthData, partner_birth_data: BirthData):
+async def compatibility_analysis(user_birth_data: BirthData, partner_birth_data: BirthData, request: Request):
     """Get compatibility analysis between two birth charts"""
     try:
         # Calculate both birth charts
-        user_chart = await calculate_birth_chart_internal(user_birth_data)
-        partner_chart = await calculate_birth_chart_internal(partner_birth_data)
-        
-        # Calculate compatibility aspects
-        compatibility_aspects = []
-        
-        # Compare planetary positions between charts
-        user_planets = {planet.planet: planet.longitude for planet in user_chart.planets}
-        partner_planets = {planet.planet: planet.longitude for planet in partner_chart.planets}
-        
-        aspect_angles = {
-            "Conjunction": 0,
-            "Sextile": 60,
-            "Square": 90,
-            "Trine": 120,
-            "Opposition": 180
-        }
+        user_chart, partner_chart = await asyncio.gather(
+            calculate_birth_chart_internal(user_birth_data),
+            calculate_birth_chart_internal(partner_birth_data)
+        )
         
-        for planet_name in user_planets:
-            if planet_name in partner_planets:
-                user_longitude = user_planets[planet_name]
-                partner_longitude = partner_planets[planet_name]
-                
-                angle_diff = abs(user_longitude - partner_longitude)
-                if angle_diff > 180:
-                    angle_diff = 360 - angle_diff
-                
-                for aspect_name, aspect_angle in aspect_angles.items():
-                    orb = abs(angle_diff - aspect_angle)
-                    if orb <= 8:  # 8 degree orb for compatibility
-                        compatibility_aspects.append({
-                            "planet": planet_name,
-                            "aspect": aspect_name,
-                            "orb": round(orb, 2),
-                            "strength": "strong" if orb <= 3 else "moderate" if orb <= 5 else "weak"
-                        })
+        # Compare each planet with the same planet in the partner's chart, both
+        # in the tropical zodiac since each chart may have its own
+        user_points, partner_points = tropical_points(user_chart), tropical_points(partner_chart)
+        compatibility_aspects = [
+            {
+                "planet": aspect["body1"],
+                "aspect": aspect["aspect"],
+                "orb": round(aspect["orb"], 2),
+                "strength": "strong" if aspect["orb"] <= 3 else "moderate" if aspect["orb"] <= 5 else "weak"
+            }
+            for aspect in find_aspects(
+                [planet.planet for planet in user_chart.planets],
+                [user_points[planet.planet] for planet in user_chart.planets],
+                [planet.planet for planet in partner_chart.planets],
+                [partner_points[planet.planet] for planet in partner_chart.planets],
+                orbs=SYNASTRY_ORBS,
+                same_body_only=True
+            )
+        ]
         
         # Calculate overall compatibility score based on aspects
         compatibility_score = 50  # Base score
         for aspect in compatibility_aspects:
-            if aspect["aspect"] in ["Trine", "Sextile"]:
-                compatibility_score += 10 if aspect["strength"] == "strong" else 5
-            elif aspect["aspect"] in ["Square", "Opposition"]:
-                compatibility_score -= 5 if aspect["strength"] == "strong" else 2
-            elif aspect["aspect"] == "Conjunction":
-                compatibility_score += 5  # Neutral to positive
+            strong_weight, weak_weight = COMPATIBILITY_WEIGHTS.get(aspect["aspect"], (0, 0))
+            compatibility_score += strong_weight if aspect["strength"] == "strong" else weak_weight
         
         compatibility_score = max(0, min(100, compatibility_score))
         
-        return {
+        return encoded_response({
             "compatibilityScore": round(compatibility_score),
             "compatibilityAspects": compatibility_aspects,
             "userChart": user_chart,
@@ -423,14 +1307,107 @@ async def compatibility_analysis(user_birth_data: BirthData, partner_birth_data:
                 "ephemerisData": "Swiss Ephemeris",
                 "aspectOrb": "8 degrees"
             }
-        }
+        }, negotiate_format(request.headers.get("accept")))
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error in compatibility analysis: {str(e)}")
 
+def compatibility_scores(aspect_index: np.ndarray, orb: np.ndarray, orbs: OrbTable) -> np.ndarray:
+    """Vectorized compatibility score for rows of same-body synastry aspects"""
+    strong = np.array([COMPATIBILITY_WEIGHTS.get(name, (0, 0))[0] for name in orbs.names] + [0])
+    weak = np.array([COMPATIBILITY_WEIGHTS.get(name, (0, 0))[1] for name in orbs.names] + [0])
+    
+    # Index -1 (no aspect) picks the trailing zero weight
+    contributions = np.where(orb <= 3, strong[aspect_index], weak[aspect_index])
+    return np.clip(50 + contributions.sum(axis=1), 0, 100)
+
+def chart_longitudes(chart: BirthChart) -> List[float]:
+    """Planet longitudes in PLANET_SYMBOLS order, NaN for bodies that failed"""
+    longitudes = {planet.planet: planet.longitude for planet in chart.planets}
+    return [longitudes.get(name, np.nan) for name in PLANET_SYMBOLS]
+
+@app.post("/api/compatibility-ranking")
+async def compatibility_ranking(request: CompatibilityRankingRequest):
+    """Rank a pool of candidates by compatibility with one user"""
+    if request.top_k < 1:
+        raise HTTPException(status_code=400, detail="top_k must be at least 1")
+    if len(request.candidates) > BATCH_MAX_SIZE:
+        raise HTTPException(status_code=413, detail=f"Candidate pool exceeds the limit of {BATCH_MAX_SIZE} charts")
+    
+    try:
+        user_chart = await calculate_birth_chart_internal(request.user)
+        # Stored candidates get their names from the chart store
+        candidates = [
+            birth_data or candidate
+            for candidate, (birth_data, _) in zip(request.candidates, await load_stored_birth_datas(request.candidates))
+        ]
+        candidate_results = await calculate_birth_charts_batch(candidates)
+        
+        # Score every candidate against the user in one pass
+        scored = [index for index, (chart, _) in enumerate(candidate_results) if chart is not None]
+        errors = [
+            {"index": index, "error": error}
+            for index, (chart, error) in enumerate(candidate_results) if chart is None
+        ]
+        body_names = list(PLANET_SYMBOLS)
+        scores = np.empty(0)
+        if scored:
+            # Tropical on both sides, since the user and each candidate may use different zodiacs
+            candidate_longitudes = np.array([tropical_longitudes(candidate_results[index][0]) for index in scored])
+            aspect_index, orb = same_body_aspects(
+                body_names, tropical_longitudes(user_chart), candidate_longitudes, orbs=SYNASTRY_ORBS
+            )
+            scores = compatibility_scores(aspect_index, orb, SYNASTRY_ORBS)
+        
+        # Partial selection of the top K, then a stable sort of just those
+        top_k = min(request.top_k, len(scored))
+        top = np.argpartition(-scores, top_k - 1)[:top_k] if top_k else np.empty(0, dtype=int)
+        top = top[np.lexsort((top, -scores[top]))]
+        
+        results = [
+            {
+                "index": scored[position],
+                "name": candidates[scored[position]].name,
+                "compatibilityScore": int(round(scores[position]))
+            }
+            for position in top
+        ]
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error in compatibility ranking: {str(e)}")
+    
+    metadata = {
+        "calculationType": "compatibility-ranking",
+        "ephemerisData": "Swiss Ephemeris",
+        "aspectOrb": "8 degrees",
+        "candidates": len(request.candidates),
+        "scored": len(scored)
+    }
+    
+    if request.stream or top_k > RANKING_STREAM_THRESHOLD:
+        def stream_results():
+            # One JSON object per line: ranked results, then errors, then metadata
+            for result in results:
+                yield json.dumps(result) + "\n"
+            for error in errors:
+                yield json.dumps(error) + "\n"
+            yield json.dumps({"metadata": metadata}) + "\n"
+        
+        return StreamingResponse(stream_results(), media_type="application/x-ndjson")
+    
+    return {
+        "results": results,
+        "errors": errors,
+        "metadata": metadata
+    }
+
 @app.post("/api/soulmate-analysis")
-async def soulmate_analysis(birth_data: BirthData):
+async def soulmate_analysis(birth_data: BirthData, request: Request):
     """Get soulmate analysis based on birth chart"""
+    birth_data = await load_stored_birth_data(birth_data)
     try:
         # Calculate birth chart
         user_chart = await calculate_birth_chart_internal(birth_data)
@@ -499,7 +1476,7 @@ async def soulmate_analysis(birth_data: BirthData):
         else:
             meeting_timing.append("30s+ - Deep soul connections")
         
-        return {
+        return encoded_response({
             "soulmateIndicators": soulmate_indicators,
             "meetingTiming": meeting_timing,
             "userChart": user_chart,
@@ -508,104 +1485,82 @@ async def soulmate_analysis(birth_data: BirthData):
                 "ephemerisData": "Swiss Ephemeris",
                 "analysisDate": datetime.datetime.now().isoformat()
             }
-        }
+        }, negotiate_format(request.headers.get("accept")))
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error in soulmate analysis: {str(e)}")
 
+def calculate_advanced_positions(julian_day: float) -> tuple:
+    """Lunar phase and planetary longitudes for the advanced analysis"""
+    # Get all planetary positions for aspect calculation
+    all_positions = []
+    bodies = [swe.SUN, swe.MOON, swe.MERCURY, swe.VENUS, swe.MARS,
+              swe.JUPITER, swe.SATURN, swe.URANUS, swe.NEPTUNE, swe.PLUTO]
+    planet_names = ['Sun', 'Moon', 'Mercury', 'Venus', 'Mars',
+                   'Jupiter', 'Saturn', 'Uranus', 'Neptune', 'Pluto']
+    
+    for planet_code, planet_name in zip(bodies, planet_names):
+        try:
+            longitude, _ = calculate_body_position(julian_day, planet_code, planet_name)
+            all_positions.append({
+                'name': planet_name,
+                'longitude': longitude
+            })
+        except:
+            count_fallback("body_skipped")
+            continue
+    
+    # Lunar phase as the Moon's elongation from the Sun: 0° new, 90° first quarter, 180° full;
+    # None when either body was skipped
+    longitudes = {position['name']: position['longitude'] for position in all_positions}
+    lunar_phase = None
+    if 'Sun' in longitudes and 'Moon' in longitudes:
+        lunar_phase = (longitudes['Moon'] - longitudes['Sun']) % 360
+    
+    return lunar_phase, all_positions
+
 @app.post("/api/advanced-analysis")
 async def advanced_analysis(birth_data: BirthData):
     """Get advanced astrological analysis with additional calculations"""
+    birth_data = await load_stored_birth_data(birth_data)
     try:
         # Parse date and time
-        date_time_str = f"{birth_data.date} {birth_data.time}"
-        dt = parser.parse(date_time_str)
-        
-        # Extract components
-        year = dt.year
-        month = dt.month
-        day = dt.day
-        hour = dt.hour + dt.minute / 60.0 + dt.second / 3600.0
+        with stage("advanced_analysis", "parse"):
+            dt = parse_datetime(f"{birth_data.date} {birth_data.time}")
         
-        # Get coordinates
-        if not birth_data.coordinates:
-            raise HTTPException(status_code=400, detail="Coordinates are required")
+        # Get coordinates, geocoding the city when they are missing
+        with stage("advanced_analysis", "location"):
+            lat, lng, tz_name = resolve_location(birth_data)
         
-        lat = birth_data.coordinates["lat"]
-        lng = birth_data.coordinates["lng"]
+        julian_day, _ = local_birth_time_to_julian_day(dt, tz_name, "advanced_analysis")
         
-        # Calculate Julian Day
-        try:
-            if birth_data.timezone:
-                tz_name = birth_data.timezone
-            else:
-                tz_name = get_timezone_from_coordinates(lat, lng)
-            
-            local_tz = tz.gettz(tz_name)
-            local_dt = datetime(year, month, day, dt.hour, dt.minute, tzinfo=local_tz)
-            utc_dt = local_dt.astimezone(tz.UTC)
-            ut_hours = utc_dt.hour + utc_dt.minute/60 + utc_dt.second/3600
-            julian_day = swe.julday(utc_dt.year, utc_dt.month, utc_dt.day, ut_hours)
-        except Exception as e:
-            local_dt = datetime(year, month, day, dt.hour, dt.minute)
-            utc_dt = local_dt.replace(tzinfo=timezone.utc)
-            ut_hours = utc_dt.hour + utc_dt.minute/60 + utc_dt.second/3600
-            julian_day = swe.julday(utc_dt.year, utc_dt.month, utc_dt.day, ut_hours)
-        
-        # Set up Swiss Ephemeris flags
-        IFLAG = swe.FLG_SWIEPH | swe.FLG_SPEED
-        
-        # Calculate lunar phases and eclipses
-        lunar_phase = swe.lun_phase(julian_day)
-        
-        # Calculate planetary aspects with tighter orbs
-        advanced_aspects = []
-        aspect_angles = {
-            "Conjunction": 0,
-            "Sextile": 60,
-            "Square": 90,
-            "Trine": 120,
-            "Opposition": 180
-        }
-        
-        # Get all planetary positions for aspect calculation
-        all_positions = []
-        bodies = [swe.SUN, swe.MOON, swe.MERCURY, swe.VENUS, swe.MARS,
-                  swe.JUPITER, swe.SATURN, swe.URANUS, swe.NEPTUNE, swe.PLUTO]
-        planet_names = ['Sun', 'Moon', 'Mercury', 'Venus', 'Mars',
-                       'Jupiter', 'Saturn', 'Uranus', 'Neptune', 'Pluto']
-        
-        for planet_code, planet_name in zip(bodies, planet_names):
-            try:
-                xx, _ = swe.calc_ut(julian_day, planet_code, IFLAG)
-                longitude = xx[0]
-                all_positions.append({
-                    'name': planet_name,
-                    'longitude': longitude
-                })
-            except:
-                continue
+        # Ephemeris calls run on the dedicated ephemeris executor, once for concurrent identical requests
+        with stage("advanced_analysis", "positions"):
+            lunar_phase, all_positions = await advanced_position_flights.run(
+                round(julian_day, 7), lambda: ephemeris_executor.run(calculate_advanced_positions, julian_day)
+            )
         
-        # Calculate aspects with 5-degree orb for more precision
-        for i, planet1 in enumerate(all_positions):
-            for j, planet2 in enumerate(all_positions[i+1:], i+1):
-                angle_diff = abs(planet1['longitude'] - planet2['longitude'])
-                if angle_diff > 180:
-                    angle_diff = 360 - angle_diff
-                
-                for aspect_name, aspect_angle in aspect_angles.items():
-                    orb = abs(angle_diff - aspect_angle)
-                    if orb <= 5:  # Tighter orb for advanced analysis
-                        advanced_aspects.append({
-                            "planet1": planet1['name'],
-                            "planet2": planet2['name'],
-                            "aspect": aspect_name,
-                            "orb": round(orb, 2),
-                            "strength": "strong" if orb <= 2 else "moderate" if orb <= 3.5 else "weak"
-                        })
+        # Calculate aspects with tighter orbs for more precision
+        with stage("advanced_analysis", "aspects"):
+            advanced_aspects = [
+                {
+                    "planet1": aspect["body1"],
+                    "planet2": aspect["body2"],
+                    "aspect": aspect["aspect"],
+                    "orb": round(aspect["orb"], 2),
+                    "strength": "strong" if aspect["orb"] <= 2 else "moderate" if aspect["orb"] <= 3.5 else "weak"
+                }
+                for aspect in find_aspects(
+                    [position['name'] for position in all_positions],
+                    [position['longitude'] for position in all_positions],
+                    orbs=ADVANCED_ORBS
+                )
+            ]
         
         return {
-            "lunarPhase": round(lunar_phase, 2),
+            "lunarPhase": round(lunar_phase, 2) if lunar_phase is not None else None,
             "advancedAspects": advanced_aspects,
             "julianDay": round(julian_day, 5),
             "metadata": {
@@ -615,77 +1570,459 @@ async def advanced_analysis(birth_data: BirthData):
             }
         }
         
+    except HTTPException:
+        raise
+    except ExecutorBusy as e:
+        raise HTTPException(status_code=503, detail=f"Chart calculation is busy, please retry: {str(e)}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error in advanced analysis: {str(e)}")
 
+def parse_transit_date(value: str) -> float:
+    """UTC Julian day for a date or datetime; naive values are taken as UTC"""
+    try:
+        dt = parse_datetime(value)
+    except (ValueError, OverflowError):
+        raise HTTPException(status_code=400, detail=f"Invalid date: {value}")
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc)
+    return utc_julian_day(dt)
+
+@app.post("/api/transits")
+async def transit_timeline(request: TransitRequest):
+    """Stream exact transit aspects, ingresses and stations over a date range"""
+    start_jd = parse_transit_date(request.start_date)
+    end_jd = parse_transit_date(request.end_date)
+    if end_jd <= start_jd:
+        raise HTTPException(status_code=400, detail="end_date must be after start_date")
+    if end_jd - start_jd > TRANSIT_MAX_YEARS * 365.25:
+        raise HTTPException(status_code=413, detail=f"Date range exceeds the limit of {TRANSIT_MAX_YEARS:g} years")
+    if request.format not in ("ndjson", "sse"):
+        raise HTTPException(status_code=400, detail="format must be 'ndjson' or 'sse'")
+
+    body_names = request.bodies or DEFAULT_TRANSIT_BODIES
+    aspect_angles = {**MAJOR_ASPECTS, **MINOR_ASPECTS}
+    aspect_names = request.aspects or list(MAJOR_ASPECTS)
+    event_types = request.events or list(EVENT_TYPES)
+    for kind, names, known in (("body", body_names, BODY_CODES), ("aspect", aspect_names, aspect_angles),
+                               ("event type", event_types, EVENT_TYPES)):
+        unknown = [name for name in names if name not in known]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown {kind}: {', '.join(unknown)}")
+
+    natal_chart = await calculate_birth_chart_internal(request.birth_data)
+    # Transiting positions are tropical, so a sidereal natal chart is compared in the tropical zodiac
+    natal_points = tropical_points(natal_chart)
+
+    search = TransitSearch(
+        bodies={name: BODY_CODES[name] for name in body_names},
+        natal_points=natal_points,
+        aspects={name: aspect_angles[name] for name in aspect_names},
+        sign_names=ZODIAC_SIGNS,
+        position=calculate_body_position,
+        positions=calculate_body_positions,
+        event_types=event_types
+    )
+
+    def encode(event: dict) -> str:
+        if request.format == "sse":
+            return f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+        return json.dumps(event) + "\n"
+
+    async def stream_events():
+        # Search one window at a time so the first events go out right away
+        count = 0
+        try:
+            for window_start, window_end in transit_windows(start_jd, end_jd, TRANSIT_WINDOW_DAYS):
+                events = await ephemeris_executor.run(search.find_events, window_start, window_end)
+                for event in events:
+                    yield encode(event)
+                count += len(events)
+        except Exception as e:
+            yield encode({"type": "error", "detail": f"Error searching transits: {str(e)}"})
+            return
+        yield encode({
+            "type": "end",
+            "events": count,
+            "startJulianDay": round(start_jd, 5),
+            "endJulianDay": round(end_jd, 5)
+        })
+
+    media_type = "text/event-stream" if request.format == "sse" else "application/x-ndjson"
+    return StreamingResponse(stream_events(), media_type=media_type)
+
+def compute_solar_returns(natal_jd: float, birth_year: int, years: List[int], lat: float, lng: float,
+                          natal_lat: float, natal_lng: float, chart_options: tuple, progressions: bool) -> List[dict]:
+    """Solar return charts (cast at lat/lng) and progressed charts (at the birthplace) for each year"""
+    _, _, zodiac, ayanamsa, _ = chart_options
+    
+    def sun_position(julian_day: float) -> tuple:
+        longitude, speed = calculate_body_position(julian_day, swe.SUN, "Sun")
+        if zodiac == SIDEREAL:
+            offset, rate = ayanamsa_offset(julian_day, ayanamsa)
+            return (longitude - offset) % 360, speed - rate
+        return longitude, speed
+    
+    natal_longitude, _ = sun_position(natal_jd)
+    returns = []
+    for year in years:
+        with stage("solar_return", "solve"):
+            try:
+                return_jd, calls = solar_return(natal_longitude, return_estimate(natal_jd, year - birth_year), sun_position)
+            except ReturnNotFound as e:
+                raise ReturnNotFound(f"No solar return found for {year}: {str(e)}") from e
+        with stage("solar_return", "chart"):
+            chart = compute_birth_chart(return_jd, lat, lng, *chart_options)
+        progressed = None
+        if progressions:
+            progressed_jd = progressed_julian_day(natal_jd, return_jd)
+            with stage("solar_return", "progressed_chart"):
+                progressed = {
+                    "julianDay": round(progressed_jd, 6),
+                    "utcTime": julian_day_to_utc(progressed_jd),
+                    "chart": compute_birth_chart(progressed_jd, natal_lat, natal_lng, *chart_options)
+                }
+        returns.append({
+            "year": year,
+            "julianDay": round(return_jd, 6),
+            "utcTime": julian_day_to_utc(return_jd),
+            "ephemerisCalls": calls,
+            "chart": chart,
+            "progressed": progressed
+        })
+    return returns
+
+@app.post("/api/solar-returns")
+async def solar_returns(request: SolarReturnRequest, http_request: Request):
+    """Solar return charts for a range of years, with the secondary progressed chart at each return"""
+    end_year = request.end_year if request.end_year is not None else request.start_year
+    if end_year < request.start_year:
+        raise HTTPException(status_code=400, detail="end_year must not be before start_year")
+    if end_year - request.start_year + 1 > SOLAR_RETURN_MAX_YEARS:
+        raise HTTPException(status_code=413, detail=f"At most {SOLAR_RETURN_MAX_YEARS} years per request")
+    
+    birth_data = await load_stored_birth_data(request.birth_data)
+    resolved = resolve_chart_birth_data(birth_data)
+    birth_year = resolved["localTime"].year
+    if request.start_year <= birth_year:
+        raise HTTPException(status_code=400, detail=f"start_year must be after the birth year ({birth_year})")
+    natal_chart = await resolved_birth_chart(resolved)
+    
+    lat, lng = resolved["lat"], resolved["lng"]
+    if request.coordinates:
+        try:
+            lat, lng = float(request.coordinates["lat"]), float(request.coordinates["lng"])
+        except (KeyError, TypeError, ValueError):
+            raise HTTPException(status_code=400, detail="coordinates must have numeric lat and lng")
+    
+    try:
+        returns = await ephemeris_executor.run(
+            compute_solar_returns, resolved["julianDay"], birth_year, list(range(request.start_year, end_year + 1)),
+            lat, lng, resolved["lat"], resolved["lng"], resolved["chartOptions"], request.progressions
+        )
+    except ExecutorBusy as e:
+        raise HTTPException(status_code=503, detail=f"Chart calculation is busy, please retry: {str(e)}")
+    except ReturnNotFound as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error calculating solar returns: {str(e)}")
+    
+    return encoded_response({
+        "natalChart": natal_chart,
+        "returns": returns,
+        "metadata": {
+            "calculationType": "solar-return",
+            "coordinates": {"lat": lat, "lng": lng},
+            "zodiac": resolved["zodiac"],
+            **({"ayanamsa": resolved["ayanamsa"]} if resolved["ayanamsa"] else {})
+        }
+    }, negotiate_format(http_request.headers.get("accept")))
+
+def scan_birth_day(start_jd: float, end_jd: float, lat: float, lng: float, house_system: str,
+                   zodiac: str, ayanamsa: Optional[str], bodies: List[str]) -> tuple:
+    """Ascendant sign, Moon sign and per-body house intervals over [start_jd, end_jd]"""
+    offset = ayanamsa_offset((start_jd + end_jd) / 2, ayanamsa)[0] if zodiac == SIDEREAL else 0.0
+    scan_bodies = {name: BODY_CODES[name] for name in dict.fromkeys(["Moon", *bodies])}
+    scan = BirthTimeScan(
+        start_jd, end_jd, HouseFrame(start_jd, lat, lng), house_system, scan_bodies, calculate_body_position, offset
+    )
+    ascendant = scan.ascendant_signs()
+    moon = scan.signs("Moon")
+    houses = {name: scan.body_houses(name) for name in bodies}
+    # The frame's sidereal time and obliquity, and the ayanamsa, on top of the interpolation nodes
+    ephemeris_calls = scan.ephemeris_calls + 2 + (zodiac == SIDEREAL)
+    return ascendant, moon, houses, scan.houses(start_jd).system, ephemeris_calls, scan.evaluations
+
+@app.post("/api/birth-time-ranges")
+async def birth_time_ranges(request: BirthTimeRangesRequest):
+    """For a birth date and place without a time: the stretches of the local day
+    over which the ascendant sign, the Moon sign and each body's house stay the same"""
+    try:
+        day = parse_datetime(request.date).replace(hour=0, minute=0, second=0, microsecond=0, tzinfo=None)
+    except (ValueError, OverflowError):
+        raise HTTPException(status_code=400, detail=f"Invalid date: {request.date}")
+    bodies = request.bodies or list(BODY_CODES)
+    unknown = [name for name in bodies if name not in BODY_CODES]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown body: {', '.join(unknown)}")
+    zodiac, ayanamsa, house_system = resolve_chart_view(request.zodiac, request.ayanamsa, request.house_system)
+    
+    place = BirthData(
+        name="", date=request.date, time="00:00", city=request.city, gender="",
+        coordinates=request.coordinates, timezone=request.timezone
+    )
+    lat, lng, tz_name = resolve_location(place)
+    # Local midnight to midnight, so DST days are 23 or 25 hours long
+    start_jd, _ = local_birth_time_to_julian_day(day, tz_name, "birth_time_ranges")
+    end_jd, _ = local_birth_time_to_julian_day(day + timedelta(days=1), tz_name, "birth_time_ranges")
+    
+    try:
+        with stage("birth_time_ranges", "scan"):
+            ascendant, moon, houses, house_system_used, ephemeris_calls, evaluations = await ephemeris_executor.run(
+                scan_birth_day, start_jd, end_jd, lat, lng, house_system, zodiac, ayanamsa, bodies
+            )
+    except ExecutorBusy as e:
+        raise HTTPException(status_code=503, detail=f"Chart calculation is busy, please retry: {str(e)}")
+    
+    local_tz = get_timezone(tz_name) or timezone.utc
+    
+    def local_time(julian_day: float) -> str:
+        return julian_day_to_utc_datetime(julian_day).astimezone(local_tz).isoformat()
+    
+    def ranges(intervals: List[tuple], field: str, values=None) -> List[dict]:
+        return [
+            {"start": local_time(start), "end": local_time(end), field: values[value] if values else value}
+            for start, end, value in intervals
+        ]
+    
+    return {
+        "ascendant": ranges(ascendant, "sign", ZODIAC_SIGNS),
+        "moon": ranges(moon, "sign", ZODIAC_SIGNS),
+        "houses": {name: ranges(intervals, "house") for name, intervals in houses.items()},
+        "metadata": {
+            "calculationType": "birth-time-ranges",
+            "date": day.date().isoformat(),
+            "timezone": tz_name,
+            "coordinates": {"lat": lat, "lng": lng},
+            "houseSystem": house_system_used,
+            "zodiac": zodiac,
+            **({"ayanamsa": ayanamsa} if ayanamsa else {}),
+            "ephemerisCalls": ephemeris_calls,
+            "houseEvaluations": evaluations
+        }
+    }
+
+warmup = Warmup()
+warmup_task: Optional[asyncio.Task] = None
+
+def warm_up_ephemeris_thread(barrier: threading.Barrier, julian_days: List[float]) -> None:
+    """Open the ephemeris files on one ephemeris thread and run synthetic charts through it"""
+    try:
+        # Hold each job until every thread has one, so no thread is skipped
+        barrier.wait(timeout=10)
+    except threading.BrokenBarrierError:
+        pass
+    warmup.add("positions", warm_up_bodies(julian_days, BODY_CODES.values()))
+    for julian_day in (julian_days[0], julian_days[len(julian_days) // 2], julian_days[-1]):
+        compute_birth_chart(julian_day, 51.48, 0.0, DEFAULT_HOUSE, fixed_stars=True)
+        warmup.add("charts", 1)
+
+async def run_warmup() -> None:
+    """Pre-touch the ephemeris files for the configured years, then warm every ephemeris thread"""
+    warmup.start()
+    loop = asyncio.get_running_loop()
+    try:
+        with stage("warmup", "files"):
+            for path in ephemeris_files(EPHE_PATH, WARMUP_START_YEAR, WARMUP_END_YEAR, WARMUP_EXTRA_DIRS):
+                warmup.add("bytes", await loop.run_in_executor(None, pretouch_file, path))
+                warmup.add("files", 1)
+            if position_table is not None:
+                warmup.add("bytes", await loop.run_in_executor(
+                    None, position_table.preload,
+                    swe.julday(WARMUP_START_YEAR, 1, 1, 0.0), swe.julday(WARMUP_END_YEAR + 1, 1, 1, 0.0)
+                ))
+        
+        julian_days = yearly_julian_days(WARMUP_START_YEAR, WARMUP_END_YEAR)
+        barrier = threading.Barrier(EPHEMERIS_THREADS)
+        with stage("warmup", "charts"):
+            await asyncio.gather(*[
+                ephemeris_executor.run(warm_up_ephemeris_thread, barrier, julian_days)
+                for _ in range(EPHEMERIS_THREADS)
+            ])
+        warmup.finish()
+    except Exception as e:
+        warmup.finish(f"Warm-up failed: {str(e)}")
+
+async def start_warmup():
+    """Warm up in the background, so /api/health answers while /api/ready waits"""
+    global warmup_task
+    if WARMUP_ENABLED:
+        warmup_task = asyncio.get_running_loop().create_task(run_warmup())
+    else:
+        warmup.skip()
+
+def shutdown_chart_process_pool():
+    """Stop batch worker processes and executor threads with the server"""
+    if chart_process_pool is not None:
+        chart_process_pool.shutdown(wait=False, cancel_futures=True)
+    ephemeris_executor.shutdown()
+    sketch_executor.shutdown()
+
 @app.get("/api/health")
 async def health_check():
     """Health check endpoint"""
     return {"status": "healthy", "service": "EigenSage AI Backend"}
 
+@app.get("/api/ready")
+async def readiness_check():
+    """Readiness probe: 503 until the start-up warm-up has finished"""
+    return JSONResponse(
+        {"status": "ready" if warmup.ready else "warming up", "warmup": warmup.to_dict()},
+        status_code=200 if warmup.ready else 503
+    )
+
+@app.get("/api/timezone")
+async def timezone_lookup(lat: float, lng: float):
+    """Resolve the IANA timezone for a coordinate without any external service"""
+    if not -90 <= lat <= 90 or not -180 <= lng <= 180:
+        raise HTTPException(status_code=400, detail="Coordinates are out of range")
+    
+    return {
+        "timezone": get_timezone_from_coordinates(lat, lng),
+        "source": "boundaries" if timezone_index is not None else "approximate"
+    }
+
+@app.get("/api/cities/autocomplete")
+async def city_autocomplete(q: str, limit: int = 10):
+    """City name suggestions from the offline gazetteer, most populous first"""
+    if gazetteer is None:
+        raise HTTPException(status_code=503, detail="City gazetteer is not installed")
+    
+    return {"cities": gazetteer.autocomplete(q, max(1, min(limit, 50)))}
+
+@app.get("/api/stats")
+async def stats():
+    """Runtime statistics for the in-process caches and executors"""
+    return {
+        "chartCache": chart_cache.stats(),
+        "sharedChartCache": shared_chart_cache.stats() if shared_chart_cache is not None else None,
+        "sharedTimezoneCache": shared_timezone_cache.stats() if shared_timezone_cache is not None else None,
+        "positionTable": position_table.stats() if position_table is not None else None,
+        "timezoneIndex": timezone_index.stats() if timezone_index is not None else None,
+        "gazetteerCities": len(gazetteer) if gazetteer is not None else None,
+        "fixedStars": fixed_star_catalog.stats() if fixed_star_catalog is not None else None,
+        "chartStore": chart_store.stats() if chart_store is not None else None,
+        "aspectIndex": aspect_index.stats(),
+        "coalescing": {
+            "charts": chart_flights.stats(),
+            "advancedPositions": advanced_position_flights.stats()
+        },
+        "executors": {
+            "ephemeris": ephemeris_executor.stats(),
+            "sketch": sketch_executor.stats()
+        },
+        "sketchJobs": sketch_jobs.stats(),
+        "sketchCache": sketch_cache.stats(),
+        "warmup": warmup.to_dict()
+    }
+
+def sketch_image_url(job, http_request: Request) -> str:
+    """Served URL of the cached copy when there is one, else the model's own URL"""
+    if job.sketch_id is not None:
+        return str(http_request.url_for("get_sketch_image", sketch_id=job.sketch_id))
+    return job.image_url
+
+def sketch_job_payload(job, http_request: Request) -> dict:
+    payload = job.to_dict()
+    if job.status == "succeeded":
+        payload["imageUrl"] = sketch_image_url(job, http_request)
+        payload["sourceUrl"] = job.image_url
+    return payload
+
+# Point-in-time gauges read from the caches and executors when /metrics is scraped
+METRICS.gauge(
+    "eigensage_executor_jobs", "Jobs queued or running per executor", ("executor", "state"),
+    lambda: {
+        (executor.name, state): executor.stats()[state]
+        for executor in (ephemeris_executor, sketch_executor) for state in ("queued", "running")
+    }
+)
+METRICS.gauge(
+    "eigensage_cache_events", "Cumulative cache hits, misses and evictions", ("cache", "event"),
+    lambda: {
+        **{("chart", event): value for event, value in chart_cache.stats().items() if event in ("hits", "misses", "evictions", "expirations")},
+        **({("shared_chart", event): value for event, value in shared_chart_cache.stats().items() if event in ("hits", "misses", "evictions")}
+           if shared_chart_cache is not None else {}),
+        **{("sketch", event): value for event, value in sketch_cache.stats().items() if event in ("hits", "misses", "evictions")}
+    }
+)
+METRICS.gauge(
+    "eigensage_sketch_jobs", "Cumulative sketch job outcomes", ("outcome",),
+    lambda: {(outcome,): value for outcome, value in sketch_jobs.stats().items() if outcome != "jobs" and outcome != "inFlight"}
+)
+
+METRICS.gauge(
+    "eigensage_coalesced_computations", "Cumulative computations started, and joined instead of repeated", ("computation", "outcome"),
+    lambda: {
+        (flights.name, outcome): flights.stats()[outcome]
+        for flights in (chart_flights, advanced_position_flights) for outcome in ("computations", "coalesced")
+    }
+)
+
+METRICS.gauge("eigensage_ready", "1 once the start-up warm-up has finished", (), lambda: {(): int(warmup.ready)})
+
+@app.get("/metrics")
+async def metrics():
+    """Stage timers, fallback counters and per-route latency in Prometheus text format"""
+    return PlainTextResponse(METRICS.render(), media_type=METRICS_CONTENT_TYPE)
+
 @app.post("/api/generate-soulmate-sketch")
-async def generate_soulmate_sketch(request: ImageGenerationRequest):
+async def generate_soulmate_sketch(request: ImageGenerationRequest, http_request: Request):
     """Generate a soulmate sketch using Google Nano Banana model"""
+    # Submit a sketch job (or join an identical one in flight) and wait for it
     try:
-        # Use the AI-generated prompt directly
-        prompt = request.soulmate_description
-        
-        
-        # Generate image using Google's Nano Banana model
-        output = replicate_client.run(
-            "google/nano-banana",
-            input={
-                "prompt": prompt,
-                "width": 512,
-                "height": 512,
-                "num_inference_steps": 20,
-                "guidance_scale": 7.5,
-                "num_outputs": 1
-            }
-        )
-        
-        # Return the first image URL
-        if output:
-            # Handle both list and single output
-            if isinstance(output, list) and len(output) > 0:
-                return {"image_url": str(output[0])}
-            elif hasattr(output, 'url'):
-                return {"image_url": str(output)}
-            else:
-                return {"image_url": str(output)}
-        else:
-            raise HTTPException(status_code=500, detail="No image generated")
-            
-    except Exception as e:
-        # Fallback to Stable Diffusion if Nano Banana fails
-        try:
-            fallback_prompt = prompt  # Use the same AI-generated prompt
-            
-            output = replicate_client.run(
-                "stability-ai/stable-diffusion:27b93a2413e7f36cd83da926f3656280b2931564ff050bf9575f1fdf9bcd7478",
-                input={
-                    "prompt": fallback_prompt,
-                    "width": 512,
-                    "height": 512,
-                    "num_inference_steps": 20,
-                    "guidance_scale": 7.5,
-                    "num_outputs": 1
-                }
-            )
-            
-            if output:
-                # Handle both list and single output
-                if isinstance(output, list) and len(output) > 0:
-                    return {"image_url": str(output[0])}
-                elif hasattr(output, 'url'):
-                    return {"image_url": str(output)}
-                else:
-                    return {"image_url": str(output)}
-            else:
-                raise HTTPException(status_code=500, detail="No image generated by fallback model")
-                
-        except Exception as fallback_error:
-            raise HTTPException(status_code=500, detail=f"Failed to generate sketch with both Nano Banana and Stable Diffusion models: {str(fallback_error)}")
+        with stage("generate_soulmate_sketch", "submit"):
+            job = await sketch_jobs.submit(request.soulmate_description, regenerate=request.regenerate)
+    except ExecutorBusy as e:
+        raise HTTPException(status_code=503, detail=f"Sketch generation is busy, please retry: {str(e)}")
+    
+    with stage("generate_soulmate_sketch", "wait"):
+        await sketch_jobs.wait(job)
+    if job.status != "succeeded":
+        raise HTTPException(status_code=500, detail=f"Failed to generate sketch with both Nano Banana and Stable Diffusion models: {job.error}")
+    
+    return {"image_url": sketch_image_url(job, http_request)}
+
+@app.post("/api/sketch-jobs", status_code=202)
+async def submit_sketch_job(request: ImageGenerationRequest, http_request: Request):
+    """Start a soulmate sketch job and return its ID without waiting for the image"""
+    try:
+        job = await sketch_jobs.submit(request.soulmate_description, regenerate=request.regenerate)
+    except ExecutorBusy as e:
+        raise HTTPException(status_code=503, detail=f"Sketch generation is busy, please retry: {str(e)}")
+    return sketch_job_payload(job, http_request)
+
+@app.get("/api/sketch-jobs/{job_id}")
+async def get_sketch_job(job_id: str, http_request: Request, wait: float = 0):
+    """Job status; with wait > 0, long-poll for up to that many seconds until it finishes"""
+    job = await sketch_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Sketch job not found")
+    if wait > 0 and not job.done:
+        job = await sketch_jobs.wait(job, timeout=min(wait, 60))
+    return sketch_job_payload(job, http_request)
+
+@app.get("/api/sketches/{sketch_id}")
+async def get_sketch_image(sketch_id: str):
+    """Serve a cached sketch image; the ID is a content hash, so it never changes"""
+    loop = asyncio.get_running_loop()
+    path = await loop.run_in_executor(None, sketch_cache.image_path, sketch_id)
+    record = await loop.run_in_executor(None, sketch_cache.record, sketch_id)
+    if path is None or record is None or not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="Sketch not found")
+    return FileResponse(
+        path, media_type=record["contentType"],
+        headers={"Cache-Control": "public, max-age=31536000, immutable"}
+    )
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,49 @@
+"""Solar returns and secondary progressions.
+
+A solar return is the moment each year when the Sun is back at its natal
+longitude. The Sun moves between 0.95° and 1.02° a day and its speed changes
+slowly, so Newton's method on the longitude, with the speed swisseph already
+returns as the derivative, converges from the natal moment plus whole tropical
+years in 3–4 ephemeris calls instead of a scan. In a sidereal zodiac the Sun
+returns to its sidereal longitude, about 20 minutes later each year than to
+the tropical one.
+
+Secondary progressions count each day after birth as a year of life: the
+progressed chart for a moment is the chart of birth plus the elapsed time
+divided by the length of the year.
+"""
+from typing import Callable, Tuple
+
+TROPICAL_YEAR = 365.242189  # mean tropical year, days
+LONGITUDE_TOLERANCE = 1e-6  # degrees (~0.1 s of solar motion)
+MAX_ITERATIONS = 20
+
+
+class ReturnNotFound(Exception):
+    """Newton's method did not reach LONGITUDE_TOLERANCE in MAX_ITERATIONS calls"""
+
+
+def solar_return(natal_longitude: float, start_jd: float, sun_position: Callable[[float], tuple]) -> Tuple[float, int]:
+    """Julian day near start_jd at which the Sun is at natal_longitude, and the
+    number of sun_position(julian_day) -> (longitude, speed) calls it took.
+    Raises ReturnNotFound when the iteration does not converge."""
+    julian_day = start_jd
+    for calls in range(1, MAX_ITERATIONS + 1):
+        longitude, speed = sun_position(julian_day)
+        distance = (longitude - natal_longitude + 180) % 360 - 180
+        if abs(distance) < LONGITUDE_TOLERANCE:
+            return julian_day, calls
+        julian_day -= distance / speed
+    raise ReturnNotFound(
+        f"the Sun was still {abs(distance):.2g}° from {natal_longitude:.6f}° after {MAX_ITERATIONS} ephemeris calls"
+    )
+
+
+def return_estimate(natal_jd: float, years: int) -> float:
+    """Starting point for the return years after birth"""
+    return natal_jd + years * TROPICAL_YEAR
+
+
+def progressed_julian_day(natal_jd: float, julian_day: float) -> float:
+    """Julian day of the secondary progressed chart in effect at julian_day"""
+    return natal_jd + (julian_day - natal_jd) / TROPICAL_YEAR
@@ -0,0 +1,174 @@
+"""Response encoding with per-chart caching and compact formats.
+
+A chart is immutable once computed, except for its per-request metadata. The
+encoded form of everything else is therefore computed once per format, stored
+on the chart itself, and spliced into every response that contains the chart:
+the chart endpoint, batches, and the compatibility and soulmate analyses.
+
+Three formats are negotiated from the Accept header:
+
+- ``application/json`` (default), byte-for-byte what FastAPI would return;
+- ``application/vnd.eigensage.columnar+json``, where lists of records
+  (planets, houses, aspects) become objects of parallel column arrays;
+- ``application/msgpack``, the columnar layout in MessagePack, when the
+  optional ``msgpack`` package is installed.
+"""
+import json
+import uuid
+from typing import Any, ClassVar, Optional, Tuple
+
+from fastapi.responses import Response
+from pydantic import BaseModel, PrivateAttr
+
+try:
+    import msgpack
+except ImportError:  # optional dependency
+    msgpack = None
+
+JSON, COLUMNAR, MSGPACK = "json", "columnar", "msgpack"
+
+MEDIA_TYPES = {
+    JSON: "application/json",
+    COLUMNAR: "application/vnd.eigensage.columnar+json",
+    MSGPACK: "application/msgpack"
+}
+
+# Marker for models spliced into an encoded payload; random so no user string can collide
+_MARKER = uuid.uuid4().hex
+_MSGPACK_MARKER_TYPE = 42
+
+
+def _dumps(value: Any, default=None) -> bytes:
+    # Same settings as Starlette's JSONResponse, so default output is unchanged
+    return json.dumps(
+        value, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":"), default=default
+    ).encode("utf-8")
+
+
+def to_columns(value: Any) -> Any:
+    """Turn a list of flat records with identical keys into {key: [values...]},
+    recursing into anything else (e.g. the chart variants of a chart)"""
+    if isinstance(value, dict):
+        return {key: to_columns(item) for key, item in value.items()}
+    if isinstance(value, list):
+        if value and all(isinstance(item, dict) for item in value):
+            keys = list(value[0])
+            flat = all(not isinstance(field, (dict, list)) for item in value for field in item.values())
+            if flat and all(list(item) == keys for item in value):
+                return {key: [item[key] for item in value] for key in keys}
+        return [to_columns(item) for item in value]
+    return value
+
+
+class CachedEncodingModel(BaseModel):
+    """Model that encodes its stable fields once per format.
+
+    Fields named in ``VOLATILE_FIELDS`` (e.g. per-request metadata) are encoded
+    on every call. The cache holder is shared by ``model_copy``, so copies must
+    only ever update volatile fields.
+    """
+
+    VOLATILE_FIELDS: ClassVar[Tuple[str, ...]] = ()
+
+    _encoded: dict = PrivateAttr(default_factory=dict)
+
+    def _stable_fields(self, fmt: str) -> dict:
+        fields = self.model_dump(exclude=set(self.VOLATILE_FIELDS))
+        if fmt != JSON:
+            fields = {name: to_columns(value) for name, value in fields.items()}
+        return fields
+
+    def encode(self, fmt: str = JSON) -> bytes:
+        """The complete encoded model in the given format"""
+        stable = self._encoded.get(fmt)
+        if stable is None:
+            stable = self._encoded[fmt] = self._encode_stable(fmt)
+        volatile = {name: getattr(self, name) for name in self.VOLATILE_FIELDS}
+
+        if fmt == MSGPACK:
+            count, pairs = stable
+            packer = msgpack.Packer()
+            tail = b"".join(packer.pack(name) + packer.pack(value) for name, value in volatile.items())
+            return packer.pack_map_header(count + len(volatile)) + pairs + tail
+
+        tail = b"".join(b"," + _dumps(name) + b":" + _dumps(value) for name, value in volatile.items())
+        return b"{" + stable + tail + b"}"
+
+    def _encode_stable(self, fmt: str):
+        fields = self._stable_fields(fmt)
+        if fmt == MSGPACK:
+            packer = msgpack.Packer()
+            return len(fields), b"".join(packer.pack(name) + packer.pack(value) for name, value in fields.items())
+        # Strip the braces so volatile fields can be appended
+        return _dumps(fields)[1:-1]
+
+
+def negotiate_format(accept: Optional[str]) -> str:
+    """Best supported format for an Accept header; JSON when nothing else matches"""
+    if not accept:
+        return JSON
+
+    candidates = []
+    for position, media_range in enumerate(accept.split(",")):
+        media_type, *params = [part.strip() for part in media_range.split(";")]
+        quality = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    quality = float(param[2:])
+                except ValueError:
+                    quality = 0.0
+        candidates.append((-quality, position, media_type.lower()))
+
+    for negative_quality, _, media_type in sorted(candidates):
+        if negative_quality == 0:
+            break
+        for fmt, supported in MEDIA_TYPES.items():
+            if media_type == supported and (fmt != MSGPACK or msgpack is not None):
+                return fmt
+        if media_type in ("*/*", "application/*"):
+            return JSON
+    return JSON
+
+
+def encode_payload(payload: Any, fmt: str = JSON) -> bytes:
+    """Encode a response payload, splicing in the cached encoding of any
+    CachedEncodingModel it contains (at any depth)"""
+    models = []
+
+    def default(obj):
+        if isinstance(obj, CachedEncodingModel):
+            # Markers are emitted in document order, the order models are collected in
+            models.append(obj)
+            return msgpack.ExtType(_MSGPACK_MARKER_TYPE, _MARKER.encode()) if fmt == MSGPACK else _MARKER
+        if isinstance(obj, BaseModel):
+            dumped = obj.model_dump()
+            return {name: to_columns(value) for name, value in dumped.items()} if fmt != JSON else dumped
+        raise TypeError(f"Object of type {type(obj).__name__} is not serializable")
+
+    if isinstance(payload, CachedEncodingModel):
+        return payload.encode(fmt)
+
+    if fmt == MSGPACK:
+        skeleton = msgpack.packb(payload, default=default)
+        marker = msgpack.packb(msgpack.ExtType(_MSGPACK_MARKER_TYPE, _MARKER.encode()))
+    else:
+        skeleton = _dumps(payload, default=default)
+        marker = f'"{_MARKER}"'.encode()
+    if not models:
+        return skeleton
+
+    # One pass: the skeleton's pieces between markers, interleaved with the models
+    pieces = skeleton.split(marker)
+    parts = [pieces[0]]
+    for model, piece in zip(models, pieces[1:]):
+        parts.append(model.encode(fmt))
+        parts.append(piece)
+    return b"".join(parts)
+
+
+def encoded_response(payload: Any, fmt: str = JSON, status_code: int = 200) -> Response:
+    return Response(
+        encode_payload(payload, fmt), status_code=status_code, media_type=MEDIA_TYPES[fmt],
+        headers={"Vary": "Accept"}
+    )
@@ -0,0 +1,120 @@
+"""Multi-process server: one preloaded app, forked into a worker per core.
+
+The app module is imported once, in the parent, before any worker exists, so
+the ephemeris setup, position tables, timezone and gazetteer indexes, fixed
+star catalog and the stored-chart aspect index are built once and shared
+copy-on-write. The shared chart and timezone caches are created at that point
+too, in shared memory, so every worker reads the others' results. The parent
+binds the listening socket, forks the workers, which all accept on it, and
+restarts any worker that dies. Run from the backend directory:
+
+    python serve.py --workers 4 --port 8000
+"""
+import argparse
+import os
+import signal
+import socket
+import sys
+import time
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="worker processes (default: one per core)")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--log-level", default="info")
+    return parser.parse_args()
+
+
+def configure(workers: int) -> None:
+    """Defaults for a multi-process server, set before the app is imported;
+    explicit environment settings win"""
+    cores = os.cpu_count() or 1
+    os.environ.setdefault("SHARED_CHART_CACHE_SLOTS", "8192")
+    os.environ.setdefault("SHARED_TIMEZONE_CACHE_SLOTS", "65536")
+    # The batch pools of all workers together should not oversubscribe the cores
+    os.environ.setdefault("CHART_WORKERS", str(max(1, cores // workers)))
+
+
+def bind(host: str, port: int) -> socket.socket:
+    # IPPROTO_TCP explicitly: asyncio only sets TCP_NODELAY on accepted
+    # sockets whose protocol says TCP, and without it small responses wait
+    # on delayed ACKs (~40 ms each)
+    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET, socket.SOCK_STREAM, socket.IPPROTO_TCP)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def run_worker(app, sock: socket.socket, log_level: str) -> None:
+    import uvicorn
+
+    # Restore default handling so uvicorn installs its own graceful shutdown
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    server = uvicorn.Server(uvicorn.Config(app, log_level=log_level))
+    server.run(sockets=[sock])
+
+
+def spawn(app, sock: socket.socket, log_level: str) -> int:
+    pid = os.fork()
+    if pid == 0:
+        try:
+            run_worker(app, sock, log_level)
+        finally:
+            os._exit(0)
+    return pid
+
+
+def supervise(app, sock: socket.socket, workers: int, log_level: str) -> None:
+    """Keep workers running until SIGTERM or SIGINT, then stop them all"""
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    pids = {spawn(app, sock, log_level) for _ in range(workers)}
+    print(f"Serving on {sock.getsockname()[:2]} with {workers} workers: {sorted(pids)}", file=sys.stderr)
+    while not stopping:
+        try:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            break
+        if pid == 0:
+            time.sleep(0.2)
+            continue
+        pids.discard(pid)
+        if not stopping:
+            print(f"Worker {pid} exited with status {status}; restarting", file=sys.stderr)
+            pids.add(spawn(app, sock, log_level))
+
+    for pid in pids:
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+    for pid in pids:
+        try:
+            os.waitpid(pid, 0)
+        except ChildProcessError:
+            pass
+
+
+def main_cli():
+    args = parse_args()
+    configure(args.workers)
+    import main  # preload the app and its shared state before forking
+
+    sock = bind(args.host, args.port)
+    supervise(main.app, sock, args.workers, args.log_level)
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,145 @@
+"""Fixed-size byte cache in shared memory, seen by every worker process.
+
+The table lives in an anonymous shared mapping created before the server
+forks its workers, so a value stored by one worker is a hit for all of them.
+It is set-associative: a key's digest picks a bucket of ``ways`` slots, and a
+miss fills a free slot or the bucket's least recently used one. Buckets are
+guarded by a stripe of process-shared locks, held only while bytes are copied.
+
+A worker killed while holding a stripe lock (SIGKILL, a crash mid-copy) never
+releases it, and the lock cannot be safely broken because the slot it guarded
+may be half written. Lock waits therefore time out: after LOCK_TIMEOUT a
+worker treats that stripe as lost, and its keys (1/stripes of the cache) are
+misses until the server restarts, instead of deadlocking every worker.
+
+Slots have a fixed size; larger values are not cached. Keys are hashed, so any
+key with a stable ``repr`` works (tuples of numbers and strings).
+"""
+import hashlib
+import mmap
+import multiprocessing
+import struct
+import time
+from typing import Callable, Hashable, Optional
+
+import numpy as np
+
+# Slot header: key digest, last use, expiry (0 = never), value length
+HEADER = struct.Struct("<16sddI4x")
+HITS, MISSES, STORES, EVICTIONS, TOO_LARGE = range(5)
+LOCK_TIMEOUT = 1.0  # seconds; a copy takes microseconds, so a longer wait means the holder died
+
+
+def key_digest(key: Hashable) -> bytes:
+    return hashlib.blake2b(repr(key).encode(), digest_size=16).digest()
+
+
+class SharedCache:
+    """Cache of bytes values in a shared mapping; create it before forking"""
+
+    def __init__(self, slots: int, slot_size: int, ways: int = 4, stripes: int = 64, ttl: float = 0,
+                 clock: Callable[[], float] = time.time):
+        if slot_size <= HEADER.size:
+            raise ValueError(f"slot_size must be larger than the {HEADER.size}-byte header")
+        self.ways = ways
+        self.buckets = max(1, slots // ways)
+        self.slot_size = slot_size
+        self.ttl = ttl
+        self._clock = clock
+        self._stripes = [multiprocessing.Lock() for _ in range(stripes)]
+        table_size = self.buckets * ways * slot_size
+        self._map = mmap.mmap(-1, table_size + stripes * 5 * 8)  # MAP_SHARED: inherited by forked workers
+        # Counters per stripe, updated under the stripe's lock
+        self._counters = np.frombuffer(self._map, dtype=np.int64, count=stripes * 5, offset=table_size).reshape(stripes, 5)
+        self._lost_stripes = set()  # per process: stripes whose lock timed out
+
+    def _acquire(self, stripe: int) -> bool:
+        """Take a stripe's lock; False if it is held by a worker that died"""
+        if stripe in self._lost_stripes:
+            return False
+        if self._stripes[stripe].acquire(timeout=LOCK_TIMEOUT):
+            return True
+        self._lost_stripes.add(stripe)
+        return False
+
+    def _locate(self, digest: bytes) -> tuple:
+        bucket = int.from_bytes(digest[:8], "little") % self.buckets
+        return bucket * self.ways * self.slot_size, bucket % len(self._stripes)
+
+    def get(self, key: Hashable) -> Optional[bytes]:
+        """The value stored under key, or None if missing or expired"""
+        digest = key_digest(key)
+        base, stripe = self._locate(digest)
+        now = self._clock()
+        if not self._acquire(stripe):
+            return None
+        try:
+            for way in range(self.ways):
+                offset = base + way * self.slot_size
+                slot_digest, _, expires_at, length = HEADER.unpack_from(self._map, offset)
+                if slot_digest != digest or not length:
+                    continue
+                if expires_at and expires_at <= now:
+                    HEADER.pack_into(self._map, offset, b"", 0.0, 0.0, 0)
+                    break
+                HEADER.pack_into(self._map, offset, digest, now, expires_at, length)
+                self._counters[stripe, HITS] += 1
+                start = offset + HEADER.size
+                return self._map[start:start + length]
+            self._counters[stripe, MISSES] += 1
+        finally:
+            self._stripes[stripe].release()
+        return None
+
+    def put(self, key: Hashable, value: bytes) -> bool:
+        """Store value under key; False if it does not fit in a slot"""
+        digest = key_digest(key)
+        base, stripe = self._locate(digest)
+        if not self._acquire(stripe):
+            return False
+        try:
+            if len(value) > self.slot_size - HEADER.size:
+                self._counters[stripe, TOO_LARGE] += 1
+                return False
+
+            now = self._clock()
+            expires_at = now + self.ttl if self.ttl > 0 else 0.0
+            # The key's own slot wherever it is in the bucket, else a free or
+            # expired one, else the least recently used
+            own, free, oldest, oldest_used = None, None, None, None
+            for way in range(self.ways):
+                offset = base + way * self.slot_size
+                slot_digest, last_used, slot_expires_at, length = HEADER.unpack_from(self._map, offset)
+                if length and slot_digest == digest:
+                    own = offset
+                    break
+                if not length or (slot_expires_at and slot_expires_at <= now):
+                    if free is None:
+                        free = offset
+                elif oldest is None or last_used < oldest_used:
+                    oldest, oldest_used = offset, last_used
+            target = own if own is not None else free if free is not None else oldest
+            if own is None and free is None:
+                self._counters[stripe, EVICTIONS] += 1
+            start = target + HEADER.size
+            self._map[start:start + len(value)] = value
+            HEADER.pack_into(self._map, target, digest, now, expires_at, len(value))
+            self._counters[stripe, STORES] += 1
+        finally:
+            self._stripes[stripe].release()
+        return True
+
+    def stats(self) -> dict:
+        hits, misses, stores, evictions, too_large = self._counters.sum(axis=0).tolist()
+        lookups = hits + misses
+        return {
+            "slots": self.buckets * self.ways,
+            "slotBytes": self.slot_size,
+            "hits": hits,
+            "misses": misses,
+            "stores": stores,
+            "evictions": evictions,
+            "tooLarge": too_large,
+            "lostStripes": len(self._lost_stripes),
+            "hitRate": round(hits / lookups, 4) if lookups else 0.0
+        }
@@ -0,0 +1,96 @@
+"""Coalescing of identical in-flight computations.
+
+The frontend often asks for the same chart from several endpoints at once,
+and a cache only helps once the first computation has finished. A
+SingleFlight keeps the future of every computation still running, keyed on
+its canonical inputs, and callers with the same key await that future instead
+of starting their own. The computation runs as its own task, so a caller that
+disconnects does not cancel it for the others, and its result still reaches
+the caches.
+
+Used from the event loop only, so no locking is needed; each worker process
+of serve.py coalesces its own requests.
+"""
+import asyncio
+import functools
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Sequence
+
+
+class SingleFlight:
+    """At most one running computation per key, shared by all concurrent callers"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._in_flight: Dict[Hashable, asyncio.Future] = {}
+        self._tasks = set()  # batch computations, referenced until they finish
+        self.started = 0
+        self.coalesced = 0
+        self.failed = 0
+
+    def _claim(self, key: Hashable, future: asyncio.Future) -> None:
+        self._in_flight[key] = future
+        self.started += 1
+        future.add_done_callback(functools.partial(self._finish, key))
+
+    def _finish(self, key: Hashable, future: asyncio.Future) -> None:
+        if self._in_flight.get(key) is future:
+            del self._in_flight[key]
+        # Retrieving the exception also keeps asyncio from logging it when no caller is left
+        if future.cancelled() or future.exception() is not None:
+            self.failed += 1
+
+    async def run(self, key: Hashable, compute: Callable[[], Awaitable[Any]]) -> Any:
+        """compute()'s result, or that of the identical computation already running"""
+        future = self._in_flight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(compute())
+            self._claim(key, future)
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(future)
+
+    async def run_many(self, keys: Sequence[Hashable],
+                       compute: Callable[[List[Hashable]], Awaitable[List[Any]]]) -> List[Any]:
+        """Results for distinct keys, in order: keys already in flight are joined,
+        and the rest are computed by one compute(keys) call, which returns a
+        result or an exception per key. Failed keys get their exception."""
+        loop = asyncio.get_running_loop()
+        futures = []
+        missing = {}
+        for key in keys:
+            future = self._in_flight.get(key)
+            if future is None:
+                future = missing[key] = loop.create_future()
+                self._claim(key, future)
+            else:
+                self.coalesced += 1
+            futures.append(future)
+        if missing:
+            task = loop.create_task(self._settle(missing, compute))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        return await asyncio.gather(*[asyncio.shield(future) for future in futures], return_exceptions=True)
+
+    async def _settle(self, futures: Dict[Hashable, asyncio.Future],
+                      compute: Callable[[List[Hashable]], Awaitable[List[Any]]]) -> None:
+        try:
+            results = await compute(list(futures))
+        except asyncio.CancelledError:
+            for future in futures.values():
+                future.cancel()
+            raise
+        except Exception as e:
+            results = [e] * len(futures)
+        for future, result in zip(futures.values(), results):
+            if isinstance(result, BaseException):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    def stats(self) -> dict:
+        return {
+            "computations": self.started,
+            "coalesced": self.coalesced,
+            "failed": self.failed,
+            "inFlight": len(self._in_flight)
+        }
@@ -0,0 +1,256 @@
+"""Content-addressed disk cache for generated sketch images.
+
+Entries are keyed by the sketch job key (a hash of the prompt and the model
+parameters). The image bytes are stored as a file, and the record of each
+image (source URL, model, content type, size and last access) in a SQLite
+index in the same directory, which every server worker shares: an image
+stored by one worker is served by all, and the size limit holds for the
+directory as a whole. When the cache grows past ``max_bytes`` the least
+recently used images are deleted.
+"""
+import base64
+import json
+import os
+import sqlite3
+import threading
+import time
+import urllib.parse
+import urllib.request
+from typing import Callable, List, Optional, Tuple
+
+MAX_IMAGE_BYTES = 20 * 1024 * 1024
+DOWNLOAD_TIMEOUT = 30  # seconds
+
+# Reuse policies
+REUSE, REFRESH, OFF = "reuse", "refresh", "off"
+
+INDEX_NAME = "index.db"
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sketches (
+    key TEXT PRIMARY KEY,
+    prompt TEXT NOT NULL,
+    model TEXT NOT NULL,
+    source_url TEXT NOT NULL,
+    content_type TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS sketches_last_access ON sketches (last_access);
+"""
+COLUMNS = "key, prompt, model, source_url, content_type, size, created_at, last_access"
+
+
+def _record(row: tuple) -> dict:
+    key, prompt, model, source_url, content_type, size, created_at, last_access = row
+    return {
+        "key": key,
+        "prompt": prompt,
+        "model": model,
+        "sourceUrl": source_url,
+        "contentType": content_type,
+        "size": size,
+        "createdAt": created_at,
+        "lastAccess": last_access
+    }
+
+
+def fetch_image(url: str) -> Tuple[bytes, str]:
+    """Image bytes and content type for an http(s) or data: URL"""
+    if url.startswith("data:"):
+        header, _, data = url[5:].partition(",")
+        content_type = header.split(";")[0] or "application/octet-stream"
+        payload = base64.b64decode(data) if header.endswith(";base64") else urllib.parse.unquote_to_bytes(data)
+        return payload, content_type
+
+    with urllib.request.urlopen(url, timeout=DOWNLOAD_TIMEOUT) as response:
+        payload = response.read(MAX_IMAGE_BYTES + 1)
+        if len(payload) > MAX_IMAGE_BYTES:
+            raise ValueError(f"Image larger than {MAX_IMAGE_BYTES} bytes")
+        return payload, response.headers.get_content_type()
+
+
+class SketchCache:
+    """Size-bounded LRU cache of sketch images on local disk.
+
+    ``policy`` is ``reuse`` (serve entries younger than ``max_age`` seconds,
+    0 = any age), ``refresh`` (always regenerate, but keep storing results) or
+    ``off``.
+
+    The index connection is shared by all threads and serialized with a lock,
+    and reopened in a forked child, as in ChartStore. Hit, miss and store
+    counters are per process.
+    """
+
+    def __init__(self, directory: str, max_bytes: int, policy: str = REUSE, max_age: float = 0,
+                 clock: Callable[[], float] = time.time):
+        if policy not in (REUSE, REFRESH, OFF):
+            raise ValueError(f"Unknown sketch cache policy: {policy}")
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.policy = policy
+        self.max_age = max_age
+        self._clock = clock
+        self._db: Optional[sqlite3.Connection] = None
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self.errors = 0
+        if policy != OFF:
+            os.makedirs(directory, exist_ok=True)
+            self._connect()
+            self._db.executescript(SCHEMA)
+            os.register_at_fork(after_in_child=self._connect)
+            self._import_records()
+
+    def _connect(self) -> None:
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(
+            os.path.join(self.directory, INDEX_NAME), check_same_thread=False, isolation_level=None
+        )
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        # Workers write concurrently; wait for the write lock instead of failing
+        self._db.execute("PRAGMA busy_timeout=5000")
+
+    def _paths(self, key: str) -> Tuple[str, str]:
+        base = os.path.join(self.directory, key[:2], key)
+        return base + ".img", base + ".json"
+
+    def _import_records(self) -> None:
+        """Index the JSON records of caches written before the SQLite index, once"""
+        rows = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if not name.endswith(".json"):
+                    continue
+                record_path = os.path.join(root, name)
+                try:
+                    with open(record_path) as f:
+                        record = json.load(f)
+                    image_path, _ = self._paths(record["key"])
+                    rows.append((
+                        record["key"], record["prompt"], record["model"], record["sourceUrl"],
+                        record["contentType"], record["size"], record["createdAt"], os.path.getmtime(image_path)
+                    ))
+                    os.remove(record_path)
+                except (OSError, ValueError, KeyError):
+                    continue
+        if not rows:
+            return
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                self._db.executemany(f"INSERT OR IGNORE INTO sketches ({COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+                evicted = self._evict()
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+        self._remove(evicted)
+
+    def get(self, key: str) -> Optional[dict]:
+        """The stored record for key, or None when missing, stale or not reusable"""
+        if self.policy != REUSE:
+            return None
+
+        now = self._clock()
+        with self._lock:
+            row = self._db.execute(f"SELECT {COLUMNS} FROM sketches WHERE key = ?", (key,)).fetchone()
+            if row is None or (self.max_age and now - row[6] > self.max_age):
+                self.misses += 1
+                return None
+            self._db.execute("UPDATE sketches SET last_access = ? WHERE key = ?", (now, key))
+            self.hits += 1
+        record = _record(row)
+        record["lastAccess"] = now
+        return record
+
+    def put(self, key: str, prompt: str, model: str, source_url: str) -> Optional[dict]:
+        """Download source_url and store it under key; returns the record, or None on failure"""
+        if self.policy == OFF:
+            return None
+
+        try:
+            payload, content_type = fetch_image(source_url)
+            image_path, _ = self._paths(key)
+            os.makedirs(os.path.dirname(image_path), exist_ok=True)
+            # Write to a temporary name first so readers never see a partial file;
+            # it is unique per process, since two workers may store the same key
+            temporary = f"{image_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(temporary, "wb") as f:
+                f.write(payload)
+            os.replace(temporary, image_path)
+        except Exception:
+            with self._lock:
+                self.errors += 1
+            return None
+
+        now = self._clock()
+        row = (key, prompt, model, source_url, content_type, len(payload), now, now)
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                self._db.execute(f"INSERT OR REPLACE INTO sketches ({COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?)", row)
+                evicted = self._evict()
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            self.stores += 1
+        self._remove(evicted)
+        return _record(row)
+
+    def _evict(self) -> List[str]:
+        """Drop the least recently used entries beyond max_bytes from the index,
+        inside the caller's transaction; returns their keys"""
+        evicted = []
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM sketches").fetchone()[0]
+        if total <= self.max_bytes:
+            return evicted
+        for key, size in self._db.execute("SELECT key, size FROM sketches ORDER BY last_access").fetchall():
+            if total <= self.max_bytes:
+                break
+            evicted.append(key)
+            total -= size
+        self._db.executemany("DELETE FROM sketches WHERE key = ?", [(key,) for key in evicted])
+        self.evictions += len(evicted)
+        return evicted
+
+    def _remove(self, keys: List[str]) -> None:
+        for key in keys:
+            for path in self._paths(key):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def record(self, key: str) -> Optional[dict]:
+        """The stored record for key, without counting an access"""
+        if self._db is None:
+            return None
+        with self._lock:
+            row = self._db.execute(f"SELECT {COLUMNS} FROM sketches WHERE key = ?", (key,)).fetchone()
+        return _record(row) if row is not None else None
+
+    def image_path(self, key: str) -> Optional[str]:
+        """Path of a stored image, or None if it is not cached"""
+        return self._paths(key)[0] if self.record(key) is not None else None
+
+    def stats(self) -> dict:
+        entries, total_bytes = 0, 0
+        if self._db is not None:
+            with self._lock:
+                entries, total_bytes = self._db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM sketches").fetchone()
+        return {
+            "policy": self.policy,
+            "entries": entries,
+            "bytes": total_bytes,
+            "maxBytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "stores": self.stores,
+            "evictions": self.evictions,
+            "errors": self.errors
+        }
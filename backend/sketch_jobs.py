@@ -0,0 +1,415 @@
+"""Asynchronous, deduplicated job queue for soulmate sketch generation.
+
+Submitting a prompt returns a job right away; the model calls run on a bounded
+executor in the background. A job is keyed by a hash of the prompt and the
+model parameters, so identical prompts submitted while one is in flight (a
+retry, a double click) share one paid generation instead of starting another,
+and prompts generated before are answered from the disk cache when one is set.
+
+Jobs run in the process that accepted them, but with a SketchJobStore their
+state is also written to SQLite, so under serve.py a poll that reaches another
+worker still finds the job. Coalescing of in-flight prompts is per worker.
+"""
+import abc
+import asyncio
+import base64
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+from executors import BoundedExecutor, ExecutorBusy
+from metrics import count_fallback, stage
+from sketch_cache import SketchCache
+
+QUEUED, RUNNING, SUCCEEDED, FAILED = "queued", "running", "succeeded", "failed"
+
+POLL_INTERVAL = 0.25  # seconds between checks on a job running in another worker
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sketch_jobs (
+    id TEXT PRIMARY KEY,
+    key TEXT NOT NULL,
+    prompt TEXT NOT NULL,
+    status TEXT NOT NULL,
+    image_url TEXT,
+    model TEXT,
+    error TEXT,
+    submissions INTEGER NOT NULL,
+    sketch_id TEXT,
+    cached INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    finished_at REAL,
+    owner INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS sketch_jobs_created_at ON sketch_jobs (created_at);
+"""
+COLUMNS = (
+    "id, key, prompt, status, image_url, model, error, submissions, sketch_id, cached, created_at, finished_at, owner"
+)
+
+
+class ImageClient(abc.ABC):
+    """Text-to-image backend: returns the URL of one generated image"""
+
+    @abc.abstractmethod
+    def generate(self, model: str, params: dict) -> Optional[str]:
+        """URL of the image generated by model with params, or None when it returned none"""
+
+
+class ReplicateImageClient(ImageClient):
+    """Runs models on Replicate"""
+
+    def __init__(self, client):
+        self.client = client
+
+    def generate(self, model: str, params: dict) -> Optional[str]:
+        output = self.client.run(model, input=params)
+        if not output:
+            return None
+        # Models return either a list of outputs or a single file output
+        if isinstance(output, list):
+            return str(output[0])
+        return str(output)
+
+
+class StubImageClient(ImageClient):
+    """Offline stand-in for load testing: waits, then returns an SVG data URL"""
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.calls = 0
+
+    def generate(self, model: str, params: dict) -> Optional[str]:
+        self.calls += 1
+        if self.delay:
+            time.sleep(self.delay)
+        digest = hashlib.sha256(params.get("prompt", "").encode()).hexdigest()
+        svg = (
+            f'<svg xmlns="http://www.w3.org/2000/svg" width="{params.get("width", 512)}" '
+            f'height="{params.get("height", 512)}"><rect width="100%" height="100%" fill="#{digest[:6]}"/></svg>'
+        )
+        return "data:image/svg+xml;base64," + base64.b64encode(svg.encode()).decode()
+
+
+def sketch_job_key(prompt: str, models: List[Tuple[str, dict]]) -> str:
+    """Content hash of a prompt and the models (with parameters) it will be run on"""
+    payload = json.dumps({"prompt": prompt, "models": models}, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class SketchJob:
+    def __init__(self, key: str, prompt: str, clock: Callable[[], float]):
+        self.id = uuid.uuid4().hex
+        self.key = key
+        self.prompt = prompt
+        self.status = QUEUED
+        self.image_url: Optional[str] = None
+        self.model: Optional[str] = None
+        self.error: Optional[str] = None
+        self.created_at = clock()
+        self.finished_at: Optional[float] = None
+        self.submissions = 1
+        self.sketch_id: Optional[str] = None  # sketch cache key once the image is stored
+        self.cached = False  # answered from the sketch cache without generating
+        self.owner = os.getpid()  # process running the job
+        self._done = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    @classmethod
+    def from_row(cls, row: tuple) -> "SketchJob":
+        """Snapshot of a job from the job store, possibly running in another process"""
+        job = cls.__new__(cls)
+        (job.id, job.key, job.prompt, job.status, job.image_url, job.model, job.error, job.submissions,
+         job.sketch_id, cached, job.created_at, job.finished_at, job.owner) = row
+        job.cached = bool(cached)
+        job._done = asyncio.Event()
+        job._task = None
+        return job
+
+    def row(self) -> tuple:
+        return (
+            self.id, self.key, self.prompt, self.status, self.image_url, self.model, self.error, self.submissions,
+            self.sketch_id, int(self.cached), self.created_at, self.finished_at, self.owner
+        )
+
+    @property
+    def done(self) -> bool:
+        return self.status in (SUCCEEDED, FAILED)
+
+    def to_dict(self) -> dict:
+        return {
+            "jobId": self.id,
+            "status": self.status,
+            "imageUrl": self.image_url,
+            "model": self.model,
+            "error": self.error,
+            "submissions": self.submissions,
+            "sketchId": self.sketch_id,
+            "cached": self.cached,
+            "createdAt": self.created_at,
+            "finishedAt": self.finished_at
+        }
+
+
+class SketchJobStore:
+    """Sketch job state in SQLite, shared by the server's worker processes.
+
+    Blocking; SketchJobQueue calls it off the event loop. The connection is
+    shared by all threads behind a lock and reopened in a forked child, as in
+    ChartStore.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._connect()
+        self._db.executescript(SCHEMA)
+        os.register_at_fork(after_in_child=self._connect)
+
+    def _connect(self) -> None:
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("PRAGMA busy_timeout=5000")
+
+    def save(self, job: SketchJob) -> None:
+        with self._lock:
+            self._db.execute(f"INSERT OR REPLACE INTO sketch_jobs ({COLUMNS}) VALUES ({', '.join('?' * 13)})", job.row())
+
+    def get(self, job_id: str) -> Optional[SketchJob]:
+        """The job as last saved; a job left unfinished by a process that has
+        since exited is reported as failed"""
+        with self._lock:
+            row = self._db.execute(f"SELECT {COLUMNS} FROM sketch_jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = SketchJob.from_row(row)
+        if not job.done and not _process_alive(job.owner):
+            job.status = FAILED
+            job.error = "The server worker running the job exited"
+        return job
+
+    def trim(self, history: int) -> None:
+        """Drop the oldest finished jobs beyond the newest history jobs"""
+        with self._lock:
+            self._db.execute(
+                "DELETE FROM sketch_jobs WHERE status IN (?, ?) AND id NOT IN "
+                "(SELECT id FROM sketch_jobs ORDER BY created_at DESC LIMIT ?)",
+                (SUCCEEDED, FAILED, history)
+            )
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+def _process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class SketchJobQueue:
+    """Coalescing job queue in front of an ImageClient.
+
+    ``models`` is the ordered list of (model, parameters) to try; later models
+    are fallbacks used only when the earlier ones fail. At most ``max_pending``
+    jobs may be queued or running; further submissions raise ExecutorBusy.
+    Finished jobs are kept for polling, the oldest dropped beyond ``history``.
+    Generated images are stored in ``cache`` and reused for repeat prompts, and
+    job state is written to ``store`` so other processes can report it.
+    """
+
+    def __init__(self, client: ImageClient, executor: BoundedExecutor, models: List[Tuple[str, dict]],
+                 max_pending: int = 0, history: int = 1000, cache: Optional[SketchCache] = None,
+                 store: Optional[SketchJobStore] = None, clock: Callable[[], float] = time.time):
+        self.client = client
+        self.executor = executor
+        self.models = models
+        self.cache = cache
+        self.store = store
+        self.max_pending = max_pending  # 0 means unbounded
+        self.history = history
+        self._clock = clock
+        self._jobs: "OrderedDict[str, SketchJob]" = OrderedDict()
+        self._in_flight: Dict[str, SketchJob] = {}  # job key -> queued or running job
+        self.submitted = 0
+        self.coalesced = 0
+        self.succeeded = 0
+        self.failed = 0
+        self.rejected = 0
+
+    async def _blocking(self, fn: Callable, *args):
+        # Cache and store lookups touch disk, so they run off the event loop
+        return await asyncio.get_running_loop().run_in_executor(None, fn, *args)
+
+    async def _save(self, job: SketchJob) -> None:
+        if self.store is not None:
+            await self._blocking(self.store.save, job)
+
+    def _join(self, job: SketchJob) -> SketchJob:
+        job.submissions += 1
+        self.coalesced += 1
+        return job
+
+    async def submit(self, prompt: str, regenerate: bool = False) -> SketchJob:
+        """Start a job for prompt, or join the identical one already in flight.
+
+        A cached image for the same prompt finishes the job immediately unless
+        regenerate is set.
+        """
+        key = sketch_job_key(prompt, self.models)
+        job = self._in_flight.get(key)
+        if job is not None:
+            self._join(job)
+            await self._save(job)
+            return job
+
+        record = await self._blocking(self.cache.get, key) if self.cache is not None and not regenerate else None
+        if record is not None:
+            job = SketchJob(key, prompt, self._clock)
+            job.status = SUCCEEDED
+            job.image_url = record["sourceUrl"]
+            job.model = record["model"]
+            job.sketch_id = key
+            job.cached = True
+            job.finished_at = job.created_at
+            job._done.set()
+            self._jobs[job.id] = job
+            await self._remember(job)
+            return job
+
+        # The same prompt may have been started during the cache lookup
+        job = self._in_flight.get(key)
+        if job is not None:
+            self._join(job)
+            await self._save(job)
+            return job
+
+        if self.max_pending and len(self._in_flight) >= self.max_pending:
+            self.rejected += 1
+            raise ExecutorBusy(f"sketch job queue is full ({self.max_pending} pending)")
+
+        job = SketchJob(key, prompt, self._clock)
+        self.submitted += 1
+        self._in_flight[key] = job
+        self._jobs[job.id] = job
+        # Stored before it starts, so the job is never seen running and then missing
+        try:
+            await self._remember(job)
+        except BaseException as e:
+            # Never started: drop it, and fail any request that joined it meanwhile
+            self._in_flight.pop(key, None)
+            self._jobs.pop(job.id, None)
+            job.error = f"The sketch job could not be stored: {str(e) or type(e).__name__}"
+            job.status = FAILED
+            job.finished_at = self._clock()
+            job._done.set()
+            raise
+        job._task = asyncio.get_running_loop().create_task(self._run(job))
+        return job
+
+    async def _remember(self, job: SketchJob) -> None:
+        self._trim_history()
+        if self.store is not None:
+            await self._blocking(self.store.save, job)
+            await self._blocking(self.store.trim, self.history)
+
+    async def get(self, job_id: str) -> Optional[SketchJob]:
+        """A job of this process, or a snapshot of one from the job store"""
+        job = self._jobs.get(job_id)
+        if job is None and self.store is not None:
+            job = await self._blocking(self.store.get, job_id)
+        return job
+
+    async def wait(self, job: SketchJob, timeout: Optional[float] = None) -> SketchJob:
+        """Wait until job finishes or timeout seconds pass; returns the job either
+        way, the latest snapshot for a job of another process"""
+        if self._jobs.get(job.id) is job or self.store is None:
+            try:
+                await asyncio.wait_for(job._done.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+            return job
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not job.done:
+            remaining = POLL_INTERVAL if deadline is None else min(POLL_INTERVAL, deadline - time.monotonic())
+            if remaining <= 0:
+                break
+            await asyncio.sleep(remaining)
+            job = await self._blocking(self.store.get, job.id) or job
+        return job
+
+    async def _run(self, job: SketchJob) -> None:
+        try:
+            job.image_url, job.model = await self.executor.run(self._generate, job)
+            job.status = SUCCEEDED
+            self.succeeded += 1
+        except Exception as e:
+            job.error = str(e)
+            job.status = FAILED
+            self.failed += 1
+        finally:
+            job.finished_at = self._clock()
+            self._in_flight.pop(job.key, None)
+            try:
+                await self._save(job)
+            finally:
+                job._done.set()
+
+    def _generate(self, job: SketchJob) -> Tuple[str, str]:
+        """Try each model in turn (on an executor thread)"""
+        job.status = RUNNING
+        if self.store is not None:
+            self.store.save(job)
+        error: Optional[Exception] = None
+        for attempt, (model, params) in enumerate(self.models):
+            if attempt:
+                count_fallback("sketch_model")
+            try:
+                with stage("sketch", "generate"):
+                    image_url = self.client.generate(model, {"prompt": job.prompt, **params})
+                if image_url:
+                    # Keep a local copy: generated URLs expire, and repeats become free
+                    with stage("sketch", "cache_store"):
+                        stored = self.cache is not None and self.cache.put(job.key, job.prompt, model, image_url)
+                    if stored:
+                        job.sketch_id = job.key
+                    return image_url, model
+                error = RuntimeError("No image generated")
+            except Exception as e:
+                error = e
+        raise error or RuntimeError("No image generated")
+
+    def _trim_history(self) -> None:
+        # Drop the oldest finished jobs; in-flight jobs are always kept
+        excess = len(self._jobs) - self.history
+        if excess <= 0:
+            return
+        for job_id in [job_id for job_id, job in self._jobs.items() if job.done][:excess]:
+            del self._jobs[job_id]
+
+    def stats(self) -> dict:
+        return {
+            "submitted": self.submitted,
+            "coalesced": self.coalesced,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "inFlight": len(self._in_flight),
+            "jobs": len(self._jobs)
+        }
@@ -0,0 +1,15 @@
+import os
+import sys
+
+import swisseph as swe
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+EPHE_PATH = os.path.join(BACKEND, "ephe")
+
+sys.path.insert(0, BACKEND)
+swe.set_ephe_path(EPHE_PATH)
+
+from benchmarks.common import use_temporary_data  # noqa: E402
+
+# Tests that import main must not create the chart store, sketch job store or sketch cache under ./data
+use_temporary_data()
@@ -0,0 +1,41 @@
+import asyncio
+
+import httpx
+import swisseph as swe
+
+import main
+
+# Full moon of 2024-01-25 17:54 UT, given in local time in Greenwich
+FULL_MOON = {
+    "name": "Test", "date": "2024-01-25", "time": "17:54", "city": "Greenwich", "gender": "female",
+    "coordinates": {"lat": 51.4769, "lng": 0.0}, "timezone": "Etc/UTC"
+}
+
+
+def post(path, body):
+    async def request():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://test") as client:
+            return await client.post(path, json=body)
+
+    return asyncio.run(request())
+
+
+def test_lunar_phase_is_elongation():
+    response = post("/api/advanced-analysis", FULL_MOON)
+    assert response.status_code == 200
+    # lunarPhase is the Moon's elongation from the Sun in degrees: 0 new, 180 full
+    assert response.json()["lunarPhase"] == 180.0
+
+
+def test_lunar_phase_without_the_moon(monkeypatch):
+    calculate = main.calculate_body_position
+
+    def failing_moon(julian_day, planet_code, planet_name):
+        if planet_code == swe.MOON:
+            raise swe.Error("no moon")
+        return calculate(julian_day, planet_code, planet_name)
+
+    monkeypatch.setattr(main, "calculate_body_position", failing_moon)
+    lunar_phase, positions = main.calculate_advanced_positions(swe.julday(2024, 1, 25, 17.9))
+    assert lunar_phase is None
+    assert "Moon" not in [position["name"] for position in positions]
@@ -0,0 +1,35 @@
+import asyncio
+import threading
+
+import pytest
+
+from executors import BoundedExecutor, ExecutorBusy
+
+
+def test_cancelled_waiters_release_their_queue_slots():
+    async def scenario():
+        executor = BoundedExecutor("test", max_workers=1, max_queue=2)
+        release = threading.Event()
+        try:
+            # The blocker holds the only thread, so both waiters stay queued until cancelled
+            blocker = asyncio.ensure_future(executor.run(release.wait))
+            await asyncio.sleep(0.05)
+            waiters = [asyncio.ensure_future(executor.run(lambda: "never")) for _ in range(2)]
+            await asyncio.sleep(0.05)
+            with pytest.raises(ExecutorBusy):
+                await executor.run(lambda: None)
+            for waiter in waiters:
+                waiter.cancel()
+            await asyncio.gather(*waiters, return_exceptions=True)
+            assert executor.stats()["queued"] == 0
+
+            queued = asyncio.ensure_future(executor.run(lambda: 42))
+            release.set()
+            await blocker
+            assert await queued == 42
+            assert executor.stats()["completed"] == 2
+        finally:
+            release.set()
+            executor.shutdown()
+
+    asyncio.run(scenario())
@@ -0,0 +1,27 @@
+import os
+
+import pytest
+import swisseph as swe
+
+from fixed_stars import REFERENCE_POINTS, FixedStarCatalog
+
+SEFSTARS = os.path.join(os.path.dirname(__file__), "..", "ephe", "sefstars.txt")
+
+
+@pytest.fixture(scope="module")
+def catalog():
+    return FixedStarCatalog.from_sefstars(SEFSTARS, max_magnitude=6.0)
+
+
+def test_reference_points_are_skipped(catalog):
+    assert not REFERENCE_POINTS & set(catalog.nomenclatures)
+    # Every magnitude-0 record in sefstars.txt is a reference point, not a star
+    assert 0.0 not in catalog.magnitudes
+
+
+@pytest.mark.parametrize("julian_day", [2433282.5, 2451545.0, 2460000.5])
+def test_positions_match_fixstar_ut(catalog, julian_day):
+    longitudes, _ = catalog.positions(julian_day)
+    for star, nomenclature in enumerate(catalog.nomenclatures):
+        expected = swe.fixstar_ut("," + nomenclature, julian_day)[0][0]
+        assert abs((longitudes[star] - expected + 180) % 360 - 180) * 3600 < 10, catalog.names[star]
@@ -0,0 +1,41 @@
+from gazetteer import Gazetteer, read_country_codes
+
+COUNTRY_INFO = (
+    "#ISO\tISO3\tISO-Numeric\tfips\tCountry\tCapital\n"
+    "FR\tFRA\t250\tFR\tFrance\tParis\n"
+    "US\tUSA\t840\tUS\tUnited States\tWashington\n"
+)
+ROWS = [
+    ("Paris", "FR", "11", 48.85341, 2.3488, 2138551, "Europe/Paris", "Paris"),
+    ("Paris", "US", "TX", 33.66094, -95.55551, 24171, "America/Chicago", "Paris"),
+    ("Paris", "US", "TN", 36.302, -88.32671, 10156, "America/Chicago", "Paris"),
+]
+
+
+def test_country_names_qualify_places(tmp_path):
+    path = tmp_path / "countryInfo.txt"
+    path.write_text(COUNTRY_INFO, encoding="utf-8")
+    gazetteer = Gazetteer(ROWS, read_country_codes(str(path)))
+    assert gazetteer.resolve("Paris, France")["country"] == "FR"
+    assert gazetteer.resolve("Paris, United States")["admin1"] == "TX"
+    assert gazetteer.resolve("Paris, usa")["country"] == "US"
+    assert gazetteer.resolve("Paris")["country"] == "FR"
+
+
+def test_codes_qualify_without_country_info():
+    gazetteer = Gazetteer(ROWS)
+    assert gazetteer.resolve("Paris, US")["admin1"] == "TX"
+    assert gazetteer.resolve("Paris, United States")["country"] == "FR"
+
+
+def test_qualifier_finds_a_small_namesake():
+    # Eleven larger Springfields in the US; the one in Australia must still be found
+    rows = [
+        ("Springfield", "US", f"S{i}", 40.0, -90.0 + i, 100000 - i, "America/Chicago", "Springfield")
+        for i in range(11)
+    ] + [("Springfield", "AU", "04", -27.68, 152.9, 15000, "Australia/Brisbane", "Springfield")]
+    gazetteer = Gazetteer(rows)
+    assert gazetteer.resolve("Springfield, AU")["country"] == "AU"
+    assert gazetteer.resolve("Springfield")["admin1"] == "S0"
+    assert gazetteer.resolve("Springf, AU")["country"] == "AU"
+    assert gazetteer.resolve("Nowhere, AU") is None
@@ -0,0 +1,37 @@
+import pytest
+import swisseph as swe
+
+import main
+from returns import ReturnNotFound, solar_return
+from zodiac import SIDEREAL, TROPICAL, ayanamsa_offset
+
+NATAL_JD = swe.julday(1990, 5, 17, 12.5)
+LAT, LNG = 48.8566, 2.3522
+
+
+def sun_longitude(julian_day, zodiac, ayanamsa):
+    longitude = swe.calc_ut(julian_day, swe.SUN, swe.FLG_SWIEPH)[0][0]
+    if zodiac == SIDEREAL:
+        longitude -= ayanamsa_offset(julian_day, ayanamsa)[0]
+    return longitude % 360
+
+
+@pytest.mark.parametrize("zodiac, ayanamsa", [(TROPICAL, None), (SIDEREAL, "lahiri")])
+def test_returns_match_natal_sun(zodiac, ayanamsa):
+    chart_options = (main.DEFAULT_HOUSE, False, zodiac, ayanamsa, ())
+    years = [1991, 2000, 2024, 2060]
+    returns = main.compute_solar_returns(NATAL_JD, 1990, years, LAT, LNG, LAT, LNG, chart_options, False)
+    natal = sun_longitude(NATAL_JD, zodiac, ayanamsa)
+    for year, solar in zip(years, returns):
+        # julianDay is rounded to 1e-6 days, about 0.003″ of solar motion
+        distance = (sun_longitude(solar["julianDay"], zodiac, ayanamsa) - natal + 180) % 360 - 180
+        assert abs(distance) * 3600 < 0.01, year
+        assert swe.revjul(solar["julianDay"])[0] == year
+
+
+def test_non_convergence_raises():
+    # A wrong derivative makes every step overshoot
+    with pytest.raises(ReturnNotFound):
+        solar_return(100.0, NATAL_JD, lambda julian_day: (
+            swe.calc_ut(julian_day, swe.SUN)[0][0], 0.1
+        ))
@@ -0,0 +1,53 @@
+import json
+import time
+
+import msgpack
+import pytest
+import swisseph as swe
+
+import main
+from serialization import COLUMNAR, JSON, MSGPACK, encode_payload, to_columns
+
+
+@pytest.fixture(scope="module")
+def charts():
+    # A few distinct charts, each copied with its own per-request metadata
+    base = [main.compute_birth_chart(swe.julday(1950 + i, 1 + i % 12, 10, 12.0), 10.0 * (i % 7), 20.0 * i) for i in range(8)]
+    return [base[i % len(base)].model_copy(update={"metadata": {"index": i}}) for i in range(4000)]
+
+
+def batch(charts):
+    return [{"index": index, "chart": chart, "error": None} for index, chart in enumerate(charts)]
+
+
+def dumped(charts):
+    return [{"index": index, "chart": chart.model_dump(), "error": None} for index, chart in enumerate(charts)]
+
+
+def test_batch_matches_json_dumps(charts):
+    # Volatile fields are encoded after the cached ones, so compare values rather than bytes
+    expected = json.dumps(dumped(charts[:2000]), ensure_ascii=False, separators=(",", ":"))
+    assert json.loads(encode_payload(batch(charts[:2000]), JSON)) == json.loads(expected)
+
+
+def test_batch_matches_columnar_and_msgpack(charts):
+    columnar = [
+        {"index": item["index"], "chart": {name: to_columns(value) for name, value in item["chart"].items()}, "error": None}
+        for item in dumped(charts[:500])
+    ]
+    assert json.loads(encode_payload(batch(charts[:500]), COLUMNAR)) == columnar
+    assert msgpack.unpackb(encode_payload(batch(charts[:500]), MSGPACK), strict_map_key=False) == columnar
+
+
+def test_batch_encoding_is_linear(charts):
+    def best_time(count):
+        payload = batch(charts[:count])
+        times = []
+        for _ in range(3):
+            start = time.perf_counter()
+            encode_payload(payload, JSON)
+            times.append(time.perf_counter() - start)
+        return min(times)
+
+    # Quadratic splicing made 4x the charts take 16x as long
+    assert best_time(4000) < 8 * best_time(1000)
@@ -0,0 +1,39 @@
+import shared_cache
+from shared_cache import HEADER, SharedCache, key_digest
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def copies(cache, key):
+    digest = key_digest(key)
+    headers = [HEADER.unpack_from(cache._map, way * cache.slot_size) for way in range(cache.ways)]
+    return sum(1 for slot_digest, _, _, length in headers if length and slot_digest == digest)
+
+
+def test_put_replaces_the_key_behind_a_freed_slot():
+    clock = Clock()
+    cache = SharedCache(slots=4, slot_size=256, ways=4, stripes=1, ttl=10, clock=clock)
+    cache.put("a", b"a")
+    clock.now += 5
+    cache.put("x", b"old")
+    clock.now += 6
+    assert cache.get("a") is None  # expired, so its slot (before x's) is freed
+    cache.put("x", b"new")
+    assert copies(cache, "x") == 1
+    assert cache.get("x") == b"new"
+
+
+def test_stripe_held_by_a_dead_worker_is_skipped(monkeypatch):
+    monkeypatch.setattr(shared_cache, "LOCK_TIMEOUT", 0.05)
+    cache = SharedCache(slots=4, slot_size=256, ways=4, stripes=1)
+    cache.put("x", b"value")
+    cache._stripes[0].acquire()  # as if a worker died holding it
+    assert cache.get("x") is None
+    assert cache.put("y", b"value") is False
+    assert cache.stats()["lostStripes"] == 1
@@ -0,0 +1,41 @@
+import asyncio
+import sqlite3
+
+import pytest
+
+from executors import BoundedExecutor
+from sketch_jobs import SUCCEEDED, SketchJobQueue, SketchJobStore, StubImageClient
+
+
+class FlakyStore(SketchJobStore):
+    """Job store whose first save fails, as on a busy database"""
+
+    def __init__(self, path):
+        super().__init__(path)
+        self.failures = 1
+
+    def save(self, job):
+        if self.failures:
+            self.failures -= 1
+            raise sqlite3.OperationalError("database is locked")
+        super().save(job)
+
+
+def test_failed_store_write_does_not_leave_job_in_flight(tmp_path):
+    async def scenario():
+        executor = BoundedExecutor("sketch-test", max_workers=1)
+        queue = SketchJobQueue(
+            StubImageClient(), executor, [("model", {})], store=FlakyStore(str(tmp_path / "jobs.db"))
+        )
+        try:
+            with pytest.raises(sqlite3.OperationalError):
+                await queue.submit("a prompt")
+            assert queue.stats()["inFlight"] == 0
+
+            job = await queue.submit("a prompt")
+            job = await queue.wait(job, timeout=10)
+            assert job.status == SUCCEEDED
+        finally:
+            executor.shutdown()
+
+    asyncio.run(scenario())
@@ -0,0 +1,41 @@
+import numpy as np
+import swisseph as swe
+
+from transits import TransitSearch
+
+SIGNS = ["Aries", "Taurus", "Gemini", "Cancer", "Leo", "Virgo",
+         "Libra", "Scorpio", "Sagittarius", "Capricorn", "Aquarius", "Pisces"]
+FLAGS = swe.FLG_SWIEPH | swe.FLG_SPEED
+
+
+def position(julian_day, code, name):
+    values = swe.calc_ut(julian_day, code, FLAGS)[0]
+    return values[0], values[3]
+
+
+def positions(julian_days, code, name):
+    values = np.array([position(julian_day, code, name) for julian_day in julian_days])
+    return values[:, 0], values[:, 1]
+
+
+def search(natal_points, event_types=("aspect", "station")):
+    return TransitSearch({"Mercury": swe.MERCURY}, natal_points, {"Conjunction": 0.0}, SIGNS,
+                         position, positions, event_types)
+
+
+def test_double_crossing_around_a_station():
+    # Mercury stationed retrograde on 2024-04-01 near 27°13′ Aries
+    start, end = swe.julday(2024, 3, 25), swe.julday(2024, 4, 8)
+    (station,) = search({}, ("station",)).find_events(start, end)
+    assert station["station"] == "retrograde"
+    assert station["utcTime"].startswith("2024-04-01T22")
+
+    # Just short of the station longitude Mercury crosses forward and back
+    # within hours, well inside one sampling step of a day
+    events = search({"Point": station["longitude"] - 0.01}, ("aspect",)).find_events(start, end)
+    assert [event["isRetrograde"] for event in events] == [False, True]
+    before, after = (event["julianDay"] for event in events)
+    assert before < station["julianDay"] < after < before + 1
+    for event in events:
+        longitude = position(event["julianDay"], swe.MERCURY, "Mercury")[0]
+        assert abs(longitude - (station["longitude"] - 0.01)) < 1e-4
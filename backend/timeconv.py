@@ -0,0 +1,70 @@
+"""Date/time parsing and local time to Julian day conversion.
+
+The frontend sends ISO dates (``YYYY-MM-DD``) and times (``HH:MM`` or
+``HH:MM:SS``), which are parsed with one regular expression; anything else goes
+through ``dateutil.parser`` as before. Timezone objects and local time to UT
+conversions are memoized, since the same zones (and, for repeat users, the same
+birth times) come up again and again.
+"""
+import re
+from datetime import datetime, timedelta, tzinfo
+from functools import lru_cache
+from typing import Optional, Tuple
+
+import swisseph as swe
+from dateutil import parser, tz
+
+_ISO_DATETIME = re.compile(
+    r"([0-9]{4})-([0-9]{2})-([0-9]{2})"
+    r"(?:[T ]([0-9]{1,2}):([0-9]{2})(?::([0-9]{2})(?:\.([0-9]{1,6}))?)?)?"
+)
+
+
+def parse_datetime(value: str) -> datetime:
+    """Parse a date or date and time; raises ValueError (or OverflowError) like dateutil.
+
+    Any UTC offset in the value is kept on the result; ISO values are naive.
+    """
+    match = _ISO_DATETIME.fullmatch(value.strip())
+    if match:
+        year, month, day, hour, minute, second, fraction = match.groups()
+        try:
+            return datetime(
+                int(year), int(month), int(day), int(hour or 0), int(minute or 0), int(second or 0),
+                int(fraction.ljust(6, "0")) if fraction else 0
+            )
+        except ValueError:
+            pass  # out-of-range fields: let dateutil produce its usual error
+    return parser.parse(value)
+
+
+@lru_cache(maxsize=1024)
+def get_timezone(name: str) -> Optional[tzinfo]:
+    """Timezone for an IANA name, or None if unknown"""
+    return tz.gettz(name)
+
+
+def utc_julian_day(utc: datetime) -> float:
+    """UT Julian day of a UTC (or naive, taken as UTC) datetime, seconds included"""
+    hours = utc.hour + utc.minute / 60 + (utc.second + utc.microsecond / 1e6) / 3600
+    return swe.julday(utc.year, utc.month, utc.day, hours)
+
+
+def julian_day_to_utc_datetime(julian_day: float) -> datetime:
+    """Aware UTC datetime of a UT Julian day, rounded to the second"""
+    year, month, day, hours = swe.revjul(julian_day)
+    seconds = round(hours * 3600)
+    return datetime(year, month, day, tzinfo=tz.UTC) + timedelta(seconds=seconds)
+
+
+@lru_cache(maxsize=65536)
+def local_to_julian_day(local: datetime, tz_name: str) -> Tuple[float, datetime]:
+    """UT Julian day and UTC datetime of a naive local time in a named timezone.
+
+    Raises ValueError for an unknown timezone.
+    """
+    local_tz = get_timezone(tz_name)
+    if local_tz is None:
+        raise ValueError(f"Unknown timezone: {tz_name}")
+    utc = local.replace(tzinfo=local_tz).astimezone(tz.UTC)
+    return utc_julian_day(utc), utc
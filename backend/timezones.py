@@ -0,0 +1,163 @@
+"""Offline timezone lookup from timezone boundary polygons.
+
+Boundaries come from the timezone-boundary-builder project
+(https://github.com/evansiroky/timezone-boundary-builder): download a
+``timezones*.geojson.zip`` release asset and unpack it to the path configured by
+``TIMEZONE_BOUNDARIES_PATH``. The ``-with-oceans`` variant also covers the sea.
+
+The polygons are loaded once into a 1° grid. Cells that no boundary crosses are
+resolved to their timezone when the index is built, so most lookups are a
+single dictionary access. Cells on a boundary keep their candidate polygons,
+and each polygon's edges are pre-split into 1° latitude bands, so the
+point-in-polygon test only scans the edges of one band.
+"""
+import json
+import math
+from collections import defaultdict
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+import numpy as np
+
+GRID_ROWS = 180
+GRID_COLUMNS = 360
+
+
+def nautical_timezone(lng: float) -> str:
+    """Nautical (Etc/GMT±N) zone for a longitude, used at sea"""
+    offset = int(round(lng / 15.0))
+    offset = max(-12, min(12, offset))
+    if offset == 0:
+        return "Etc/GMT"
+    # POSIX-style names invert the sign: Etc/GMT-5 is UTC+5
+    return f"Etc/GMT{'-' if offset > 0 else '+'}{abs(offset)}"
+
+
+def _cell_row(lat: float) -> int:
+    return min(GRID_ROWS - 1, max(0, int(math.floor(lat + 90))))
+
+
+def _cell_column(lng: float) -> int:
+    return int(math.floor(lng + 180)) % GRID_COLUMNS
+
+
+class TimezoneIndex:
+    """Grid-accelerated point-in-polygon index over timezone boundaries"""
+
+    def __init__(self, features: List[tuple], cache_size: int = 65536, decimals: int = 3):
+        """features: (tzid, rings) pairs, rings being (n, 2) lng/lat arrays.
+
+        Rings of one feature (outer rings and holes alike) are combined with the
+        even-odd rule, which is exact for GeoJSON polygons and multipolygons.
+        """
+        self.tzids: List[str] = []
+        self._band_edges: List[Dict[int, np.ndarray]] = []
+        self._cells: Dict[int, object] = {}
+        self.decimals = decimals
+        self._build(features)
+        self._cached_lookup = lru_cache(maxsize=cache_size)(self._lookup)
+
+    @classmethod
+    def from_geojson(cls, path: str, **kwargs) -> "TimezoneIndex":
+        with open(path) as f:
+            collection = json.load(f)
+
+        features = []
+        for feature in collection["features"]:
+            geometry = feature["geometry"]
+            polygons = geometry["coordinates"] if geometry["type"] == "MultiPolygon" else [geometry["coordinates"]]
+            rings = [np.asarray(ring, dtype=float)[:, :2] for polygon in polygons for ring in polygon]
+            features.append((feature["properties"]["tzid"], rings))
+        return cls(features, **kwargs)
+
+    def _build(self, features: List[tuple]) -> None:
+        candidates = defaultdict(list)  # cell -> feature ids whose bbox overlaps it
+        boundary_cells = []  # per feature: cells its edges pass through
+
+        for tzid, rings in features:
+            feature_id = len(self.tzids)
+            self.tzids.append(tzid)
+
+            ring_edges = [np.hstack([ring[:-1], ring[1:]]) for ring in rings if len(ring) > 1]
+            edges = np.concatenate(ring_edges) if ring_edges else np.empty((0, 4))
+
+            # Split edges into 1° latitude bands; a horizontal ray only meets its own band
+            row_low = np.clip(np.floor(np.minimum(edges[:, 1], edges[:, 3]) + 90), 0, GRID_ROWS - 1).astype(int)
+            row_high = np.clip(np.floor(np.maximum(edges[:, 1], edges[:, 3]) + 90), 0, GRID_ROWS - 1).astype(int)
+            bands = {}
+            for row in range(row_low.min(initial=GRID_ROWS), row_high.max(initial=-1) + 1):
+                band = edges[(row_low <= row) & (row_high >= row)]
+                if len(band):
+                    bands[row] = band
+            self._band_edges.append(bands)
+
+            # Cells touched by an edge's bounding box are (conservatively) on the boundary
+            col_low = np.floor(np.minimum(edges[:, 0], edges[:, 2]) + 180).astype(int)
+            col_high = np.floor(np.maximum(edges[:, 0], edges[:, 2]) + 180).astype(int)
+            single = (row_low == row_high) & (col_low == col_high)
+            touched = set(np.unique(row_low[single] * GRID_COLUMNS + col_low[single] % GRID_COLUMNS).tolist())
+            for r0, r1, c0, c1 in zip(row_low[~single], row_high[~single], col_low[~single], col_high[~single]):
+                for row in range(r0, r1 + 1):
+                    for column in range(c0, c1 + 1):
+                        touched.add(row * GRID_COLUMNS + column % GRID_COLUMNS)
+            boundary_cells.append(touched)
+
+            if len(edges):
+                for row in range(row_low.min(), row_high.max() + 1):
+                    for column in range(col_low.min(), col_high.max() + 1):
+                        candidates[row * GRID_COLUMNS + column % GRID_COLUMNS].append(feature_id)
+
+        for cell, feature_ids in candidates.items():
+            crossing = [fid for fid in feature_ids if cell in boundary_cells[fid]]
+            interior = [fid for fid in feature_ids if cell not in boundary_cells[fid]]
+
+            # A cell no boundary crosses lies wholly inside (or outside) each interior
+            # candidate, so testing its centre once decides it for every point
+            row, column = divmod(cell, GRID_COLUMNS)
+            center_lat, center_lng = row - 90 + 0.5, column - 180 + 0.5
+            owner = next((fid for fid in interior if self._contains(fid, center_lat, center_lng)), None)
+
+            if owner is not None:
+                self._cells[cell] = owner
+            elif crossing:
+                self._cells[cell] = tuple(crossing)
+
+    def _contains(self, feature_id: int, lat: float, lng: float) -> bool:
+        edges = self._band_edges[feature_id].get(_cell_row(lat))
+        if edges is None:
+            return False
+
+        x0, y0, x1, y1 = edges[:, 0], edges[:, 1], edges[:, 2], edges[:, 3]
+        straddles = (y0 > lat) != (y1 > lat)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            x_cross = x0 + (lat - y0) * (x1 - x0) / (y1 - y0)
+        return bool(np.count_nonzero(straddles & (lng < x_cross)) % 2)
+
+    def _lookup(self, lat: float, lng: float) -> Optional[str]:
+        state = self._cells.get(_cell_row(lat) * GRID_COLUMNS + _cell_column(lng))
+        if state is None:
+            return None
+        if isinstance(state, int):
+            return self.tzids[state]
+        for feature_id in state:
+            if self._contains(feature_id, lat, lng):
+                return self.tzids[feature_id]
+        return None
+
+    def lookup(self, lat: float, lng: float) -> Optional[str]:
+        """Timezone name at a point, or None where no boundary polygon covers it.
+
+        Results are cached per coordinate rounded to ``decimals`` places.
+        """
+        return self._cached_lookup(round(lat, self.decimals), round(lng, self.decimals))
+
+    def stats(self) -> dict:
+        cache = self._cached_lookup.cache_info()
+        return {
+            "timezones": len(self.tzids),
+            "cells": len(self._cells),
+            "uniformCells": sum(1 for state in self._cells.values() if isinstance(state, int)),
+            "cacheHits": cache.hits,
+            "cacheMisses": cache.misses,
+            "cacheSize": cache.currsize
+        }
@@ -0,0 +1,219 @@
+"""Transit event search by bracketing and root refinement.
+
+Each transiting body is sampled on a coarse grid sized to how fast it moves.
+Between two samples an event shows up as a sign change: of the angular
+distance to a target longitude (aspects to natal points, sign ingresses) or of
+the speed (stations). Stations are found first and added to the grid, so the
+longitude is monotonic between consecutive points and a body that crosses a
+target, stations and crosses back within one step still shows two sign
+changes. Each bracket is then refined with Newton steps on the longitude,
+using the speed swisseph already returns as the derivative, and falling back
+to bisection whenever a step would leave the bracket.
+"""
+import math
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Sequence
+
+import numpy as np
+import swisseph as swe
+
+# Sampling step in days: small enough that no event of a body is skipped
+STEP_DAYS = {
+    'Sun': 2.0,
+    'Moon': 0.25,
+    'Mercury': 1.0,
+    'Venus': 1.0,
+    'Mars': 2.0,
+    'Jupiter': 4.0,
+    'Saturn': 4.0,
+    'Uranus': 8.0,
+    'Neptune': 8.0,
+    'Pluto': 8.0,
+    'Chiron': 4.0,
+    'Ceres': 2.0,
+    'Pallas': 2.0,
+    'Juno': 2.0,
+    'Vesta': 2.0
+}
+
+# Bodies that never station as seen from the Earth
+NO_STATIONS = {'Sun', 'Moon'}
+
+LONGITUDE_TOLERANCE = 1e-6  # degrees
+TIME_TOLERANCE = 1e-6  # days (~0.1 s)
+MAX_ITERATIONS = 50
+
+EVENT_TYPES = ("aspect", "ingress", "station")
+
+
+def julian_day_to_utc(julian_day: float) -> str:
+    """ISO 8601 UTC timestamp (to the second) for a Julian day"""
+    year, month, day, hours = swe.revjul(julian_day)
+    moment = datetime(year, month, day, tzinfo=timezone.utc) + timedelta(hours=hours)
+    return (moment + timedelta(microseconds=500000)).replace(microsecond=0).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def _wrap(angle):
+    """Signed angle in [-180, 180)"""
+    return (angle + 180) % 360 - 180
+
+
+class TransitSearch:
+    """Finds aspect, ingress and station events of transiting bodies.
+
+    ``position(jd, code, name)`` returns (longitude, speed) for one date and
+    ``positions(jds, code, name)`` the same for an array of dates.
+    """
+
+    def __init__(self, bodies: Dict[str, int], natal_points: Dict[str, float], aspects: Dict[str, float],
+                 sign_names: Sequence[str], position: Callable, positions: Callable,
+                 event_types: Sequence[str] = EVENT_TYPES):
+        self.bodies = bodies
+        self.sign_names = list(sign_names)
+        self.position = position
+        self.positions = positions
+        self.event_types = set(event_types)
+
+        # One target longitude per (natal point, aspect, side); 0° and 180° have a single side
+        targets, labels = [], []
+        if "aspect" in self.event_types:
+            for point, longitude in natal_points.items():
+                for aspect, angle in aspects.items():
+                    for offset in {angle % 360, -angle % 360}:
+                        targets.append((longitude + offset) % 360)
+                        labels.append(("aspect", point, aspect))
+        if "ingress" in self.event_types:
+            for sign_index in range(12):
+                targets.append(sign_index * 30.0)
+                labels.append(("ingress", sign_index, None))
+        self.targets = np.array(targets, dtype=float)
+        self.labels = labels
+
+    def find_events(self, start_jd: float, end_jd: float) -> List[dict]:
+        """All events in [start_jd, end_jd), ordered by time"""
+        events = []
+        for name, code in self.bodies.items():
+            step = STEP_DAYS.get(name, 1.0)
+            samples = max(1, math.ceil((end_jd - start_jd) / step))
+            julian_days = np.linspace(start_jd, end_jd, samples + 1)
+            longitudes, speeds = self.positions(julian_days, code, name)
+
+            stations = self._stations(name, code, julian_days, speeds) if name not in NO_STATIONS else []
+            if "station" in self.event_types:
+                events.extend(self._station_events(name, stations))
+            if len(self.targets):
+                # Split the steps that contain a station there, where the motion reverses
+                indexes = [index + 1 for index, _, _, _ in stations]
+                crossing_days = np.insert(julian_days, indexes, [julian_day for _, julian_day, _, _ in stations])
+                crossing_longitudes = np.insert(longitudes, indexes, [longitude for _, _, longitude, _ in stations])
+                events.extend(self._crossings(name, code, crossing_days, crossing_longitudes))
+
+        events = [event for event in events if start_jd <= event["julianDay"] < end_jd]
+        events.sort(key=lambda event: event["julianDay"])
+        return events
+
+    def _crossings(self, name: str, code: int, julian_days: np.ndarray, longitudes: np.ndarray) -> List[dict]:
+        distance = _wrap(longitudes[:, None] - self.targets[None, :])
+        ahead = distance >= 0
+        # A sign change near 0° is a crossing; one near ±180° is just the wrap-around
+        crossed = (ahead[:-1] != ahead[1:]) & (np.abs(distance[:-1]) < 90) & (np.abs(distance[1:]) < 90)
+
+        events = []
+        for i, k in zip(*np.nonzero(crossed)):
+            julian_day, longitude, speed = self._refine_crossing(
+                code, name, self.targets[k], julian_days[i], julian_days[i + 1], distance[i, k]
+            )
+            kind, subject, aspect = self.labels[k]
+            event = {
+                "type": kind,
+                "body": name,
+                "julianDay": round(julian_day, 6),
+                "utcTime": julian_day_to_utc(julian_day),
+                "longitude": round(longitude % 360, 4),
+                "isRetrograde": bool(speed < 0)
+            }
+            if kind == "aspect":
+                event["aspect"] = aspect
+                event["natalPoint"] = subject
+            else:
+                # Moving backwards across a cusp re-enters the previous sign
+                event["sign"] = self.sign_names[subject if speed >= 0 else (subject - 1) % 12]
+            events.append(event)
+        return events
+
+    def _refine_crossing(self, code: int, name: str, target: float, low: float, high: float,
+                         low_distance: float) -> tuple:
+        """Safeguarded Newton iteration for longitude == target inside [low, high]"""
+        high_distance = _wrap(self.position(high, code, name)[0] - target)
+        julian_day = low + (high - low) * low_distance / (low_distance - high_distance)
+
+        for _ in range(MAX_ITERATIONS):
+            longitude, speed = self.position(julian_day, code, name)
+            distance = _wrap(longitude - target)
+            if abs(distance) < LONGITUDE_TOLERANCE or high - low < TIME_TOLERANCE:
+                break
+
+            if (distance >= 0) == (low_distance >= 0):
+                low, low_distance = julian_day, distance
+            else:
+                high = julian_day
+
+            candidate = julian_day - distance / speed if speed else None
+            julian_day = candidate if candidate is not None and low < candidate < high else (low + high) / 2
+        return julian_day, longitude, speed
+
+    def _stations(self, name: str, code: int, julian_days: np.ndarray, speeds: np.ndarray) -> List[tuple]:
+        """(sample index, julian day, longitude, station) for each station between samples"""
+        direct = speeds >= 0
+        stations = []
+        for i in np.nonzero(direct[:-1] != direct[1:])[0]:
+            julian_day, longitude = self._refine_station(code, name, julian_days[i], julian_days[i + 1], speeds[i], speeds[i + 1])
+            stations.append((int(i), julian_day, longitude, "retrograde" if speeds[i] >= 0 else "direct"))
+        return stations
+
+    def _station_events(self, name: str, stations: List[tuple]) -> List[dict]:
+        return [
+            {
+                "type": "station",
+                "body": name,
+                "station": station,
+                "julianDay": round(julian_day, 6),
+                "utcTime": julian_day_to_utc(julian_day),
+                "longitude": round(longitude % 360, 4)
+            }
+            for _, julian_day, longitude, station in stations
+        ]
+
+    def _refine_station(self, code: int, name: str, low: float, high: float,
+                        low_speed: float, high_speed: float) -> tuple:
+        """Regula falsi (Illinois variant) for speed == 0 inside [low, high]"""
+        julian_day, longitude = low, None
+        side = 0
+        for _ in range(MAX_ITERATIONS):
+            julian_day = (low * high_speed - high * low_speed) / (high_speed - low_speed)
+            longitude, speed = self.position(julian_day, code, name)
+            if high - low < TIME_TOLERANCE or speed == 0:
+                break
+
+            if (speed >= 0) == (low_speed >= 0):
+                low, low_speed = julian_day, speed
+                if side == -1:
+                    high_speed /= 2
+                side = -1
+            else:
+                high, high_speed = julian_day, speed
+                if side == 1:
+                    low_speed /= 2
+                side = 1
+        return julian_day, longitude
+
+
+def transit_windows(start_jd: float, end_jd: float, window_days: float) -> List[tuple]:
+    """Split a range into consecutive windows so events can be streamed as found"""
+    windows = []
+    window_start = start_jd
+    while window_start < end_jd:
+        window_end = min(end_jd, window_start + window_days)
+        windows.append((window_start, window_end))
+        window_start = window_end
+    return windows
@@ -0,0 +1,121 @@
+"""Start-up warm-up of the ephemeris data and the chart path.
+
+Swiss Ephemeris opens its data files lazily and reads them with ordinary file
+I/O, so the first chart in each 600-year file range pays for opening the
+planet, Moon and asteroid files and for reading them from disk. The warm-up
+pre-touches those files for a configured range of years, which pulls them into
+the OS page cache. It then runs every body and a synthetic chart on each
+ephemeris thread, because swisseph keeps its open files per thread. The server
+reports ready only when the warm-up has finished.
+"""
+import mmap
+import os
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional
+
+import swisseph as swe
+
+# Planets, Moon and main asteroids; each file covers 600 years
+EPHEMERIS_PREFIXES = ("sepl", "semo", "seas")
+YEARS_PER_FILE = 600
+
+PENDING, RUNNING, READY, FAILED = "pending", "running", "ready", "failed"
+
+
+def ephemeris_files(ephe_path: str, start_year: int, end_year: int, extra_dirs: Iterable[str] = ()) -> List[str]:
+    """Ephemeris files covering start_year..end_year, plus every file in extra_dirs"""
+    paths = []
+    for first_year in range(start_year // YEARS_PER_FILE * YEARS_PER_FILE, end_year + 1, YEARS_PER_FILE):
+        century = first_year // 100
+        suffix = f"_{century:02d}" if century >= 0 else f"m{-century:02d}"
+        for prefix in EPHEMERIS_PREFIXES:
+            path = os.path.join(ephe_path, f"{prefix}{suffix}.se1")
+            if os.path.exists(path):
+                paths.append(path)
+
+    for directory in extra_dirs:
+        directory = os.path.join(ephe_path, directory)
+        if os.path.isdir(directory):
+            paths.extend(sorted(
+                os.path.join(directory, name) for name in os.listdir(directory) if name.endswith(".se1")
+            ))
+    return paths
+
+
+def pretouch_file(path: str) -> int:
+    """Read one byte of every page of a file, so it is in the page cache; returns its size"""
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            return 0
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            for offset in range(0, size, mmap.PAGESIZE):
+                mapped[offset]
+    return size
+
+
+def warm_up_bodies(julian_days: Iterable[float], body_codes: Iterable[int]) -> int:
+    """Compute every body on every date with swisseph on the calling thread,
+    so it opens the files it needs; returns the number of positions computed"""
+    flags = swe.FLG_SWIEPH | swe.FLG_SPEED
+    body_codes = list(body_codes)
+    count = 0
+    for julian_day in julian_days:
+        for code in body_codes:
+            try:
+                swe.calc_ut(julian_day, code, flags)
+                count += 1
+            except swe.Error:
+                pass
+    return count
+
+
+def yearly_julian_days(start_year: int, end_year: int) -> List[float]:
+    return [swe.julday(year, 1, 1, 12.0) for year in range(start_year, end_year + 1)]
+
+
+class Warmup:
+    """Progress of the start-up warm-up, as reported by the readiness endpoint"""
+
+    def __init__(self, clock: Callable[[], float] = time.time):
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.status = PENDING
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.error: Optional[str] = None
+        self.counts: Dict[str, int] = {}
+
+    @property
+    def ready(self) -> bool:
+        # A failed warm-up only means a cold start; it must not keep the server out of rotation
+        return self.status in (READY, FAILED)
+
+    def start(self) -> None:
+        self.status = RUNNING
+        self.started_at = self._clock()
+
+    def add(self, name: str, amount: int) -> None:
+        with self._lock:
+            self.counts[name] = self.counts.get(name, 0) + amount
+
+    def finish(self, error: Optional[str] = None) -> None:
+        self.finished_at = self._clock()
+        self.error = error
+        self.status = FAILED if error else READY
+
+    def skip(self) -> None:
+        """Mark ready without warming up (warm-up disabled)"""
+        self.status = READY
+
+    def to_dict(self) -> dict:
+        duration = None
+        if self.started_at is not None:
+            duration = round((self.finished_at or self._clock()) - self.started_at, 3)
+        return {
+            "status": self.status,
+            "durationSeconds": duration,
+            "error": self.error,
+            **self.counts
+        }
@@ -0,0 +1,46 @@
+"""Tropical and sidereal zodiacs.
+
+A sidereal longitude is the tropical one minus the ayanamsa, the precession
+offset between the two zodiacs at that moment. Charts are therefore always
+computed in the tropical zodiac, and each sidereal view is derived from the
+same positions and house cusps by subtracting one number per ayanamsa.
+"""
+from typing import Optional, Tuple
+
+import swisseph as swe
+
+TROPICAL, SIDEREAL = "tropical", "sidereal"
+ZODIACS = (TROPICAL, SIDEREAL)
+
+# Ayanamsa names accepted by the API, mapped to swisseph sidereal modes
+AYANAMSAS = {
+    "fagan_bradley": swe.SIDM_FAGAN_BRADLEY,
+    "lahiri": swe.SIDM_LAHIRI,
+    "deluce": swe.SIDM_DELUCE,
+    "raman": swe.SIDM_RAMAN,
+    "ushashashi": swe.SIDM_USHASHASHI,
+    "krishnamurti": swe.SIDM_KRISHNAMURTI,
+    "djwhal_khul": swe.SIDM_DJWHAL_KHUL,
+    "yukteshwar": swe.SIDM_YUKTESHWAR,
+    "jn_bhasin": swe.SIDM_JN_BHASIN,
+    "hipparchos": swe.SIDM_HIPPARCHOS,
+    "sassanian": swe.SIDM_SASSANIAN,
+    "galactic_center": swe.SIDM_GALCENT_0SAG,
+    "true_citra": swe.SIDM_TRUE_CITRA,
+    "true_revati": swe.SIDM_TRUE_REVATI,
+    "true_pushya": swe.SIDM_TRUE_PUSHYA
+}
+
+
+def zodiac_key(zodiac: str, ayanamsa: Optional[str] = None) -> str:
+    """Canonical name of a zodiac, e.g. "tropical" or "sidereal:lahiri" (for cache keys)"""
+    return f"{SIDEREAL}:{ayanamsa}" if zodiac == SIDEREAL else TROPICAL
+
+
+def ayanamsa_offset(julian_day: float, name: str) -> Tuple[float, float]:
+    """Ayanamsa (degrees) at a UT Julian day and its rate (degrees per day)"""
+    swe.set_sid_mode(AYANAMSAS[name])
+    value = swe.get_ayanamsa_ex_ut(julian_day, swe.FLG_SWIEPH)[1]
+    # The "true" ayanamsas follow a star, so take the rate from the ayanamsa itself
+    rate = swe.get_ayanamsa_ex_ut(julian_day + 1, swe.FLG_SWIEPH)[1] - value
+    return value, rate